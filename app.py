@@ -1,9 +1,7 @@
 import streamlit as st
 import os
-import json
 import sqlite3
-import zipfile
-import io
+import time
 from datetime import datetime
 from pathlib import Path
 from modules.requirement_analyzer import RequirementAnalyzer
@@ -12,8 +10,17 @@ from modules.test_runner import TestRunner
 from modules.reviewer import Reviewer
 from modules.storage import ProjectStorage
 from modules.chat_manager import ChatManager
+from modules.chat_memory import ChatMemory
 from modules.file_manager import FileManager
+from modules.document_extractor import DocumentExtractor
+from modules.retrieval import select_context
+from modules.data_profiler import profile_uploads
+from modules.snippet_library import SnippetLibrary
+from modules.static_analyzer import analyze_code
+from modules.packager import build_package
 from modules.langchain_integration import LangChainIntegration
+from config import REVIEW_CONFIG, RESILIENCE_CONFIG
+from modules.deadlines import deadline
 
 # Configure Streamlit
 st.set_page_config(
@@ -25,7 +32,9 @@ st.set_page_config(
 
 chat_manager = ChatManager()
 file_manager = FileManager()
+extractor = DocumentExtractor(file_manager)
 langchain = LangChainIntegration()
+chat_memory = ChatMemory(chat_manager, langchain.summarize_conversation)
 
 # Initialize session state - MUST be done before any widget
 if "current_project" not in st.session_state:
@@ -42,11 +51,25 @@ if "review_report" not in st.session_state:
     st.session_state.review_report = None
 if "chat_title" not in st.session_state:
     st.session_state.chat_title = "New Chat"
+if "generated_files" not in st.session_state:
+    st.session_state.generated_files = None
+if "uploaded_documents" not in st.session_state:
+    st.session_state.uploaded_documents = []
+if "message_cache" not in st.session_state:
+    st.session_state.message_cache = None
+if "sidebar_session_limit" not in st.session_state:
+    st.session_state.sidebar_session_limit = 30
+
+@st.cache_resource
+def get_snippet_library() -> SnippetLibrary:
+    """One snippet library per process so its search index survives reruns"""
+    return SnippetLibrary(ProjectStorage())
 
 # Initialize modules
 storage = ProjectStorage()
+snippet_library = get_snippet_library()
 analyzer = RequirementAnalyzer()
-generator = CodeGenerator()
+generator = CodeGenerator(snippet_library)
 tester = TestRunner()
 reviewer = Reviewer()
 
@@ -105,11 +128,16 @@ def render_sidebar_chat_history():
             st.session_state.chat_title = "New Chat"
             st.session_state.analysis_result = None
             st.session_state.generated_code = None
+            st.session_state.generated_files = None
         
         st.markdown("---")
         
         try:
-            sessions = chat_manager.get_all_sessions()
+            # Fetch one extra row to know whether older chats exist
+            limit = st.session_state.sidebar_session_limit
+            sessions = chat_manager.get_all_sessions(limit=limit + 1)
+            has_more = len(sessions) > limit
+            sessions = sessions[:limit]
             
             if sessions:
                 for session in sessions:
@@ -130,12 +158,39 @@ def render_sidebar_chat_history():
                             if st.session_state.current_session_id == session['id']:
                                 st.session_state.current_session_id = None
                                 st.session_state.chat_title = "New Chat"
+                
+                if has_more and st.button("Show older chats", use_container_width=True, key="more_sessions_btn"):
+                    st.session_state.sidebar_session_limit += 30
             else:
                 st.info("No chat history yet")
         except Exception as e:
             st.error(f"Error loading chat history: {str(e)}")
             st.info("Try refreshing the page")
 
+CHAT_PAGE_SIZE = 30
+
+def load_chat_messages(session_id: int) -> list:
+    """
+    Return the loaded window of messages for a session, oldest first.
+    Messages already seen are kept in session state, so a rerun only
+    queries rows newer than the last one shown.
+    """
+    cache = st.session_state.message_cache
+    
+    if not cache or cache["session_id"] != session_id:
+        page = chat_manager.get_messages_page(session_id, limit=CHAT_PAGE_SIZE)
+        cache = {
+            "session_id": session_id,
+            "messages": list(reversed(page["messages"])),
+            "next_before_id": page["next_before_id"]
+        }
+        st.session_state.message_cache = cache
+    else:
+        last_id = cache["messages"][-1]["id"] if cache["messages"] else 0
+        cache["messages"].extend(chat_manager.get_messages_after(session_id, last_id))
+    
+    return cache["messages"]
+
 def render_chat_interface():
     """Render ChatGPT-like chat interface"""
     
@@ -149,7 +204,19 @@ def render_chat_interface():
     
     # Display chat messages
     try:
-        messages = chat_manager.get_session_messages(st.session_state.current_session_id)
+        messages = load_chat_messages(st.session_state.current_session_id)
+        cache = st.session_state.message_cache
+        
+        if cache["next_before_id"] is not None:
+            if st.button("⬆️ Load older messages", key="load_older_btn"):
+                page = chat_manager.get_messages_page(
+                    cache["session_id"],
+                    before_id=cache["next_before_id"],
+                    limit=CHAT_PAGE_SIZE
+                )
+                cache["messages"] = list(reversed(page["messages"])) + cache["messages"]
+                cache["next_before_id"] = page["next_before_id"]
+                messages = cache["messages"]
         
         for msg in messages:
             with st.chat_message(msg['role']):
@@ -161,13 +228,18 @@ def render_chat_interface():
     # Chat input
     if prompt := st.chat_input("Enter your requirement or ask a question..."):
         try:
+            # Summary plus recent messages, read before this message is added
+            history = chat_memory.context(st.session_state.current_session_id)
+            
             # Add user message to chat
             chat_manager.add_message(st.session_state.current_session_id, "user", prompt)
             
             # Get AI response
-            with st.spinner("Analyzing..."):
+            with st.spinner("Analyzing..."), deadline(RESILIENCE_CONFIG["action_deadline_seconds"]["chat"]):
+                preview = st.empty()
                 try:
-                    analysis = langchain.analyze_requirement_with_langchain(prompt)
+                    analysis = langchain.analyze_requirement_with_langchain(prompt, history=history, on_item=live_analysis(preview), stage="chat")
+                    preview.empty()
                     st.session_state.analysis_result = analysis
                     
                     # Create response
@@ -183,11 +255,15 @@ def render_chat_interface():
                     
                     # Add assistant message
                     chat_manager.add_message(st.session_state.current_session_id, "assistant", response_text)
-                    
+                
                 except Exception as analysis_error:
                     error_msg = f"Error during analysis: {str(analysis_error)}"
                     st.error(error_msg)
                     chat_manager.add_message(st.session_state.current_session_id, "assistant", error_msg)
+            
+            # The summary is an LLM call of its own; past its deadline the extractive summary is used
+            with deadline(RESILIENCE_CONFIG["action_deadline_seconds"]["chat"]):
+                chat_memory.update(st.session_state.current_session_id)
         
         except Exception as e:
             st.error(f"Error: {str(e)}")
@@ -221,10 +297,11 @@ def render_requirement_input():
         )
     
     with col2:
-        st.markdown("#### Or Upload Requirement File:")
-        uploaded_file = st.file_uploader(
-            "Choose a file (TXT, PDF, DOCX, CSV, JSON, PY)",
+        st.markdown("#### Or Upload Requirement Files:")
+        uploaded_files = st.file_uploader(
+            "Choose files (TXT, PDF, DOCX, CSV, JSON, PY)",
             type=["txt", "pdf", "docx", "csv", "json", "py"],
+            accept_multiple_files=True,
             label_visibility="collapsed"
         )
     
@@ -235,36 +312,69 @@ def render_requirement_input():
     with col2:
         clear_btn = st.button("❌ Clear", use_container_width=True, key="clear_btn")
     with col3:
-        pass
+        reuse_similar = st.checkbox("Reuse similar analyses", value=True, key="reuse_similar",
+                                    help="Reuse the analysis of a near-identical past requirement instead of calling the LLM")
     
     if clear_btn:
         st.session_state.analysis_result = None
         st.session_state.generated_code = None
+        st.session_state.generated_files = None
         st.session_state.test_results = None
         st.session_state.review_report = None
+        st.session_state.uploaded_documents = []
     
     if analyze_btn:
-        if not requirement_text and not uploaded_file:
+        if not requirement_text and not uploaded_files:
             st.error("Please enter a requirement or upload a file")
             return
         
         input_text = requirement_text
-        if uploaded_file:
+        if uploaded_files:
             try:
-                file_content = uploaded_file.getvalue()
-                file_path = file_manager.save_uploaded_file(
-                    st.session_state.current_project.get("id", 1) if st.session_state.current_project else 1,
-                    file_content,
-                    uploaded_file.name
+                project_id = st.session_state.current_project.get("id", 1) if st.session_state.current_project else 1
+                saved_files = [
+                    file_manager.save_uploaded_stream(project_id, uploaded_file, uploaded_file.name)
+                    for uploaded_file in uploaded_files
+                ]
+                
+                # PDF/DOCX parsing runs in worker processes, all files at once. The
+                # script only polls, so Streamlit can still interrupt it for a rerun
+                extraction = extractor.submit_uploads(saved_files)
+                status = st.empty()
+                started = time.monotonic()
+                while not extraction.done():
+                    status.info(f"Extracting text from {len(saved_files)} file(s)... {time.monotonic() - started:.0f}s")
+                    time.sleep(0.25)
+                status.empty()
+                documents = profile_uploads(extraction.result())
+                st.session_state.uploaded_documents = documents
+                
+                # Datasets are described by their profile, other files by the
+                # chunks most relevant to the typed requirement
+                profiles = "\n\n".join(document["profile"] for document in documents if document.get("profile"))
+                excerpts = select_context(
+                    [document for document in documents if not document.get("profile")],
+                    requirement_text or project_title
                 )
-                input_text += f"\n\n[Uploaded file: {uploaded_file.name}]\n{file_content.decode('utf-8', errors='ignore')[:1000]}"
+                file_names = ", ".join(document["filename"] for document in documents)
+                input_text += f"\n\n[Uploaded files: {file_names}]\n" + "\n\n".join(part for part in (profiles, excerpts) if part)
             except Exception as e:
                 st.error(f"Error uploading file: {str(e)}")
                 return
         
-        with st.spinner("Analyzing requirement..."):
+        with st.spinner("Analyzing requirement..."), deadline(RESILIENCE_CONFIG["action_deadline_seconds"]["analysis"]):
+            # Tasks are shown as the model produces them, then replaced by the Analysis Result panel
+            preview = st.empty()
             try:
-                st.session_state.analysis_result = langchain.analyze_requirement_with_langchain(input_text)
+                st.session_state.analysis_result = langchain.analyze_requirement_with_langchain(
+                    input_text,
+                    allow_reuse=reuse_similar,
+                    on_item=live_analysis(preview)
+                )
+                preview.empty()
+                reused_from = st.session_state.analysis_result.get("reused_from")
+                if reused_from:
+                    st.info(f"♻️ Reused the analysis of a similar requirement ({reused_from['similarity']:.0%} similar). Untick \"Reuse similar analyses\" to analyze from scratch.")
                 
                 final_title = project_title or "New Project"
                 
@@ -297,58 +407,147 @@ def render_requirement_input():
             except Exception as e:
                 st.error(f"Error analyzing requirement: {str(e)}")
     
-    return requirement_text, uploaded_file, project_title
+    return requirement_text, uploaded_files, project_title
+
+def render_analysis(analysis: dict):
+    """Render the tasks, libraries and constraints of an analysis"""
+    st.markdown("#### Functional Tasks:")
+    for i, task in enumerate(analysis.get("tasks", []), 1):
+        st.markdown(f"<div class='task-box'><b>{i}. {task}</b></div>", unsafe_allow_html=True)
+    
+    if analysis.get("libraries"):
+        st.markdown("#### Suggested Libraries:")
+        st.write(", ".join(str(library) for library in analysis["libraries"]))
+    
+    if analysis.get("constraints"):
+        st.markdown("#### Constraints:")
+        st.write(analysis["constraints"])
 
 def render_analysis_result():
     """Render analysis results"""
     if st.session_state.analysis_result:
         st.subheader("📊 Analysis Result")
-        
-        analysis = st.session_state.analysis_result
-        
-        st.markdown("#### Functional Tasks:")
-        for i, task in enumerate(analysis.get("tasks", []), 1):
-            st.markdown(f"<div class='task-box'><b>{i}. {task}</b></div>", unsafe_allow_html=True)
-        
-        if analysis.get("libraries"):
-            st.markdown("#### Suggested Libraries:")
-            st.write(", ".join(analysis["libraries"]))
-        
-        if analysis.get("constraints"):
-            st.markdown("#### Constraints:")
-            st.write(analysis["constraints"])
-        
+        render_analysis(st.session_state.analysis_result)
         st.markdown("---")
 
+def live_analysis(placeholder):
+    """Callback for a streamed analysis that renders tasks and libraries into placeholder as they arrive"""
+    partial = {"tasks": [], "libraries": []}
+    
+    def on_item(field: str, value):
+        partial.setdefault(field, []).append(value)
+        with placeholder.container():
+            st.caption("Analysis in progress...")
+            render_analysis(partial)
+    
+    return on_item
+
+def document_context() -> str:
+    """Dataset profiles plus excerpts of the uploaded documents relevant to the analyzed tasks"""
+    documents = st.session_state.uploaded_documents
+    analysis = st.session_state.analysis_result or {}
+    if not documents:
+        return ""
+    profiles = [document["profile"] for document in documents if document.get("profile")]
+    excerpts = select_context(
+        [document for document in documents if not document.get("profile")],
+        " ".join(analysis.get("tasks", []))
+    )
+    return "\n\n".join(part for part in profiles + [excerpts] if part)
+
+def save_code_version(code: str):
+    """Persist code for the current project, creating the project on first save"""
+    project = st.session_state.current_project
+    if not project:
+        return
+    
+    if project.get("id"):
+        project["version"] = project.get("version", 1) + 1
+        storage.save_code_version(project["id"], code, project["version"])
+    else:
+        project["id"] = storage.save_project(project["title"], project["requirement"], code)
+        project["version"] = 1
+
+def last_reviewed_code():
+    """
+    Code the last review ran on, the baseline of an incremental review
+    
+    Refined code is saved as a newer version without replacing the generated
+    code, so the latest stored version is not necessarily what was reviewed.
+    """
+    report = st.session_state.review_report
+    return report.get("reviewed_code") if isinstance(report, dict) else None
+
 def render_code_generation():
     """Render code generation section"""
     if st.session_state.analysis_result:
+        multi_module = st.checkbox(
+            "Multi-module project",
+            key="multi_module",
+            help="Plan several modules and generate them in parallel instead of a single main.py"
+        )
+        incremental_review = st.checkbox(
+            "Incremental review",
+            value=REVIEW_CONFIG["incremental"],
+            key="incremental_review",
+            help="Review only the functions changed since the last reviewed version and patch them in place"
+        )
         col1, col2, col3 = st.columns(3)
         
         with col1:
             if st.button("⚙️ Generate Code", use_container_width=True, key="gen_code_btn"):
-                with st.spinner("Generating code..."):
+                with st.spinner("Generating code..."), deadline(RESILIENCE_CONFIG["action_deadline_seconds"]["generation"]):
                     try:
-                        st.session_state.generated_code = generator.generate(
-                            st.session_state.analysis_result
-                        )
+                        if multi_module:
+                            project_files = generator.generate_project(
+                                st.session_state.analysis_result,
+                                document_context()
+                            )
+                            st.session_state.generated_files = project_files["files"]
+                            st.session_state.generated_code = project_files["files"]["main.py"]
+                            if "main" in project_files["import_errors"]:
+                                st.warning(f"main.py failed the import check: {project_files['import_errors']['main']}")
+                            for module_name, reason in project_files["stubbed"].items():
+                                st.error(f"{module_name}.py is NOT implemented ({reason}); it ships as a stub whose functions raise NotImplementedError")
+                        else:
+                            st.session_state.generated_files = None
+                            st.session_state.generated_code = generator.generate(
+                                st.session_state.analysis_result,
+                                document_context()
+                            )
+                        save_code_version(st.session_state.generated_code)
                         st.success("✅ Code generated successfully!")
                     except Exception as e:
                         st.error(f"Error generating code: {str(e)}")
         
         with col2:
             if st.session_state.generated_code and st.button("🧪 Run Tests", use_container_width=True, key="run_tests_btn"):
-                with st.spinner("Generating and running tests..."):
+                with st.spinner("Generating and running tests..."), deadline(RESILIENCE_CONFIG["action_deadline_seconds"]["tests"]):
                     try:
-                        st.session_state.test_results = tester.run_tests(
-                            st.session_state.generated_code
-                        )
+                        if st.session_state.generated_files:
+                            st.session_state.test_results = tester.run_project_tests(
+                                st.session_state.generated_files
+                            )
+                        else:
+                            st.session_state.test_results = tester.run_tests(
+                                st.session_state.generated_code
+                            )
                         
                         # Display results immediately
                         test_res = st.session_state.test_results
+                        project = st.session_state.current_project
+                        if test_res and project and project.get("id"):
+                            storage.save_test_results(
+                                project["id"],
+                                test_res.get("passed", 0),
+                                test_res.get("failed", 0),
+                                test_res.get("log", "")
+                            )
+                            if test_res.get("failed", 0) == 0 and test_res.get("passed", 0) > 0:
+                                snippet_library.add_code(st.session_state.generated_code, project["id"])
                         if test_res:
                             st.success(f"✅ Tests Complete! Passed: {test_res.get('passed', 0)}, Failed: {test_res.get('failed', 0)}")
-                        
+                    
                     except Exception as e:
                         st.error(f"Error running tests: {str(e)}")
                         st.session_state.test_results = {
@@ -361,7 +560,7 @@ def render_code_generation():
         
         with col3:
             if st.session_state.generated_code and st.button("🔁 Review & Refine", use_container_width=True, key="review_btn"):
-                with st.spinner("Reviewing and refining code..."):
+                with st.spinner("Reviewing and refining code..."), deadline(RESILIENCE_CONFIG["action_deadline_seconds"]["review"]):
                     try:
                         test_results = st.session_state.test_results or {
                             "passed": 0,
@@ -369,14 +568,48 @@ def render_code_generation():
                             "success_rate": 0,
                             "log": "No tests run yet"
                         }
-                        st.session_state.review_report = reviewer.review(
-                            st.session_state.generated_code,
-                            test_results
-                        )
+                        project = st.session_state.current_project
+                        reviewed_code = st.session_state.generated_code
+                        previous_code = last_reviewed_code() if incremental_review else None
+                        if previous_code:
+                            st.session_state.review_report = reviewer.review_changes(
+                                reviewed_code,
+                                previous_code,
+                                test_results,
+                                document_context()
+                            )
+                        else:
+                            st.session_state.review_report = reviewer.review(
+                                reviewed_code,
+                                test_results,
+                                document_context()
+                            )
+                        
+                        report = st.session_state.review_report
+                        report["reviewed_code"] = reviewed_code
+                        if project and project.get("id"):
+                            storage.save_review_report(project["id"], report.get("summary", ""))
+                            if report.get("refined_code") and report["refined_code"] != st.session_state.generated_code:
+                                save_code_version(report["refined_code"])
                         st.success("✅ Review complete!")
                     except Exception as e:
                         st.error(f"Error in review process: {str(e)}")
 
+def render_static_analysis(static_analysis: list):
+    """Show per-function complexity and performance findings"""
+    st.markdown("#### Static Analysis:")
+    st.dataframe(
+        [
+            {"Function": result["name"], "Line": result["line"], "Complexity": result["complexity"], "Findings": len(result["findings"])}
+            for result in static_analysis
+        ],
+        use_container_width=True,
+        hide_index=True
+    )
+    for result in static_analysis:
+        for finding in result["findings"]:
+            st.write(f"• `{result['name']}` line {finding['line']}: {finding['message']}")
+
 def render_output_console():
     """Render the output console with all tabs"""
     st.subheader("💻 Output Console")
@@ -384,8 +617,18 @@ def render_output_console():
     tab1, tab2, tab3, tab4, tab5 = st.tabs(["Generated Code", "Test Results", "Review Report", "Code Output", "Download Package"])
     
     with tab1:
+        if st.session_state.generated_files:
+            for filename, code in st.session_state.generated_files.items():
+                if filename != "main.py":
+                    st.markdown(f"**{filename}**")
+                    st.code(code, language="python")
+            st.markdown("**main.py**")
         if st.session_state.generated_code:
             st.code(st.session_state.generated_code, language="python")
+            static_analysis = analyze_code(st.session_state.generated_code)
+            if static_analysis:
+                with st.expander(f"Static analysis ({sum(len(result['findings']) for result in static_analysis)} findings)"):
+                    render_static_analysis(static_analysis)
             st.download_button(
                 label="Download Code",
                 data=st.session_state.generated_code,
@@ -441,6 +684,14 @@ def render_output_console():
                 if summary:
                     st.write(summary)
                 
+                if report.get("static_analysis"):
+                    render_static_analysis(report["static_analysis"])
+                
+                if report.get("patched"):
+                    st.caption(f"Patched functions: {', '.join(report['patched'])}")
+                if report.get("rejected"):
+                    st.caption(f"Patches not applied: {', '.join(report['rejected'])}")
+                
                 if report.get("improvements"):
                     st.markdown("#### Improvements Made:")
                     for improvement in report["improvements"]:
@@ -508,98 +759,25 @@ def render_output_console():
         
         if st.button("📦 Download Package", use_container_width=True, key="download_pkg"):
             try:
-                zip_buffer = io.BytesIO()
+                if st.session_state.generated_files:
+                    files = st.session_state.generated_files
+                elif st.session_state.generated_code:
+                    files = {"main.py": st.session_state.generated_code}
+                else:
+                    files = {}
+                project_title = st.session_state.current_project.get("title", "Generated Project") if st.session_state.current_project else "Generated Project"
                 
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    # Add main files
-                    if st.session_state.generated_code:
-                        zip_file.writestr("main.py", st.session_state.generated_code)
-                    
-                    if st.session_state.test_results and isinstance(st.session_state.test_results, dict):
-                        test_log = st.session_state.test_results.get("log", "No tests run")
-                        zip_file.writestr("test_results.txt", test_log)
-                    
-                    if st.session_state.review_report:
-                        if isinstance(st.session_state.review_report, dict):
-                            review_summary = st.session_state.review_report.get("summary", "")
-                            zip_file.writestr("review_report.txt", review_summary)
-                            
-                            if st.session_state.review_report.get("refined_code"):
-                                zip_file.writestr("main_refined.py", st.session_state.review_report["refined_code"])
-                    
-                    # Add requirements.txt
-                    if st.session_state.analysis_result:
-                        libraries = st.session_state.analysis_result.get("libraries", [])
-                        requirements_content = "\n".join(libraries) + "\n"
-                        zip_file.writestr("requirements.txt", requirements_content)
-                    
-                    # Add README.md
-                    project_title = st.session_state.current_project.get("title", "Generated Project") if st.session_state.current_project else "Generated Project"
-                    readme = f"""# {project_title}
-
-## Overview
-This is an auto-generated Python project using SASDS (Single Agent Software Development System).
-
-## Files
-- main.py - Main generated code
-- main_refined.py - Refined version after review (if available)
-- test_results.txt - Test execution results
-- review_report.txt - Code review report
-- requirements.txt - Python dependencies
-
-## How to Run
-1. Install dependencies: pip install -r requirements.txt
-2. Run the project: python main.py
-3. Run tests: pytest test_main.py
-
-## Generated At
-{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-"""
-                    zip_file.writestr("README.md", readme)
-                    
-                    # Add .gitignore
-                    gitignore = """__pycache__/
-*.py[cod]
-*$py.class
-*.so
-.Python
-build/
-develop-eggs/
-dist/
-downloads/
-eggs/
-.eggs/
-lib/
-lib64/
-parts/
-sdist/
-var/
-wheels/
-*.egg-info/
-.installed.cfg
-*.egg
-.env
-.venv
-venv/
-"""
-                    zip_file.writestr(".gitignore", gitignore)
-                    
-                    # Add project metadata
-                    metadata = {
-                        "project_title": project_title,
-                        "generated_at": datetime.now().isoformat(),
-                        "analysis": st.session_state.analysis_result or {},
-                        "test_summary": {
-                            "passed": st.session_state.test_results.get("passed", 0) if st.session_state.test_results and isinstance(st.session_state.test_results, dict) else 0,
-                            "failed": st.session_state.test_results.get("failed", 0) if st.session_state.test_results and isinstance(st.session_state.test_results, dict) else 0,
-                        }
-                    }
-                    zip_file.writestr("project_metadata.json", json.dumps(metadata, indent=2))
+                package = build_package(
+                    files,
+                    analysis=st.session_state.analysis_result,
+                    test_results=st.session_state.test_results,
+                    review_report=st.session_state.review_report,
+                    project_title=project_title
+                )
                 
-                zip_buffer.seek(0)
                 st.download_button(
                     label="📥 Download ZIP Package",
-                    data=zip_buffer.getvalue(),
+                    data=package,
                     file_name=f"sasds_{project_title.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
                     mime="application/zip",
                     key="download_zip"
@@ -0,0 +1,4 @@
+"""
+SASDS Benchmarks
+End-to-end pipeline benchmarks run against the stub LLM: python -m benchmarks.pipeline
+"""
@@ -0,0 +1,302 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# The benchmark uses its own databases; DATABASE_URL must be set before
+# database_models creates its engine on import
+WORK_DIR = tempfile.mkdtemp(prefix="sasds-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORK_DIR}/sasds.db"
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from sqlalchemy import event
+from config import BENCHMARK_CONFIG, MODEL_ROUTING_CONFIG, RESILIENCE_CONFIG
+from database_models import engine
+from modules import storage as storage_module
+from modules.chat_manager import ChatManager
+from modules.code_generator import CodeGenerator
+from modules.deadlines import deadline
+from modules.model_router import ModelRouter, set_router
+from modules.packager import build_package
+from modules.requirement_analyzer import RequirementAnalyzer
+from modules.reviewer import Reviewer
+from modules.storage import ProjectStorage
+from modules.test_runner import TestRunner
+
+REQUIREMENTS = [
+    "Read a CSV file of sales, compute the monthly totals and plot them as a bar chart",
+    "Fetch JSON from a REST API, validate each record and write the valid ones to a file",
+    "Parse a log file, count errors per hour and report the ten most frequent messages"
+]
+
+STAGES = ["analyze", "generate", "test", "review", "persist", "package"]
+
+class DatabaseCounter:
+    """Counts statements on the SQLAlchemy engine (with timings) and on ProjectStorage's sqlite3 connections"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sqlalchemy_statements = 0
+        self.sqlalchemy_seconds = 0.0
+        self.sqlite_statements = 0
+        self.sqlite_connections = 0
+        self._started = threading.local()
+    
+    def install(self):
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        # ProjectStorage opens a plain sqlite3 connection per operation
+        storage_module.sqlite3 = _TracedSqlite3(self)
+    
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._started.at = time.perf_counter()
+    
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - getattr(self._started, "at", time.perf_counter())
+        with self.lock:
+            self.sqlalchemy_statements += 1
+            self.sqlalchemy_seconds += elapsed
+    
+    def statement(self, sql: str):
+        with self.lock:
+            self.sqlite_statements += 1
+    
+    def connected(self):
+        with self.lock:
+            self.sqlite_connections += 1
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                "sqlalchemy_statements": self.sqlalchemy_statements,
+                "sqlalchemy_ms": round(self.sqlalchemy_seconds * 1000, 2),
+                "sqlite_statements": self.sqlite_statements,
+                "sqlite_connections": self.sqlite_connections
+            }
+
+class _TracedSqlite3:
+    """sqlite3 module for ProjectStorage whose connections report every statement"""
+    
+    def __init__(self, counter: DatabaseCounter):
+        self.counter = counter
+    
+    def __getattr__(self, name):
+        return getattr(sqlite3, name)
+    
+    def connect(self, *args, **kwargs):
+        conn = sqlite3.connect(*args, **kwargs)
+        conn.set_trace_callback(self.counter.statement)
+        self.counter.connected()
+        return conn
+
+def distribution(samples: List[float]) -> Dict:
+    """Latency distribution in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        "samples": len(ordered),
+        "min_ms": round(ordered[0], 2),
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 2),
+        "max_ms": round(ordered[-1], 2),
+        "mean_ms": round(statistics.mean(ordered), 2)
+    }
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, or None where it cannot be read"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2 ** 20, 1)
+
+def bare_pytest_ms(tmpdir: str) -> float:
+    """Time of a bare pytest run of one trivial test, the floor under every TestRunner call"""
+    test_file = os.path.join(tmpdir, "test_empty.py")
+    if not os.path.exists(test_file):
+        with open(test_file, "w") as f:
+            f.write("def test_empty():\n    assert True\n")
+    start = time.perf_counter()
+    subprocess.run(["python", "-m", "pytest", test_file, "-q", "-p", "no:cacheprovider"], capture_output=True, cwd=tmpdir)
+    return (time.perf_counter() - start) * 1000
+
+def run_benchmark(iterations: int, llm_latency_ms: float, warmup: int = 1) -> Dict:
+    """
+    Run the pipeline iterations times (after warmup unmeasured runs)
+    
+    Returns:
+        Results with per-stage latency distributions, database statement
+        counts per iteration, test-runner overhead and peak RSS
+    """
+    set_router(ModelRouter(dict(MODEL_ROUTING_CONFIG, provider="stub", stub_latency_ms=llm_latency_ms)))
+    counter = DatabaseCounter()
+    counter.install()
+    
+    analyzer = RequirementAnalyzer()
+    generator = CodeGenerator()
+    test_runner = TestRunner()
+    reviewer = Reviewer()
+    storage = ProjectStorage(os.path.join(WORK_DIR, "projects.db"))
+    chat_manager = ChatManager()
+    
+    timings = {stage: [] for stage in STAGES}
+    bare_pytest = []
+    db_before = None
+    
+    @contextmanager
+    def timed(stage: str, measured: bool):
+        start = time.perf_counter()
+        yield
+        if measured:
+            timings[stage].append((time.perf_counter() - start) * 1000)
+    
+    for iteration in range(warmup + iterations):
+        measured = iteration >= warmup
+        if iteration == warmup:
+            db_before = counter.snapshot()
+        requirement = REQUIREMENTS[iteration % len(REQUIREMENTS)]
+        
+        with timed("analyze", measured), deadline(RESILIENCE_CONFIG["action_deadline_seconds"]["analysis"]):
+            analysis = analyzer.analyze(requirement)
+        with timed("generate", measured), deadline(RESILIENCE_CONFIG["action_deadline_seconds"]["generation"]):
+            code = generator.generate(analysis)
+        with timed("test", measured), deadline(RESILIENCE_CONFIG["action_deadline_seconds"]["tests"]):
+            test_results = test_runner.run_tests(code)
+        if measured:
+            # Paired with each TestRunner call so drift in process start-up cancels out
+            bare_pytest.append(bare_pytest_ms(WORK_DIR))
+        with timed("review", measured), deadline(RESILIENCE_CONFIG["action_deadline_seconds"]["review"]):
+            review_report = reviewer.review(code, test_results)
+        
+        # What the app writes and reads back around one pipeline run
+        with timed("persist", measured):
+            session_id = chat_manager.create_session(f"Benchmark {iteration}")
+            chat_manager.add_message(session_id, "user", requirement)
+            chat_manager.add_message(session_id, "assistant", f"Identified tasks: {', '.join(analysis.get('tasks', [])[:3])}")
+            project_id = storage.save_project(f"Benchmark {iteration}", requirement, code)
+            storage.save_code_version(project_id, code, 1)
+            storage.save_test_results(project_id, test_results["passed"], test_results["failed"], test_results["log"])
+            storage.save_review_report(project_id, json.dumps(review_report, default=str))
+            chat_manager.flush()
+            storage.flush()
+            chat_manager.get_session_messages(session_id)
+            chat_manager.get_all_sessions()
+            storage.get_recent_projects()
+        
+        with timed("package", measured):
+            build_package({"main.py": code}, analysis, test_results, review_report, f"Benchmark {iteration}")
+    
+    db_after = counter.snapshot()
+    db = {name: round((db_after[name] - db_before[name]) / iterations, 2) for name in db_after}
+    
+    return {
+        "params": {
+            "iterations": iterations,
+            "llm_latency_ms": llm_latency_ms,
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "stages": {stage: distribution(samples) for stage, samples in timings.items()},
+        "db_per_iteration": db,
+        "test_runner": {
+            "bare_pytest_ms": round(statistics.median(bare_pytest), 2),
+            "overhead_ms": round(statistics.median(test - bare for test, bare in zip(timings["test"], bare_pytest)), 2)
+        },
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def compare(results: Dict, baseline: Dict, threshold: float, min_regression_ms: float) -> List[str]:
+    """
+    Regressions of results against a baseline
+    
+    Returns:
+        One message per metric that got worse than the thresholds allow
+    """
+    regressions = []
+    
+    def check(name: str, current: Optional[float], previous: Optional[float], min_delta: float = 0):
+        if current is None or previous is None:
+            return
+        if current > previous * (1 + threshold) and current - previous >= min_delta:
+            regressions.append(f"{name}: {previous} -> {current} (+{(current / previous - 1) * 100 if previous else float('inf'):.0f}%)")
+    
+    for stage, current in results["stages"].items():
+        previous = baseline["stages"].get(stage)
+        if previous:
+            check(f"{stage} p50_ms", current["p50_ms"], previous["p50_ms"], min_regression_ms)
+            check(f"{stage} p95_ms", current["p95_ms"], previous["p95_ms"], min_regression_ms)
+    
+    for name, current in results["db_per_iteration"].items():
+        min_delta = min_regression_ms if name.endswith("_ms") else 1
+        check(f"db {name}", current, baseline["db_per_iteration"].get(name), min_delta)
+    
+    check("test_runner overhead_ms", results["test_runner"]["overhead_ms"], baseline["test_runner"]["overhead_ms"], min_regression_ms)
+    check("peak_rss_mb", results["peak_rss_mb"], baseline["peak_rss_mb"])
+    return regressions
+
+def format_results(results: Dict) -> str:
+    """Stage table plus the other metrics, for the console"""
+    lines = [f"{'stage':<10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+    for stage, stats in results["stages"].items():
+        lines.append(f"{stage:<10}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['max_ms']:>10}")
+    lines.append(f"db per iteration: {results['db_per_iteration']}")
+    lines.append(f"test runner: {results['test_runner']}")
+    lines.append(f"peak RSS: {results['peak_rss_mb']} MB")
+    return "\n".join(lines)
+
+def main():
+    """Command line entry point; exits with 1 when a metric regressed"""
+    parser = argparse.ArgumentParser(description="SASDS end-to-end pipeline benchmark")
+    parser.add_argument("--iterations", type=int, default=BENCHMARK_CONFIG["iterations"])
+    parser.add_argument("--llm-latency-ms", type=float, default=BENCHMARK_CONFIG["llm_latency_ms"], help="Simulated latency of every stub LLM call")
+    parser.add_argument("--baseline", default=BENCHMARK_CONFIG["baseline_path"])
+    parser.add_argument("--threshold", type=float, default=BENCHMARK_CONFIG["regression_threshold"], help="Allowed slowdown ratio, e.g. 0.25")
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+    args = parser.parse_args()
+    
+    try:
+        results = run_benchmark(args.iterations, args.llm_latency_ms)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+    print(format_results(results))
+    
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    
+    baseline_path = Path(args.baseline)
+    if args.update_baseline or not baseline_path.exists():
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline written to {baseline_path}")
+        return 0
+    
+    baseline = json.loads(baseline_path.read_text())
+    if {key: baseline["params"][key] for key in ("iterations", "llm_latency_ms")} != {key: results["params"][key] for key in ("iterations", "llm_latency_ms")}:
+        print(f"Baseline {baseline_path} was recorded with {baseline['params']}; not comparable, rerun with its parameters or --update-baseline")
+        return 0
+    
+    regressions = compare(results, baseline, args.threshold, BENCHMARK_CONFIG["min_regression_ms"])
+    if regressions:
+        print("Regressions against the baseline:")
+        print("\n".join(f"- {regression}" for regression in regressions))
+        return 1
+    print(f"No regressions against {baseline_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -36,6 +36,238 @@ APP_CONFIG = {
     "max_code_length": 10000
 }
 
+# Write-behind batching for chat messages and pipeline artifacts.
+# "batched" applies writes on a background thread in one transaction per
+# batch; up to flush_interval_seconds of writes can be lost if the process
+# is killed. "sync" commits every write before returning.
+WRITE_BEHIND_CONFIG = {
+    "durability": os.getenv("WRITE_DURABILITY", "batched"),
+    "max_batch_size": int(os.getenv("WRITE_BATCH_SIZE", "50")),
+    "flush_interval_seconds": float(os.getenv("WRITE_FLUSH_INTERVAL", "0.5")),
+    # Failed writes are retried with later flushes, then kept as dead letters
+    "max_attempts": int(os.getenv("WRITE_MAX_ATTEMPTS", "3"))
+}
+
+# Requirement document text extraction (PDF/DOCX parsing runs in a process pool)
+EXTRACTION_CONFIG = {
+    "max_workers": int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    "pdf_pages_per_task": 20,
+    "docx_paragraphs_per_section": 50,
+    "text_chunk_bytes": 1024 * 1024,
+    "max_chars": 2_000_000
+}
+
+# Local BM25 retrieval over uploaded requirement documents. Only the top_k
+# most relevant chunks are sent with analysis, generation and review prompts.
+RETRIEVAL_CONFIG = {
+    "chunk_words": 200,
+    "chunk_overlap_words": 40,
+    "top_k": 5,
+    "max_context_chars": 6000,
+    "max_cached_indexes": 32
+}
+
+# Chunked profiling of uploaded CSV/JSON datasets. Memory stays bounded by
+# chunk_rows and the distinct-value sketch size, whatever the file size.
+PROFILING_CONFIG = {
+    "chunk_rows": 100_000,
+    "distinct_sketch_size": 4096,
+    "sample_rows": 3,
+    "max_prompt_columns": 30,
+    "max_json_document_bytes": 200 * 1024 * 1024,
+    "max_cached_profiles": 32
+}
+
+# Read-through cache for the sidebar session list and recent projects.
+# Writes in this process invalidate immediately; the TTL bounds staleness
+# from writes made by other processes sharing the database.
+CACHE_CONFIG = {
+    "list_ttl_seconds": float(os.getenv("LIST_CACHE_TTL", "300")),
+    "max_entries": 256
+}
+
+# Retention and archival (run with: python -m modules.retention run).
+# Set a policy to None to disable it. vacuum_pages=0 frees all free pages.
+RETENTION_CONFIG = {
+    "keep_test_logs_per_project": 20,
+    "keep_review_reports_per_project": 20,
+    "archive_sessions_idle_days": 90,
+    "archive_dir": os.getenv("ARCHIVE_DIR", str(ROOT_DIR / "archives")),
+    "vacuum_pages": 0
+}
+
+# Reuse of past analyses for similar requirements. Requirements are
+# normalized to stemmed word sets; MinHash LSH finds candidates and their
+# word-set Jaccard similarity must reach similarity_threshold.
+# mode: "reuse" returns the stored analysis directly, "confirm" first asks
+# the LLM a one-word same/different question, "off" disables lookups.
+ANALYSIS_REUSE_CONFIG = {
+    "mode": os.getenv("ANALYSIS_REUSE_MODE", "confirm"),
+    "similarity_threshold": float(os.getenv("ANALYSIS_REUSE_THRESHOLD", "0.85")),
+    "num_permutations": 64,
+    "band_rows": 4,
+    "max_candidates": 50
+}
+
+# Library of functions from code versions that passed their tests. Exact
+# task matches are spliced into generated code; other relevant snippets are
+# offered to the generator as context (backfill: python -m modules.snippet_library harvest).
+SNIPPET_CONFIG = {
+    "enabled": True,
+    "max_context_snippets": 3,
+    "min_score": 1.0,
+    "max_snippet_lines": 60
+}
+
+# Multi-module project generation: one LLM call per planned module, run
+# concurrently, followed by an import check of the assembled package.
+MULTI_MODULE_CONFIG = {
+    "max_modules": 6,
+    "max_workers": int(os.getenv("GENERATION_WORKERS", "6")),
+    "import_check_timeout_seconds": 30
+}
+
+# Prompt token budgets per stage. Sections are packed by priority (e.g. for
+# review: code, then test failures, then log excerpts, then document context)
+# and the lowest-priority ones are trimmed or dropped to fit.
+PROMPT_BUDGET_CONFIG = {
+    "analysis": int(os.getenv("ANALYSIS_PROMPT_TOKENS", "4000")),
+    "generation": int(os.getenv("GENERATION_PROMPT_TOKENS", "6000")),
+    "review": int(os.getenv("REVIEW_PROMPT_TOKENS", "8000")),
+    "log_excerpt_lines": 60
+}
+
+# Incremental review sends only the functions changed since the previous code
+# version and applies the patched functions locally. A full review is used
+# when there is no previous version or most of the program changed.
+REVIEW_CONFIG = {
+    "incremental": os.getenv("INCREMENTAL_REVIEW", "true").lower() == "true",
+    "max_changed_ratio": 0.6
+}
+
+# Local static analysis of generated code (complexity and performance
+# anti-patterns), cached per function so unchanged functions are free.
+STATIC_ANALYSIS_CONFIG = {
+    "complexity_threshold": 10,
+    "max_cached_functions": 4096
+}
+
+# Chat memory: prompts carry a rolling summary plus the most recent messages.
+# Older messages are folded into the stored summary once summarize_every of
+# them have accumulated beyond the recent window.
+CHAT_MEMORY_CONFIG = {
+    "recent_messages": 6,
+    "summarize_every": 6,
+    "max_summary_tokens": 500,
+    "max_message_chars": 2000
+}
+
+# Model routing: each stage tries its models in order with its own generation
+# settings. A model whose recent error rate exceeds max_error_rate is skipped
+# for cooldown_seconds, and one slower than the stage's max_latency_ms (p95)
+# is tried after faster ones. LLM_PROVIDER=stub answers locally for offline runs
+# (after stub_latency_ms, to simulate a real model);
+# record and replay capture and serve real responses (see CASSETTE_CONFIG).
+MODEL_ROUTING_CONFIG = {
+    "provider": os.getenv("LLM_PROVIDER", "gemini"),
+    "stages": {
+        "analysis": {"models": ["gemini-1.5-flash", "gemini-pro"], "temperature": 0.1, "max_output_tokens": 1024, "stop_sequences": [], "max_latency_ms": 8000},
+        "planning": {"models": ["gemini-1.5-flash", "gemini-pro"], "temperature": 0.1, "max_output_tokens": 1024, "stop_sequences": [], "max_latency_ms": 8000},
+        "generation": {"models": ["gemini-1.5-pro", "gemini-pro"], "temperature": 0.3, "max_output_tokens": 4096, "stop_sequences": []},
+        # Review replies carry a report plus the whole rewritten program, so they get the generation cap and room for the report
+        "review": {"models": ["gemini-1.5-pro", "gemini-pro"], "temperature": 0.3, "max_output_tokens": 6144, "stop_sequences": []},
+        # Chat messages are answered with an analysis, so they need its output room
+        "chat": {"models": ["gemini-1.5-flash", "gemini-pro"], "temperature": 0.3, "max_output_tokens": 1024, "stop_sequences": [], "max_latency_ms": 5000},
+        "chat_summary": {"models": ["gemini-1.5-flash", "gemini-pro"], "temperature": 0.2, "max_output_tokens": 512, "stop_sequences": [], "max_latency_ms": 5000},
+        "reuse_check": {"models": ["gemini-1.5-flash", "gemini-pro"], "temperature": 0.0, "max_output_tokens": 5, "stop_sequences": ["\n"], "max_latency_ms": 3000}
+    },
+    "window": 50,
+    "min_samples": 5,
+    "max_error_rate": 0.5,
+    "cooldown_seconds": 60,
+    "stub_latency_ms": float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+}
+
+# Every pipeline action runs under a deadline that bounds all LLM calls and
+# test runs inside it. A call still running after its model's p95 latency is
+# hedged with a duplicate request (except for the stub and replay providers),
+# and after breaker_failure_threshold
+# consecutive failures the circuit opens so callers use their offline
+# fallbacks at once until a trial call succeeds.
+RESILIENCE_CONFIG = {
+    "action_deadline_seconds": {
+        "analysis": int(os.getenv("ANALYSIS_DEADLINE_SECONDS", "45")),
+        "generation": int(os.getenv("GENERATION_DEADLINE_SECONDS", "120")),
+        "tests": int(os.getenv("TESTS_DEADLINE_SECONDS", "90")),
+        "review": int(os.getenv("REVIEW_DEADLINE_SECONDS", "90")),
+        "chat": int(os.getenv("CHAT_DEADLINE_SECONDS", "45"))
+    },
+    "hedge": os.getenv("HEDGE_REQUESTS", "true").lower() == "true",
+    "hedge_min_delay_ms": 500,
+    "hedge_workers": 8,
+    "breaker_failure_threshold": 5,
+    "breaker_reset_seconds": 30
+}
+
+# LLM cassettes: LLM_PROVIDER=record calls Gemini and saves every prompt and
+# response to the cassette; LLM_PROVIDER=replay serves them without network
+# access. Replayed responses wait for their recorded latency times
+# replay_latency_scale, or replay_latency_ms when that is set. A prompt not on
+# the cassette fails (so callers use their fallbacks) unless on_miss is "stub".
+CASSETTE_CONFIG = {
+    "path": os.getenv("LLM_CASSETTE", "cassettes/llm_cassette.jsonl"),
+    "replay_latency_ms": float(os.environ["LLM_REPLAY_LATENCY_MS"]) if os.getenv("LLM_REPLAY_LATENCY_MS") else None,
+    "replay_latency_scale": float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0")),
+    "on_miss": os.getenv("LLM_REPLAY_ON_MISS", "error")
+}
+
+# Pipeline benchmarks (python -m benchmarks.pipeline): each iteration runs
+# analyze, generate, test, review, persist and package against the stub LLM.
+# A stage regresses when its p50 or p95 latency is more than
+# regression_threshold above the baseline and also at least
+# min_regression_ms slower; database statement counts, TestRunner overhead and
+# peak RSS use the same ratio.
+BENCHMARK_CONFIG = {
+    "iterations": 5,
+    "llm_latency_ms": 50,
+    "regression_threshold": 0.25,
+    "min_regression_ms": 25,
+    "baseline_path": "benchmarks/baselines/pipeline.json"
+}
+
+# Offline requirement analysis rules. A rule fires when any of its keywords
+# appears as a word (plurals included) in the requirement; a trailing "*"
+# matches any word starting with the keyword, so "visualiz*" matches
+# "visualize" and "visualization". Tasks and libraries are added in rule order.
+ANALYSIS_RULES = [
+    {"keywords": ["csv", "spreadsheet"], "tasks": ["Read CSV file", "Parse data", "Process data"], "libraries": ["pandas"], "input": "CSV file"},
+    {"keywords": ["excel", "xlsx"], "tasks": ["Read Excel workbook", "Process sheet data"], "libraries": ["pandas", "openpyxl"], "input": "Excel workbook"},
+    {"keywords": ["json"], "tasks": ["Read JSON file", "Parse JSON"], "libraries": ["json"], "input": "JSON data"},
+    {"keywords": ["xml"], "tasks": ["Parse XML document"], "libraries": ["xml.etree.ElementTree"], "input": "XML document"},
+    {"keywords": ["yaml", "yml"], "tasks": ["Load YAML configuration"], "libraries": ["pyyaml"], "input": "YAML file"},
+    {"keywords": ["database", "sql", "sqlite"], "tasks": ["Connect to database", "Query data", "Store results"], "libraries": ["sqlite3"], "output": "Database records"},
+    {"keywords": ["plot", "graph", "chart", "visualiz*", "histogram"], "tasks": ["Visualize data", "Create chart"], "libraries": ["matplotlib"], "output": "Charts"},
+    {"keywords": ["average", "mean", "median", "statistic*", "standard deviation", "percentile"], "tasks": ["Compute summary statistics"], "libraries": ["statistics"], "output": "Summary statistics"},
+    {"keywords": ["matrix", "array", "numeric", "vector"], "tasks": ["Perform numerical computations"], "libraries": ["numpy"]},
+    {"keywords": ["predict*", "classif*", "regression", "machine learning", "cluster*"], "tasks": ["Prepare features", "Train model", "Evaluate model"], "libraries": ["scikit-learn", "pandas"], "output": "Model predictions"},
+    {"keywords": ["api", "http", "rest", "endpoint"], "tasks": ["Call HTTP API", "Handle responses and errors"], "libraries": ["requests"], "input": "HTTP API responses"},
+    {"keywords": ["scrap*", "crawl*", "html", "web page", "website"], "tasks": ["Fetch web pages", "Extract content from HTML"], "libraries": ["requests", "beautifulsoup4"], "input": "Web pages"},
+    {"keywords": ["email", "smtp"], "tasks": ["Compose email", "Send email"], "libraries": ["smtplib", "email"], "output": "Email messages"},
+    {"keywords": ["date", "timestamp", "schedul*", "calendar", "deadline"], "tasks": ["Parse and compare dates"], "libraries": ["datetime"]},
+    {"keywords": ["regex", "pattern", "validat*", "phone number", "email address"], "tasks": ["Validate input formats"], "libraries": ["re"]},
+    {"keywords": ["command line", "cli", "argument", "flag"], "tasks": ["Parse command-line arguments"], "libraries": ["argparse"], "input": "Command-line arguments"},
+    {"keywords": ["log", "audit"], "tasks": ["Log operations"], "libraries": ["logging"]},
+    {"keywords": ["file", "folder", "directory"], "tasks": ["Read file", "Write file", "Handle errors"], "libraries": ["os"], "input": "Files"},
+    {"keywords": ["report", "export", "summary"], "tasks": ["Generate report"], "libraries": [], "output": "Report"},
+    {"keywords": ["sort", "rank*"], "tasks": ["Sort and rank results"], "libraries": []},
+    {"keywords": ["search", "filter", "lookup"], "tasks": ["Search and filter records"], "libraries": []},
+    {"keywords": ["image", "photo", "picture", "resize"], "tasks": ["Load image", "Transform image"], "libraries": ["pillow"], "input": "Images"},
+    {"keywords": ["concurren*", "parallel", "async", "thread"], "tasks": ["Run work concurrently"], "libraries": ["concurrent.futures"]},
+    {"keywords": ["gui", "window", "button", "tkinter"], "tasks": ["Build user interface"], "libraries": ["tkinter"], "input": "User interaction"},
+    {"keywords": ["password", "encrypt*", "hash", "secure"], "tasks": ["Protect sensitive data"], "libraries": ["hashlib", "secrets"]},
+    {"keywords": ["unit test", "pytest"], "tasks": ["Write unit tests"], "libraries": ["pytest"]}
+]
+
 # Default Prompts
 REQUIREMENT_PROMPT = """
 Analyze the following software requirement and break it down into:
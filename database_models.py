@@ -1,6 +1,7 @@
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Boolean, pool
+from contextlib import contextmanager
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Boolean, Index, event, inspect, text, pool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 
@@ -10,7 +11,8 @@ DATABASE_URL = os.environ.get(
     "sqlite:///./sasds.db"
 )
 
-# Use StaticPool for SQLite, QueuePool with better settings for PostgreSQL
+# QueuePool for both backends: every unit of work checks out its own
+# connection, so concurrent Streamlit sessions no longer share one.
 if "postgresql" in DATABASE_URL:
     engine = create_engine(
         DATABASE_URL,
@@ -21,15 +23,32 @@ if "postgresql" in DATABASE_URL:
         pool_recycle=3600,   # Recycle connections every hour
         connect_args={"connect_timeout": 10}
     )
-else:
-    # SQLite with StaticPool to avoid connection issues
+elif DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+    # An in-memory database only exists on a single connection
     engine = create_engine(
-        "sqlite:///./sasds.db",
+        DATABASE_URL,
         connect_args={"check_same_thread": False},
         poolclass=pool.StaticPool
     )
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": 30},
+        poolclass=pool.QueuePool,
+        pool_size=5,
+        max_overflow=10
+    )
+    
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        """Enable WAL so readers do not block the writer"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
 class ChatSession(Base):
@@ -39,7 +58,17 @@ class ChatSession(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    # Denormalized counters maintained by ChatManager.add_message so the
+    # sidebar never has to touch chat_messages
+    message_count = Column(Integer, default=0, nullable=False)
+    last_message_at = Column(DateTime, nullable=True)
+    
+    # Rolling summary of the conversation up to summary_through_id, maintained
+    # by ChatMemory so prompts never need the full transcript
+    summary = Column(Text, nullable=True)
+    summary_through_id = Column(Integer, default=0, nullable=False)
     
     # Relationships
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
@@ -48,6 +77,10 @@ class ChatSession(Base):
 class ChatMessage(Base):
     """Represents individual messages in a chat session"""
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Message pages are keyed by id within a session
+        Index("ix_chat_messages_session_id_id", "session_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"), index=True)
@@ -125,13 +158,104 @@ class UploadedFile(Base):
     filename = Column(String(255))
     file_path = Column(String(500))
     file_type = Column(String(50))
+    content_hash = Column(String(64), index=True)  # SHA-256 of the stored bytes
+    size_bytes = Column(Integer)
+    extracted_text = Column(Text, nullable=True)  # Cached by DocumentExtractor, shared by equal hashes
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     project = relationship("Project", back_populates="uploaded_files")
 
+class AnalysisFingerprint(Base):
+    """Stores a past LLM analysis keyed by its normalized requirement, for reuse on similar requirements"""
+    __tablename__ = "analysis_fingerprints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    text_hash = Column(String(64), index=True)  # SHA-256 of normalized_text
+    requirement = Column(Text)
+    normalized_text = Column(Text)
+    analysis = Column(Text)  # JSON
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    bands = relationship("AnalysisFingerprintBand", back_populates="fingerprint", cascade="all, delete-orphan")
+
+class AnalysisFingerprintBand(Base):
+    """One MinHash LSH band of a fingerprint; requirements sharing a band are reuse candidates"""
+    __tablename__ = "analysis_fingerprint_bands"
+    __table_args__ = (
+        Index("ix_analysis_fingerprint_bands_key", "band_key", "fingerprint_id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    fingerprint_id = Column(Integer, ForeignKey("analysis_fingerprints.id"), index=True)
+    band_key = Column(BigInteger, nullable=False)
+    
+    # Relationships
+    fingerprint = relationship("AnalysisFingerprint", back_populates="bands")
+
+class TokenUsage(Base):
+    """Stores token counts and latency of each LLM call"""
+    __tablename__ = "token_usage"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    stage = Column(String(50), index=True)  # analysis, generation, review, ...
+    model = Column(String(100))
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    estimated = Column(Boolean, default=True)  # False when the provider reported the counts
+    latency_ms = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+# Columns added after the first release. create_all() never alters existing
+# tables, so these are added in place on startup.
+ADDED_COLUMNS = {
+    "chat_sessions": {
+        "message_count": "INTEGER NOT NULL DEFAULT 0",
+        "last_message_at": "TIMESTAMP",
+        "summary": "TEXT",
+        "summary_through_id": "INTEGER NOT NULL DEFAULT 0",
+    },
+    "uploaded_files": {
+        "content_hash": "VARCHAR(64)",
+        "size_bytes": "INTEGER",
+        "extracted_text": "TEXT",
+    },
+}
+
+def _migrate_schema():
+    """Add missing columns and indexes to tables created by older versions"""
+    inspector = inspect(engine)
+    added = set()
+    
+    with engine.begin() as conn:
+        for table_name, columns in ADDED_COLUMNS.items():
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            for column_name, ddl in columns.items():
+                if column_name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}"))
+                    added.add((table_name, column_name))
+        
+        if ("chat_sessions", "message_count") in added:
+            # Backfill counters for sessions created before they existed
+            conn.execute(text(
+                "UPDATE chat_sessions SET "
+                "message_count = (SELECT COUNT(*) FROM chat_messages WHERE chat_messages.session_id = chat_sessions.id), "
+                "last_message_at = (SELECT MAX(timestamp) FROM chat_messages WHERE chat_messages.session_id = chat_sessions.id)"
+            ))
+        
+        # Replaced by ix_chat_messages_session_id_id; no query reads messages by timestamp
+        conn.execute(text("DROP INDEX IF EXISTS ix_chat_messages_session_timestamp"))
+    
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 # Create all tables
 Base.metadata.create_all(bind=engine)
+_migrate_schema()
 
 def get_db():
     """Dependency for getting database session"""
@@ -140,3 +264,20 @@ def get_db():
         yield db
     finally:
         db.close()
+
+@contextmanager
+def session_scope():
+    """
+    Provide a session for one unit of work.
+    Commits on success, rolls back on error and always closes,
+    returning the connection to the pool.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+import numpy as np
+from config import ANALYSIS_REUSE_CONFIG
+from database_models import session_scope, AnalysisFingerprint, AnalysisFingerprintBand
+from modules.retrieval import tokenize
+
+# Mersenne prime for the universal hash family a * x + b mod P
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+SUFFIXES = ("ations", "ation", "ings", "ing", "ed", "s")
+
+def normalize_requirement(requirement: str) -> str:
+    """
+    Reduce a requirement to its sorted, stemmed content words, so rewordings
+    that differ only in filler words, inflection or order normalize alike
+    """
+    text = unicodedata.normalize("NFKC", requirement)
+    return " ".join(sorted({_stem(token) for token in tokenize(text) if len(token) > 1}))
+
+def _stem(token: str) -> str:
+    """Strip one common English suffix and a final e (analyzes, analyzed, analyze -> analyz)"""
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+    return token[:-1] if token.endswith("e") and len(token) > 3 else token
+
+class AnalysisReuseIndex:
+    """MinHash LSH index over past requirement analyses, stored in the database"""
+    
+    def __init__(self, num_permutations: Optional[int] = None, band_rows: Optional[int] = None):
+        self.num_permutations = num_permutations or ANALYSIS_REUSE_CONFIG["num_permutations"]
+        self.band_rows = band_rows or ANALYSIS_REUSE_CONFIG["band_rows"]
+        self.threshold = ANALYSIS_REUSE_CONFIG["similarity_threshold"]
+        self.max_candidates = ANALYSIS_REUSE_CONFIG["max_candidates"]
+        
+        # Fixed seed: signatures must stay comparable with stored band keys
+        rng = np.random.default_rng(20240611)
+        self.a = rng.integers(1, 1 << 31, self.num_permutations, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, self.num_permutations, dtype=np.uint64)
+    
+    def signature(self, words: Set[str]) -> np.ndarray:
+        """MinHash signature of a word set"""
+        if not words:
+            return np.zeros(self.num_permutations, dtype=np.uint64)
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest(), "big") for word in words],
+            dtype=np.uint64
+        )
+        # (permutations x words) matrix of hashed values, minimum per permutation
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME
+        return permuted.min(axis=1)
+    
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """One 63-bit key per LSH band"""
+        keys = []
+        for band, start in enumerate(range(0, self.num_permutations, self.band_rows)):
+            digest = hashlib.blake2b(
+                band.to_bytes(2, "big") + signature[start:start + self.band_rows].tobytes(),
+                digest_size=8
+            ).digest()
+            keys.append(int.from_bytes(digest, "big") >> 1)
+        return keys
+    
+    def find_similar(self, requirement: str) -> Optional[Dict]:
+        """
+        Find the stored analysis of the most similar past requirement
+        
+        Args:
+            requirement: New requirement text
+        
+        Returns:
+            Dictionary with id, requirement, analysis and similarity, or
+            None when no stored requirement reaches the similarity threshold
+        """
+        
+        normalized = normalize_requirement(requirement)
+        words = set(normalized.split())
+        if not words:
+            return None
+        
+        keys = self.band_keys(self.signature(words))
+        
+        with session_scope() as db:
+            candidates = db.query(
+                AnalysisFingerprint.id,
+                AnalysisFingerprint.requirement,
+                AnalysisFingerprint.normalized_text,
+                AnalysisFingerprint.analysis
+            ).filter(
+                AnalysisFingerprint.id.in_(
+                    db.query(AnalysisFingerprintBand.fingerprint_id).filter(
+                        AnalysisFingerprintBand.band_key.in_(keys)
+                    ).distinct()
+                )
+            ).order_by(AnalysisFingerprint.id.desc()).limit(self.max_candidates).all()
+        
+        best = None
+        for candidate in candidates:
+            candidate_words = set(candidate.normalized_text.split())
+            similarity = len(words & candidate_words) / len(words | candidate_words)
+            if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                best = {
+                    "id": candidate.id,
+                    "requirement": candidate.requirement,
+                    "analysis": json.loads(candidate.analysis),
+                    "similarity": similarity
+                }
+        return best
+    
+    def record_hit(self, fingerprint_id: int):
+        """Count a reuse of a stored analysis"""
+        with session_scope() as db:
+            db.query(AnalysisFingerprint).filter(AnalysisFingerprint.id == fingerprint_id).update({
+                AnalysisFingerprint.hit_count: AnalysisFingerprint.hit_count + 1,
+                AnalysisFingerprint.last_used_at: datetime.utcnow()
+            }, synchronize_session=False)
+    
+    def remember(self, requirement: str, analysis: Dict):
+        """Store an LLM analysis so similar requirements can reuse it"""
+        normalized = normalize_requirement(requirement)
+        if not normalized:
+            return
+        text_hash = hashlib.sha256(normalized.encode()).hexdigest()
+        
+        with session_scope() as db:
+            existing = db.query(AnalysisFingerprint).filter(AnalysisFingerprint.text_hash == text_hash).first()
+            if existing:
+                # Same normalized requirement: keep only the latest analysis
+                existing.requirement = requirement
+                existing.analysis = json.dumps(analysis)
+                return
+            
+            fingerprint = AnalysisFingerprint(
+                text_hash=text_hash,
+                requirement=requirement,
+                normalized_text=normalized,
+                analysis=json.dumps(analysis)
+            )
+            fingerprint.bands = [
+                AnalysisFingerprintBand(band_key=key)
+                for key in self.band_keys(self.signature(set(normalized.split())))
+            ]
+            db.add(fingerprint)
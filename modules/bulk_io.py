@@ -0,0 +1,260 @@
+import argparse
+import gzip
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+from sqlalchemy import insert, select, text, DateTime
+from database_models import engine, Base
+from modules.cache import list_cache
+from modules.chat_manager import get_chat_writer
+from modules.storage import ProjectStorage
+
+# Tables written by ProjectStorage (projects.db), parents before children
+STORAGE_TABLES = ["projects", "code_versions", "test_results", "review_reports"]
+
+# Tables owned by the SQLAlchemy models, parents before children
+DATABASE_TABLES = ["chat_sessions", "chat_messages", "uploaded_files"]
+
+BATCH_SIZE = 1000
+
+class BulkIO:
+    """Streams every project and chat session out to JSONL/Parquet and back in with batched inserts"""
+    
+    def __init__(self, project_db_path: str = "projects.db", batch_size: int = BATCH_SIZE):
+        self.project_db_path = project_db_path
+        self.batch_size = batch_size
+    
+    def iter_batches(self) -> Iterator[Tuple[str, str, List[Dict]]]:
+        """
+        Yield (source, table, rows) batches for every exported table.
+        Only one batch per table is held in memory at a time.
+        """
+        
+        # Queued writes would otherwise be missing from the export
+        get_chat_writer().flush()
+        ProjectStorage(self.project_db_path).flush()
+        
+        with sqlite3.connect(self.project_db_path) as conn:
+            for table in STORAGE_TABLES:
+                cursor = conn.execute(f"SELECT * FROM {table} ORDER BY id")
+                columns = [description[0] for description in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    yield "storage", table, [dict(zip(columns, row)) for row in rows]
+        
+        with engine.connect() as conn:
+            for table_name in DATABASE_TABLES:
+                table = Base.metadata.tables[table_name]
+                result = conn.execution_options(yield_per=self.batch_size).execute(
+                    select(table).order_by(table.c.id)
+                )
+                for partition in result.mappings().partitions():
+                    yield "database", table_name, [_serialize(dict(row)) for row in partition]
+    
+    def export_jsonl(self, output_path: str) -> Dict[str, int]:
+        """
+        Export everything to one JSONL file (gzip-compressed if the path ends in .gz)
+        
+        Returns:
+            Row counts per table
+        """
+        
+        counts = {}
+        with _open_text(output_path, "wt") as output:
+            for source, table, rows in self.iter_batches():
+                for row in rows:
+                    output.write(json.dumps({"source": source, "table": table, "row": row}) + "\n")
+                counts[table] = counts.get(table, 0) + len(rows)
+        return counts
+    
+    def export_parquet(self, output_dir: str) -> Dict[str, int]:
+        """
+        Export everything to one Parquet file per table, written one row group per batch
+        
+        Returns:
+            Row counts per table
+        """
+        
+        pq, pa = _require_pyarrow()
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        
+        counts = {}
+        writers = {}
+        try:
+            for source, table, rows in self.iter_batches():
+                key = f"{source}.{table}"
+                if key not in writers:
+                    schema = self._arrow_schema(pa, source, table)
+                    writers[key] = pq.ParquetWriter(str(Path(output_dir) / f"{key}.parquet"), schema)
+                writers[key].write_table(pa.Table.from_pylist(rows, schema=writers[key].schema))
+                counts[table] = counts.get(table, 0) + len(rows)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        return counts
+    
+    def _arrow_schema(self, pa, source: str, table_name: str):
+        """Build a fixed Arrow schema so all-null columns in the first batch keep their type"""
+        if source == "storage":
+            with sqlite3.connect(self.project_db_path) as conn:
+                columns = [(row[1], row[2].upper()) for row in conn.execute(f"PRAGMA table_info({table_name})")]
+        else:
+            columns = [(column.name, str(column.type).upper()) for column in Base.metadata.tables[table_name].columns]
+        
+        fields = []
+        for name, declared_type in columns:
+            if "INT" in declared_type:
+                arrow_type = pa.int64()
+            elif "BOOL" in declared_type:
+                arrow_type = pa.bool_()
+            else:
+                # Text and timestamps (exported as ISO strings)
+                arrow_type = pa.string()
+            fields.append(pa.field(name, arrow_type))
+        return pa.schema(fields)
+    
+    def import_jsonl(self, input_path: str, skip_existing: bool = True) -> Dict[str, int]:
+        """
+        Import a JSONL export with batched inserts, keeping original ids
+        
+        Args:
+            input_path: File written by export_jsonl
+            skip_existing: Ignore rows whose id already exists instead of failing
+        
+        Returns:
+            Row counts per table
+        """
+        
+        def batches() -> Iterator[Tuple[str, str, List[Dict]]]:
+            current_key, rows = None, []
+            with _open_text(input_path, "rt") as source_file:
+                for line in source_file:
+                    record = json.loads(line)
+                    key = (record["source"], record["table"])
+                    if key != current_key or len(rows) >= self.batch_size:
+                        if rows:
+                            yield current_key[0], current_key[1], rows
+                        current_key, rows = key, []
+                    rows.append(record["row"])
+            if rows:
+                yield current_key[0], current_key[1], rows
+        
+        return self._import_batches(batches(), skip_existing)
+    
+    def import_parquet(self, input_dir: str, skip_existing: bool = True) -> Dict[str, int]:
+        """Import a Parquet export directory with batched inserts, keeping original ids"""
+        
+        pq, _ = _require_pyarrow()
+        
+        def batches() -> Iterator[Tuple[str, str, List[Dict]]]:
+            for source, tables in [("storage", STORAGE_TABLES), ("database", DATABASE_TABLES)]:
+                for table in tables:
+                    path = Path(input_dir) / f"{source}.{table}.parquet"
+                    if not path.exists():
+                        continue
+                    for batch in pq.ParquetFile(str(path)).iter_batches(batch_size=self.batch_size):
+                        yield source, table, batch.to_pylist()
+        
+        return self._import_batches(batches(), skip_existing)
+    
+    def _import_batches(self, batches: Iterator[Tuple[str, str, List[Dict]]], skip_existing: bool) -> Dict[str, int]:
+        """Insert batches into the store each table belongs to"""
+        
+        counts = {}
+        ProjectStorage(self.project_db_path)  # make sure the tables exist
+        
+        with sqlite3.connect(self.project_db_path) as storage_conn, engine.begin() as conn:
+            for source, table_name, rows in batches:
+                if source == "storage":
+                    columns = list(rows[0].keys())
+                    verb = "INSERT OR IGNORE" if skip_existing else "INSERT"
+                    storage_conn.executemany(
+                        f"{verb} INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                        [[row.get(column) for column in columns] for row in rows]
+                    )
+                else:
+                    table = Base.metadata.tables[table_name]
+                    conn.execute(_insert_statement(table, skip_existing), [_deserialize(table, row) for row in rows])
+                counts[table_name] = counts.get(table_name, 0) + len(rows)
+            
+            storage_conn.commit()
+            
+            if engine.dialect.name == "postgresql":
+                # Explicit ids leave the serial sequences behind
+                for table_name in DATABASE_TABLES:
+                    conn.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {table_name}), 1))"
+                    ))
+        
+        list_cache.clear()
+        return counts
+
+def _insert_statement(table, skip_existing: bool):
+    """Build a bulk insert, ignoring id conflicts when requested"""
+    if not skip_existing:
+        return insert(table)
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table).on_conflict_do_nothing(index_elements=["id"])
+    return insert(table).prefix_with("OR IGNORE")
+
+def _serialize(row: Dict) -> Dict:
+    """Make a database row JSON/Arrow friendly"""
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+def _deserialize(table, row: Dict) -> Dict:
+    """Convert exported values back to column types, dropping unknown columns"""
+    values = {}
+    for column in table.columns:
+        if column.name not in row:
+            continue
+        value = row[column.name]
+        if isinstance(column.type, DateTime) and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        values[column.name] = value
+    return values
+
+def _open_text(path: str, mode: str):
+    """Open a text file, transparently gzip-compressed when it ends in .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode.replace("t", ""), encoding="utf-8")
+
+def _require_pyarrow():
+    """Import pyarrow, which is only needed for Parquet"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export/import requires pyarrow. Run: pip install pyarrow")
+    return pq, pa
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Bulk export/import of SASDS projects and chat sessions")
+    parser.add_argument("--project-db", default="projects.db", help="ProjectStorage database path")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    for command in ["export", "import"]:
+        command_parser = subparsers.add_parser(command)
+        command_parser.add_argument("path", help="JSONL file (.jsonl or .jsonl.gz) or Parquet directory")
+        command_parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    
+    args = parser.parse_args()
+    bulk = BulkIO(args.project_db, args.batch_size)
+    
+    if args.command == "export":
+        counts = bulk.export_parquet(args.path) if args.format == "parquet" else bulk.export_jsonl(args.path)
+    else:
+        counts = bulk.import_parquet(args.path) if args.format == "parquet" else bulk.import_jsonl(args.path)
+    
+    print(json.dumps(counts, indent=2))
+
+if __name__ == "__main__":
+    main()
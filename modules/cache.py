@@ -0,0 +1,72 @@
+import copy
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+from config import CACHE_CONFIG
+
+class ReadThroughCache:
+    """
+    Thread-safe read-through cache for list views.
+    
+    Keys are tuples whose first element is a namespace, so writers can drop
+    every cached page of one list (e.g. all sidebar pages) without touching
+    the others. A load that races with an invalidation of its namespace is
+    returned to its caller but never stored, so stale rows cannot be cached.
+    """
+    
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple, Tuple[float, Any]] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+    
+    def get_or_load(self, key: Tuple, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, calling loader on a miss"""
+        namespace = key[0]
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return copy.deepcopy(entry[1])
+            generation = self._generations.get(namespace, 0)
+        
+        value = loader()
+        
+        with self._lock:
+            if self._generations.get(namespace, 0) == generation:
+                if len(self._entries) >= self.max_entries:
+                    self._evict(now)
+                self._entries[key] = (now + self.ttl_seconds, value)
+        
+        # Callers (e.g. st.session_state) may mutate what they get back
+        return copy.deepcopy(value)
+    
+    def invalidate(self, namespace: Hashable):
+        """Drop every entry in a namespace"""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+    
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            for namespace in {key[0] for key in self._entries}:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            self._entries.clear()
+    
+    def _evict(self, now: float):
+        """Remove expired entries, then the oldest ones if still full (lock held)"""
+        for key in [key for key, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            oldest = min(self._entries, key=lambda key: self._entries[key][0])
+            del self._entries[oldest]
+
+# Shared by every Streamlit session in this process
+list_cache = ReadThroughCache(
+    ttl_seconds=CACHE_CONFIG["list_ttl_seconds"],
+    max_entries=CACHE_CONFIG["max_entries"]
+)
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict
+
+class CassetteMiss(KeyError):
+    """Replay found no recorded response for a prompt"""
+
+def cassette_key(stage: str, prompt: str) -> str:
+    """Hash identifying a prompt of a stage on the cassette"""
+    return hashlib.sha256(f"{stage}\0{prompt}".encode("utf-8")).hexdigest()
+
+class Cassette:
+    """
+    LLM prompt/response pairs recorded from a live provider, stored as JSON lines
+    
+    Responses are keyed by stage and prompt hash. A prompt answered several
+    times while recording is replayed in the same order, repeating the last
+    response once they run out. Every recorded response is appended to the
+    file as one line, so an interrupted recording keeps what it captured.
+    """
+    
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict] = {}
+        self._positions: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self._needs_newline = False
+        
+        if self.path.exists():
+            try:
+                self._load()
+            except (OSError, ValueError) as e:
+                print(f"Error loading cassette {self.path}: {str(e)}")
+    
+    def record(self, stage: str, model: str, prompt: str, text: str, latency_ms: float):
+        """
+        Append a live response to the cassette
+        
+        Args:
+            stage: Pipeline stage
+            model: Model that answered
+            prompt: Prompt text
+            text: Response text
+            latency_ms: How long the model took, replayed as simulated latency
+        """
+        key = cassette_key(stage, prompt)
+        with self.lock:
+            entry = self.entries.setdefault(key, {"stage": stage, "prompt_preview": prompt.strip()[:200], "responses": []})
+            response = {"model": model, "text": text, "latency_ms": int(latency_ms)}
+            entry["responses"].append(response)
+            try:
+                self._append(key, entry, response)
+            except OSError as e:
+                print(f"Error saving cassette {self.path}: {str(e)}")
+    
+    def play(self, stage: str, prompt: str) -> Dict:
+        """
+        Next recorded response for a prompt
+        
+        Returns:
+            Dict with model, text and latency_ms
+        
+        Raises:
+            CassetteMiss if the prompt was never recorded
+        """
+        key = cassette_key(stage, prompt)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                raise CassetteMiss(f"No recorded {stage} response for this prompt ({key[:12]}) in {self.path}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return entry["responses"][min(position, len(entry["responses"]) - 1)]
+    
+    def rewind(self):
+        """Replay every prompt's responses from the first one again"""
+        with self.lock:
+            self._positions.clear()
+    
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            content = f.read()
+        
+        # Appends must not run on from a partial last line
+        self._needs_newline = bool(content) and not content.endswith("\n")
+        
+        for number, line in enumerate(content.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A recording interrupted mid-write leaves a partial last line
+                print(f"Skipping unreadable line {number} of cassette {self.path}")
+                continue
+            entry = self.entries.setdefault(record["key"], {"stage": record["stage"], "prompt_preview": record["prompt_preview"], "responses": []})
+            entry["responses"].append({"model": record["model"], "text": record["text"], "latency_ms": record["latency_ms"]})
+    
+    def _append(self, key: str, entry: Dict, response: Dict):
+        line = json.dumps({"key": key, "stage": entry["stage"], "prompt_preview": entry["prompt_preview"], **response})
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(("\n" if self._needs_newline else "") + line + "\n")
+        self._needs_newline = False
@@ -1,76 +1,269 @@
+import threading
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict
-from database_models import SessionLocal, ChatSession, ChatMessage
+from typing import List, Dict, Optional
+from config import WRITE_BEHIND_CONFIG
+from database_models import session_scope, ChatSession, ChatMessage
+from modules.cache import list_cache
+from modules.write_behind import WriteBehindQueue
+
+SESSIONS_CACHE = "chat_sessions"
+
+# One writer per process: app.py re-creates ChatManager on every rerun
+_writer = None
+_writer_lock = threading.Lock()
+
+def _apply_chat_writes(batch: List[tuple]):
+    """Apply queued chat writes in a single transaction"""
+    receipts = []
+    with session_scope() as db:
+        new_messages = Counter()
+        last_message_at = {}
+        
+        for operation in batch:
+            if operation[0] == "message":
+                _, session_id, role, content, timestamp, receipt = operation
+                message = ChatMessage(
+                    session_id=session_id,
+                    role=role,
+                    content=content,
+                    timestamp=timestamp
+                )
+                db.add(message)
+                if receipt is not None:
+                    receipts.append((receipt, message))
+                new_messages[session_id] += 1
+                last_message_at[session_id] = max(timestamp, last_message_at.get(session_id, timestamp))
+            elif operation[0] == "summary":
+                _, session_id, summary, through_id = operation
+                db.query(ChatSession).filter(ChatSession.id == session_id).update({
+                    ChatSession.summary: summary,
+                    ChatSession.summary_through_id: through_id
+                }, synchronize_session=False)
+            elif operation[0] == "title":
+                _, session_id, title = operation
+                db.query(ChatSession).filter(ChatSession.id == session_id).update(
+                    {ChatSession.title: title}, synchronize_session=False
+                )
+        
+        # Keep the sidebar counters in the same transaction as the inserts
+        for session_id, count in new_messages.items():
+            db.query(ChatSession).filter(ChatSession.id == session_id).update({
+                ChatSession.message_count: ChatSession.message_count + count,
+                ChatSession.last_message_at: last_message_at[session_id],
+                ChatSession.updated_at: last_message_at[session_id]
+            }, synchronize_session=False)
+        
+        db.flush()
+        ids = [(receipt, message.id) for receipt, message in receipts]
+    
+    # Only handed out once the transaction has committed
+    for receipt, message_id in ids:
+        receipt["id"] = message_id
+
+def get_chat_writer() -> WriteBehindQueue:
+    """Return the process-wide write-behind queue for chat writes"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindQueue(
+                _apply_chat_writes,
+                max_batch_size=WRITE_BEHIND_CONFIG["max_batch_size"],
+                flush_interval_seconds=WRITE_BEHIND_CONFIG["flush_interval_seconds"],
+                synchronous=WRITE_BEHIND_CONFIG["durability"] == "sync",
+                max_attempts=WRITE_BEHIND_CONFIG["max_attempts"],
+                name="chat-writer"
+            )
+        return _writer
 
 class ChatManager:
     """Manages chat sessions and message history"""
     
     def __init__(self):
-        self.db = SessionLocal()
+        self.writer = get_chat_writer()
     
     def create_session(self, title: str = "New Chat") -> int:
         """Create a new chat session"""
-        session = ChatSession(title=title)
-        self.db.add(session)
-        self.db.commit()
-        self.db.refresh(session)
-        return session.id
+        with session_scope() as db:
+            session = ChatSession(title=title)
+            db.add(session)
+            db.flush()
+            session_id = session.id
+        
+        list_cache.invalidate(SESSIONS_CACHE)
+        return session_id
     
-    def add_message(self, session_id: int, role: str, content: str):
-        """Add a message to a chat session"""
-        message = ChatMessage(
-            session_id=session_id,
-            role=role,
-            content=content,
-            timestamp=datetime.utcnow()
-        )
-        self.db.add(message)
-        self.db.commit()
-        return message.id
+    def add_message(self, session_id: int, role: str, content: str, wait: bool = False) -> Optional[int]:
+        """
+        Add a message to a chat session
+        
+        Args:
+            session_id: Chat session id
+            role: Message role
+            content: Message text
+            wait: Write the message now and return its id. By default it is
+                only queued and written with the next batch
+        
+        Returns:
+            Message id with wait=True (None if the write failed); None when queued
+        """
+        receipt = {} if wait else None
+        self.writer.submit(("message", session_id, role, content, datetime.utcnow(), receipt))
+        list_cache.invalidate(SESSIONS_CACHE)
+        if not wait:
+            return None
+        self.writer.flush()
+        return receipt.get("id")
+    
+    def flush(self):
+        """Write all queued messages and title updates now"""
+        self.writer.flush()
     
     def get_session_messages(self, session_id: int) -> List[Dict]:
         """Get all messages in a session"""
-        session = self.db.query(ChatSession).filter(ChatSession.id == session_id).first()
-        if not session:
-            return []
+        self.flush()
+        with session_scope() as db:
+            messages = db.query(ChatMessage).filter(
+                ChatMessage.session_id == session_id
+            ).order_by(ChatMessage.id).all()
+            
+            return [self._message_to_dict(msg) for msg in messages]
+    
+    def get_messages_page(self, session_id: int, before_id: Optional[int] = None, limit: int = 30) -> Dict:
+        """
+        Get one page of messages, newest first
+        
+        Args:
+            session_id: Chat session id
+            before_id: Cursor, only messages older than this id are returned
+            limit: Page size
         
-        messages = []
-        for msg in session.messages:
-            messages.append({
-                "role": msg.role,
-                "content": msg.content,
-                "timestamp": msg.timestamp.isoformat()
-            })
-        return messages
+        Returns:
+            Dictionary with the page's messages (newest first) and the cursor
+            for the next older page, or None when there are no older messages
+        """
+        self.flush()
+        with session_scope() as db:
+            query = db.query(ChatMessage).filter(ChatMessage.session_id == session_id)
+            if before_id is not None:
+                query = query.filter(ChatMessage.id < before_id)
+            
+            # Fetch one extra row to know whether an older page exists
+            rows = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+            messages = [self._message_to_dict(msg) for msg in rows[:limit]]
+        
+        return {
+            "messages": messages,
+            "next_before_id": messages[-1]["id"] if len(rows) > limit else None
+        }
+    
+    def get_messages_after(self, session_id: int, after_id: int) -> List[Dict]:
+        """Get messages newer than after_id, oldest first"""
+        self.flush()
+        with session_scope() as db:
+            messages = db.query(ChatMessage).filter(
+                ChatMessage.session_id == session_id,
+                ChatMessage.id > after_id
+            ).order_by(ChatMessage.id).all()
+            
+            return [self._message_to_dict(msg) for msg in messages]
     
-    def get_all_sessions(self) -> List[Dict]:
-        """Get all chat sessions (for sidebar)"""
-        sessions = self.db.query(ChatSession).order_by(ChatSession.updated_at.desc()).all()
+    def _message_to_dict(self, msg: ChatMessage) -> Dict:
+        """Convert a message row to the dict shape used by the UI"""
+        return {
+            "id": msg.id,
+            "role": msg.role,
+            "content": msg.content,
+            "timestamp": msg.timestamp.isoformat()
+        }
+    
+    def get_all_sessions(
+        self,
+        limit: Optional[int] = None,
+        before_updated_at: Optional[str] = None,
+        before_id: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Get chat sessions for the sidebar, most recently updated first
+        
+        Args:
+            limit: Maximum number of sessions to return (all if None)
+            before_updated_at: Keyset cursor, the updated_at of the last session already shown
+            before_id: Keyset cursor, the id of the last session already shown
         
-        result = []
-        for session in sessions:
-            result.append({
-                "id": session.id,
-                "title": session.title,
-                "created_at": session.created_at.isoformat(),
-                "updated_at": session.updated_at.isoformat(),
-                "message_count": len(session.messages)
-            })
-        return result
+        Returns:
+            List of session summaries, read from the denormalized counters
+        """
+        return list_cache.get_or_load(
+            (SESSIONS_CACHE, limit, before_updated_at, before_id),
+            lambda: self._load_sessions(limit, before_updated_at, before_id)
+        )
+    
+    def _load_sessions(self, limit: Optional[int], before_updated_at: Optional[str], before_id: Optional[int]) -> List[Dict]:
+        """Query the sidebar session list"""
+        self.flush()
+        with session_scope() as db:
+            query = db.query(
+                ChatSession.id,
+                ChatSession.title,
+                ChatSession.created_at,
+                ChatSession.updated_at,
+                ChatSession.message_count,
+                ChatSession.last_message_at
+            )
+            
+            if before_updated_at is not None and before_id is not None:
+                cursor_time = datetime.fromisoformat(before_updated_at)
+                query = query.filter(
+                    (ChatSession.updated_at < cursor_time) |
+                    ((ChatSession.updated_at == cursor_time) & (ChatSession.id < before_id))
+                )
+            
+            query = query.order_by(ChatSession.updated_at.desc(), ChatSession.id.desc())
+            if limit is not None:
+                query = query.limit(limit)
+            
+            result = []
+            for row in query:
+                result.append({
+                    "id": row.id,
+                    "title": row.title,
+                    "created_at": row.created_at.isoformat(),
+                    "updated_at": row.updated_at.isoformat(),
+                    "message_count": row.message_count or 0,
+                    "last_message_at": row.last_message_at.isoformat() if row.last_message_at else None
+                })
+            return result
     
     def update_session_title(self, session_id: int, title: str):
-        """Update session title"""
-        session = self.db.query(ChatSession).filter(ChatSession.id == session_id).first()
-        if session:
-            session.title = title
-            self.db.commit()
+        """Queue a session title update"""
+        self.writer.submit(("title", session_id, title))
+        list_cache.invalidate(SESSIONS_CACHE)
+    
+    def get_summary(self, session_id: int) -> Dict:
+        """Stored conversation summary and the id of the last message it covers"""
+        self.flush()
+        with session_scope() as db:
+            row = db.query(ChatSession.summary, ChatSession.summary_through_id).filter(
+                ChatSession.id == session_id
+            ).first()
+        
+        if not row:
+            return {"summary": "", "through_id": 0}
+        return {"summary": row.summary or "", "through_id": row.summary_through_id or 0}
+    
+    def save_summary(self, session_id: int, summary: str, through_id: int):
+        """Queue a conversation summary update"""
+        self.writer.submit(("summary", session_id, summary, through_id))
     
     def delete_session(self, session_id: int):
         """Delete a chat session"""
-        session = self.db.query(ChatSession).filter(ChatSession.id == session_id).first()
-        if session:
-            self.db.delete(session)
-            self.db.commit()
-    
-    def __del__(self):
-        self.db.close()
+        self.flush()
+        with session_scope() as db:
+            session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+            if session:
+                # Bulk delete instead of letting the ORM cascade load every message
+                db.query(ChatMessage).filter(ChatMessage.session_id == session_id).delete(synchronize_session=False)
+                db.delete(session)
+        
+        list_cache.invalidate(SESSIONS_CACHE)
@@ -0,0 +1,81 @@
+from typing import Callable, Dict, List, Optional
+from config import CHAT_MEMORY_CONFIG
+from modules.prompt_builder import PromptBuilder
+
+def extractive_summary(previous: str, messages: List[Dict]) -> str:
+    """
+    Summary without an LLM: the previous summary plus the first line of each
+    new message, trimmed from the oldest end to the summary budget
+    """
+    lines = [previous] if previous else []
+    for message in messages:
+        first_line = message["content"].strip().split("\n")[0][:200]
+        lines.append(f"{message['role']}: {first_line}")
+    
+    builder = PromptBuilder(CHAT_MEMORY_CONFIG["max_summary_tokens"])
+    builder.add("summary", "\n".join(lines), 0, keep="tail")
+    return builder.build()
+
+class ChatMemory:
+    """
+    Rolling per-session conversation memory stored with the chat session
+    
+    Prompts get the stored summary plus the messages after it, which are
+    never more than recent_messages + summarize_every, so prompt size stays
+    constant however long the conversation runs.
+    """
+    
+    def __init__(self, chat_manager, summarize: Optional[Callable[[str, List[Dict]], str]] = None):
+        """
+        Args:
+            chat_manager: ChatManager used to read messages and store summaries
+            summarize: (previous summary, new messages) -> new summary; an
+                extractive summary is used when it is missing or fails
+        """
+        self.chat_manager = chat_manager
+        self.summarize = summarize
+    
+    def context(self, session_id: int) -> str:
+        """Summary plus recent messages, formatted for a prompt"""
+        stored = self.chat_manager.get_summary(session_id)
+        recent = self.chat_manager.get_messages_after(session_id, stored["through_id"])
+        
+        parts = []
+        if stored["summary"]:
+            parts.append(f"Summary of the earlier conversation:\n{stored['summary']}")
+        if recent:
+            limit = CHAT_MEMORY_CONFIG["max_message_chars"]
+            parts.append("Recent messages:\n" + "\n".join(
+                f"{message['role']}: {message['content'][:limit]}" for message in recent
+            ))
+        return "\n\n".join(parts)
+    
+    def update(self, session_id: int) -> bool:
+        """
+        Fold messages older than the recent window into the summary once
+        enough of them have accumulated
+        
+        Returns:
+            True if the summary was updated
+        """
+        stored = self.chat_manager.get_summary(session_id)
+        pending = self.chat_manager.get_messages_after(session_id, stored["through_id"])
+        
+        fold = len(pending) - CHAT_MEMORY_CONFIG["recent_messages"]
+        if fold < CHAT_MEMORY_CONFIG["summarize_every"]:
+            return False
+        
+        messages = pending[:fold]
+        summary = None
+        if self.summarize:
+            try:
+                summary = self.summarize(stored["summary"], messages)
+            except Exception as e:
+                print(f"Error summarizing conversation: {str(e)}")
+        
+        self.chat_manager.save_summary(
+            session_id,
+            summary or extractive_summary(stored["summary"], messages),
+            messages[-1]["id"]
+        )
+        return True
@@ -0,0 +1,149 @@
+import ast
+import hashlib
+import re
+import textwrap
+from typing import Dict, List, Optional, Tuple
+
+# Reply format of an incremental review: one fenced block per patched function
+PATCH_PATTERN = re.compile(r"^PATCH\s+([\w.]+)\s*\n```(?:python)?\n(.*?)```", re.MULTILINE | re.DOTALL)
+
+def function_map(code: str) -> Optional[Dict[str, Dict]]:
+    """
+    Top-level functions and class methods of a module, by qualified name
+    
+    Args:
+        code: Python source
+    
+    Returns:
+        Name -> dict with signature, source, lineno, end_lineno, indent and an
+        AST hash that ignores formatting and comments, or None if the code
+        does not parse
+    """
+    
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    
+    functions = {}
+    nodes = [(node, "") for node in tree.body]
+    for node, prefix in nodes:
+        if isinstance(node, ast.ClassDef) and not prefix:
+            nodes.extend((child, f"{node.name}.") for child in node.body)
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        
+        # Decorators belong to the function when it is replaced
+        start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        signature = f"def {node.name}({ast.unparse(node.args)})"
+        if node.returns:
+            signature += f" -> {ast.unparse(node.returns)}"
+        functions[prefix + node.name] = {
+            "signature": signature,
+            "source": "\n".join(code.split("\n")[start - 1:node.end_lineno]),
+            "lineno": start,
+            "end_lineno": node.end_lineno,
+            "indent": node.col_offset,
+            "hash": hashlib.sha256(ast.dump(node).encode()).hexdigest()
+        }
+    return functions
+
+def changed_functions(previous: str, current: str) -> Optional[List[str]]:
+    """
+    Functions added or modified in current compared with previous
+    
+    Returns:
+        Qualified names in source order, or None if either version does not parse
+    """
+    before = function_map(previous)
+    after = function_map(current)
+    if before is None or after is None:
+        return None
+    
+    return [
+        name for name, function in sorted(after.items(), key=lambda item: item[1]["lineno"])
+        if name not in before or before[name]["hash"] != function["hash"]
+    ]
+
+def module_outline(code: str) -> str:
+    """Imports, top-level assignments and every signature, without bodies"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return ""
+    
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.Assign, ast.AnnAssign)):
+            lines.append(ast.get_source_segment(code, node).split("\n")[0])
+        elif isinstance(node, ast.ClassDef):
+            lines.append(f"class {node.name}:")
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    lines.append(f"    def {child.name}({ast.unparse(child.args)}): ...")
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lines.append(f"def {node.name}({ast.unparse(node.args)}): ...")
+    return "\n".join(lines)
+
+def parse_patches(reply: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Split an incremental review reply into its summary and its patches
+    
+    Returns:
+        The text before the first patch, and qualified name -> function source
+    """
+    first = PATCH_PATTERN.search(reply)
+    summary = reply[:first.start()] if first else reply
+    return summary.strip(), {name: textwrap.dedent(source).strip("\n") for name, source in PATCH_PATTERN.findall(reply)}
+
+def apply_patches(code: str, patches: Dict[str, str]) -> Tuple[str, List[str], List[str]]:
+    """
+    Replace functions of a module with patched versions
+    
+    A patch for a name the module does not define is added as a new top-level
+    function before the entry-point guard. A patch that does not parse, or
+    that defines a different function, is rejected.
+    
+    Returns:
+        New code, applied names and rejected names
+    """
+    
+    functions = function_map(code)
+    if functions is None:
+        return code, [], list(patches)
+    
+    lines = code.split("\n")
+    replacements = []
+    additions = []
+    applied, rejected = [], []
+    for name, source in patches.items():
+        defined = function_map(source)
+        if not defined or list(defined) != [name.split(".")[-1]]:
+            rejected.append(name)
+            continue
+        
+        if name in functions:
+            function = functions[name]
+            replacements.append((function["lineno"], function["end_lineno"], textwrap.indent(source, " " * function["indent"])))
+        elif "." not in name:
+            additions.append(source)
+        else:
+            rejected.append(name)
+            continue
+        applied.append(name)
+    
+    # Bottom-up, so earlier line numbers stay valid
+    for start, end, source in sorted(replacements, reverse=True):
+        lines[start - 1:end] = source.split("\n")
+    
+    if additions:
+        guard = next((i for i, line in enumerate(lines) if line.startswith("if __name__")), len(lines))
+        block = [part for source in additions for part in (source, "", "")]
+        lines[guard:guard] = block
+    
+    patched = "\n".join(lines)
+    try:
+        ast.parse(patched)
+    except SyntaxError:
+        return code, [], list(patches)
+    return patched, applied, rejected
@@ -1,25 +1,47 @@
 import os
+import re
+import ast
+import sys
 import json
-from typing import Dict
-import google.generativeai as genai
+import keyword
+import importlib.util
+import contextvars
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from config import SNIPPET_CONFIG, MULTI_MODULE_CONFIG, PROMPT_BUDGET_CONFIG
+from modules.snippet_library import splice_snippets
+from modules.code_templates import render_code
+from modules.prompt_builder import PromptBuilder
+from modules.json_stream import parse_json_object
+from modules.deadlines import bounded_timeout
+from modules.model_router import get_router
 
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+def _is_importable(name: str) -> bool:
+    """Whether name is a standard library module or an installed package"""
+    if name in sys.stdlib_module_names:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
 
 class CodeGenerator:
     """Generates Python code based on analyzed requirements"""
     
-    def __init__(self):
-        self.model = genai.GenerativeModel("gemini-pro") if GEMINI_API_KEY else None
+    def __init__(self, snippets=None):
+        self.model = get_router().model_for("generation")
+        self.snippets = snippets if SNIPPET_CONFIG["enabled"] else None
     
-    def generate(self, analysis: Dict) -> str:
+    def generate(self, analysis: Dict, context: str = "") -> str:
         """
         Generate Python code based on analysis
         
         Args:
             analysis: Analysis result from RequirementAnalyzer
-            
+            context: Relevant excerpts from uploaded requirement documents
+        
         Returns:
             Generated Python code as string
         """
@@ -28,16 +50,25 @@ class CodeGenerator:
             return self._generate_template_code(analysis)
         
         libraries = ", ".join(analysis.get("libraries", ["os"]))
-        tasks = "\n".join([f"- {task}" for task in analysis.get("tasks", [])])
+        exact, related = self._find_snippets(analysis.get("tasks", []))
+        tasks = "\n".join([
+            f"- {task} (already implemented as {exact[task]['signature']}; call it, do not define it)" if task in exact else f"- {task}"
+            for task in analysis.get("tasks", [])
+        ])
         
-        prompt = f"""
-        Generate production-ready Python code that accomplishes the following tasks:
+        # Earlier tested snippets are worth more than raw document excerpts
+        builder = PromptBuilder(PROMPT_BUDGET_CONFIG["generation"])
+        builder.add("tasks", f"""Generate production-ready Python code that accomplishes the following tasks:
         
         {tasks}
         
-        Use these libraries: {libraries}
-        
-        Requirements:
+        Use these libraries: {libraries}""", 0)
+        if context:
+            builder.add("context", f"Relevant excerpts from the requirement documents:\n{context}", 2)
+        if related:
+            snippet_code = "\n\n".join(snippet["code"] for snippet in related)
+            builder.add("snippets", f"Tested functions from earlier projects; reuse them where they fit:\n{snippet_code}", 1)
+        builder.add("requirements", """Requirements:
         1. Write clean, modular, and well-commented code
         2. Include error handling and input validation
         3. Use functions to organize code
@@ -45,8 +76,8 @@ class CodeGenerator:
         5. Make it testable
         6. Include a main() function
         
-        Generate only the Python code, no explanations.
-        """
+        Generate only the Python code, no explanations.""", 0)
+        prompt = builder.build()
         
         try:
             response = self.model.generate_content(prompt)
@@ -56,82 +87,268 @@ class CodeGenerator:
             if code.startswith("```"):
                 code = "\n".join(code.split("\n")[1:-1])
             
-            return code
+            return splice_snippets(code, list({snippet["id"]: snippet for snippet in exact.values()}.values()))
         
         except Exception as e:
             print(f"Error generating code: {str(e)}")
             return self._generate_template_code(analysis)
     
-    def _generate_template_code(self, analysis: Dict) -> str:
-        """Generate template code when API is not available"""
+    def generate_project(self, analysis: Dict, context: str = "") -> Dict:
+        """
+        Generate a multi-module project, one LLM call per module in parallel
         
-        libraries = ", ".join(analysis.get("libraries", ["os"]))
-        tasks = analysis.get("tasks", [])
+        Args:
+            analysis: Analysis result from RequirementAnalyzer
+            context: Relevant excerpts from uploaded requirement documents
         
-        template = f'''"""
-Generated Python Module
-Tasks: {", ".join(tasks[:3])}
-Libraries: {libraries}
-"""
-
-import os
-import sys
-from typing import Any, List, Dict
-
-def read_input() -> Dict[str, Any]:
-    """Read and validate input"""
-    try:
-        print("Enter input data or file path:")
-        user_input = input().strip()
-        return {{"input": user_input}}
-    except Exception as e:
-        print(f"Error reading input: {{e}}")
-        return {{}}
-
-def process_data(data: Dict[str, Any]) -> Dict[str, Any]:
-    """Process the input data"""
-    try:
-        print(f"Processing: {{data}}")
-        # Add your processing logic here
-        result = {{
-            "status": "success",
-            "data": data,
-            "processed": True
+        Returns:
+            Dictionary with files (file name -> code), plan (the planned modules),
+            import_errors (module -> error for modules that did not import) and
+            stubbed (module -> reason for modules shipped as unimplemented stubs)
+        """
+        
+        if not self.model:
+            return {"files": {"main.py": self._generate_template_code(analysis)}, "plan": [], "import_errors": {}, "stubbed": {}}
+        
+        plan = self._plan_modules(analysis)
+        stubs = "\n\n".join(f"# {module['name']}.py\n{self._stub_module(module)}" for module in plan)
+        
+        # Modules only depend on each other's stubs, so every call can run at once
+        with ThreadPoolExecutor(max_workers=min(MULTI_MODULE_CONFIG["max_workers"], len(plan))) as executor:
+            # Each call keeps the caller's deadline
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._generate_module, module, stubs, analysis, context)
+                for module in plan
+            ]
+            results = {module["name"]: future.result() for module, future in zip(plan, futures)}
+        
+        stubbed = {}
+        files = {}
+        for module in plan:
+            code, error = results[module["name"]]
+            if code is None:
+                stubbed[module["name"]] = f"generation failed: {error}"
+                code = self._stub_module(module, stubbed[module["name"]])
+            files[f"{module['name']}.py"] = code
+        
+        import_errors = self.check_imports(files, {
+            module["name"]: [function["signature"].split("(")[0] for function in module["functions"]]
+            for module in plan
+        })
+        
+        # A module that does not import falls back to its stub so the rest of the package loads
+        for module in plan:
+            if module["name"] in import_errors and module["name"] != "main" and module["name"] not in stubbed:
+                stubbed[module["name"]] = f"failed the import check: {import_errors[module['name']]}"
+                files[f"{module['name']}.py"] = self._stub_module(module, stubbed[module["name"]])
+        
+        return {"files": files, "plan": plan, "import_errors": import_errors, "stubbed": stubbed}
+    
+    def check_imports(self, files: Dict[str, str], expected: Dict[str, List[str]]) -> Dict[str, str]:
+        """
+        Import every module of a project in a subprocess
+        
+        Args:
+            files: File name -> code
+            expected: Module name -> functions it must define
+        
+        Returns:
+            Module name -> error, for modules that failed to import or miss functions
+        """
+        
+        script = (
+            "import importlib, json, sys\n"
+            "expected = json.loads(sys.argv[1])\n"
+            "errors = {}\n"
+            "for name, functions in expected.items():\n"
+            "    try:\n"
+            "        module = importlib.import_module(name)\n"
+            "        missing = [f for f in functions if not callable(getattr(module, f, None))]\n"
+            "        if missing:\n"
+            "            errors[name] = 'missing functions: ' + ', '.join(missing)\n"
+            "    except BaseException as e:\n"
+            "        errors[name] = f'{type(e).__name__}: {e}'\n"
+            "print(json.dumps(errors))\n"
+        )
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for filename, code in files.items():
+                with open(os.path.join(tmpdir, filename), "w") as f:
+                    f.write(code)
+            
+            try:
+                result = subprocess.run(
+                    [sys.executable, "-c", script, json.dumps(expected)],
+                    capture_output=True,
+                    text=True,
+                    timeout=bounded_timeout(MULTI_MODULE_CONFIG["import_check_timeout_seconds"]),
+                    cwd=tmpdir
+                )
+                return json.loads(result.stdout.strip().splitlines()[-1])
+            except Exception as e:
+                return {name: f"Import check failed: {str(e)}" for name in expected}
+    
+    def _plan_modules(self, analysis: Dict) -> List[Dict]:
+        """Ask the LLM for a module layout with function stubs, falling back to a task-based layout"""
+        
+        tasks = "\n".join([f"- {task}" for task in analysis.get("tasks", [])])
+        prompt = f"""
+        Plan a Python project for these tasks as at most {MULTI_MODULE_CONFIG["max_modules"]} modules.
+        A separate main.py will call the modules' functions, so do not plan main.
+        
+        {tasks}
+        
+        Use these libraries: {", ".join(analysis.get("libraries", ["os"]))}
+        
+        Respond in JSON format:
+        {{
+            "modules": [
+                {{
+                    "name": "snake_case_module_name",
+                    "purpose": "one sentence",
+                    "functions": [{{"signature": "load_records(path: str) -> list", "doc": "one sentence"}}]
+                }}
+            ]
         }}
-        return result
-    except Exception as e:
-        print(f"Error processing data: {{e}}")
-        return {{"status": "error", "message": str(e)}}
-
-def format_output(result: Dict[str, Any]) -> str:
-    """Format the output"""
-    if result.get("status") == "success":
-        return f"Success: {{result}}"
-    else:
-        return f"Error: {{result.get('message', 'Unknown error')}}"
-
-def main():
-    """Main function"""
-    print("=" * 50)
-    print("Python Application Started")
-    print("=" * 50)
+        """
+        
+        try:
+            parsed = parse_json_object(self.model.generate_content(prompt, stage="planning").text) or {}
+            plan = self._validate_plan(parsed.get("modules", []), analysis.get("libraries", []))
+        except Exception as e:
+            print(f"Error planning modules: {str(e)}")
+            plan = []
+        
+        plan = plan or self._default_plan(analysis)
+        plan.append({
+            "name": "main",
+            "purpose": "Entry point that parses input and calls the other modules",
+            "functions": [{"signature": "main() -> None", "doc": "Run the program"}]
+        })
+        return plan
+    
+    def _validate_plan(self, modules: List[Dict], libraries: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Keep modules with valid names and functions with parseable signatures
+        
+        Args:
+            modules: Modules from the LLM's plan
+            libraries: Libraries the project uses; modules may not take their names
+        """
+        plan = []
+        seen = {"main"} | {str(library).split(".")[0].replace("-", "_").lower() for library in libraries or []}
+        for module in modules[:MULTI_MODULE_CONFIG["max_modules"]]:
+            name = str(module.get("name", "")).strip().removesuffix(".py")
+            # Shadowing a standard library or installed package would break imports elsewhere
+            if not name.isidentifier() or keyword.iskeyword(name) or name.lower() in seen or _is_importable(name):
+                continue
+            
+            functions = []
+            for function in module.get("functions", []):
+                signature = str(function.get("signature", "")).strip().removeprefix("def ").rstrip(":")
+                try:
+                    ast.parse(f"def {signature}:\n    pass")
+                except SyntaxError:
+                    continue
+                functions.append({"signature": signature, "doc": str(function.get("doc", ""))})
+            
+            if functions:
+                seen.add(name)
+                plan.append({"name": name, "purpose": str(module.get("purpose", "")), "functions": functions})
+        return plan
     
-    # Read input
-    input_data = read_input()
+    def _default_plan(self, analysis: Dict) -> List[Dict]:
+        """Group tasks into data access, processing and reporting modules"""
+        groups = {"data_io": [], "processing": [], "reporting": []}
+        for task in analysis.get("tasks", []):
+            if re.search(r"read|load|parse|connect|query|store|write|save|fetch|call", task, re.IGNORECASE):
+                groups["data_io"].append(task)
+            elif re.search(r"visuali|chart|plot|report|email|log", task, re.IGNORECASE):
+                groups["reporting"].append(task)
+            else:
+                groups["processing"].append(task)
+        
+        plan = []
+        for name, tasks in groups.items():
+            functions = []
+            names = set()
+            for task in tasks:
+                function_name = re.sub(r"[^0-9a-z]+", "_", task.lower()).strip("_") or "run_task"
+                if function_name[0].isdigit() or keyword.iskeyword(function_name):
+                    function_name = f"task_{function_name}"
+                if function_name not in names:
+                    names.add(function_name)
+                    functions.append({"signature": f"{function_name}(data: Any = None) -> Any", "doc": task})
+            if functions:
+                plan.append({"name": name, "purpose": f"{name.replace('_', ' ').capitalize()} tasks", "functions": functions})
+        return plan
     
-    # Process
-    result = process_data(input_data)
+    def _stub_module(self, module: Dict, reason: str = "") -> str:
+        """Interface stub of a planned module; reason marks a stub shipped in place of a failed module"""
+        lines = []
+        if reason:
+            lines += [f"# NOT IMPLEMENTED: {module['name']}.py {reason}".replace("\n", " "), "# Every function below raises NotImplementedError.", ""]
+        lines += ["from typing import Any, Dict, List, Optional", ""]
+        for function in module["functions"]:
+            doc = function["doc"].replace('"""', "'").replace("\\", "/") or "Not implemented yet"
+            lines += ["", f"def {function['signature']}:", f'    """{doc}"""', "    raise NotImplementedError", ""]
+        return "\n".join(lines)
     
-    # Output
-    output = format_output(result)
-    print(output)
+    def _generate_module(self, module: Dict, stubs: str, analysis: Dict, context: str) -> Tuple[Optional[str], str]:
+        """Generate one module against the shared stubs; returns (code, "") or (None, error)"""
+        
+        tasks = "\n".join([f"- {task}" for task in analysis.get("tasks", [])])
+        entry_point = 'Include an if __name__ == "__main__": main() guard.' if module["name"] == "main" else ""
+        
+        # The stubs are the contract between modules and are never trimmed
+        builder = PromptBuilder(PROMPT_BUDGET_CONFIG["generation"])
+        builder.add("instructions", f"""You are writing one module of a multi-module Python project that accomplishes:
+        
+        {tasks}
+        
+        Interfaces of every module in the project:
+        
+        {stubs}
+        
+        Write the complete code of {module["name"]}.py ({module["purpose"]}).
+        Implement exactly the functions in its stub, with the same signatures; private helpers are allowed.
+        Import other project modules with "import module_name" and use only the functions in their stubs.
+        {entry_point}""", 0)
+        if context:
+            builder.add("context", f"Relevant excerpts from the requirement documents:\n{context}", 1)
+        builder.add("requirements", """Requirements:
+        1. Include error handling and input validation
+        2. Add docstrings for all functions
+        
+        Generate only the Python code, no explanations.""", 0)
+        prompt = builder.build()
+        
+        try:
+            code = self.model.generate_content(prompt).text
+            if code.startswith("```"):
+                code = "\n".join(code.split("\n")[1:-1])
+            return code, ""
+        except Exception as e:
+            print(f"Error generating module {module['name']}: {str(e)}")
+            return None, str(e)
     
-    print("=" * 50)
-    print("Application completed successfully")
-    print("=" * 50)
-
-if __name__ == "__main__":
-    main()
-'''
+    def _find_snippets(self, tasks: list):
+        """Snippets matching tasks exactly, and related snippets for the remaining tasks"""
+        if not self.snippets:
+            return {}, []
         
-        return template
+        try:
+            exact = self.snippets.exact_matches(tasks)
+            exact_ids = {snippet["id"] for snippet in exact.values()}
+            related = [
+                snippet for snippet in self.snippets.find([task for task in tasks if task not in exact])
+                if snippet["id"] not in exact_ids
+            ]
+            return exact, related
+        except Exception as e:
+            print(f"Snippet lookup failed: {str(e)}")
+            return {}, []
+    
+    def _generate_template_code(self, analysis: Dict) -> str:
+        """Generate template code when API is not available"""
+        return render_code(analysis)
@@ -0,0 +1,377 @@
+import ast
+import re
+from string import Template
+from typing import Dict, List
+
+# Each component contributes imports, functions and lines of main(). Data flows
+# through main() as `data` (list of dicts, or a DataFrame when pandas is among
+# the libraries) and `summary` (dict of per-column statistics).
+COMPONENT_SOURCES = {
+    "sample": {
+        "records": {
+            "imports": [],
+            "code": '''
+def sample_data() -> List[Dict[str, Any]]:
+    """Small built-in dataset used when no input file is given"""
+    return [
+        {"name": "alpha", "category": "A", "value": 12.5, "quantity": 3},
+        {"name": "beta", "category": "B", "value": 7.25, "quantity": 8},
+        {"name": "gamma", "category": "A", "value": 19.0, "quantity": 1},
+        {"name": "delta", "category": "C", "value": 3.75, "quantity": 12},
+    ]''',
+        },
+        "pandas": {
+            "imports": ["import pandas as pd"],
+            "code": '''
+def sample_data() -> pd.DataFrame:
+    """Small built-in dataset used when no input file is given"""
+    return pd.DataFrame([
+        {"name": "alpha", "category": "A", "value": 12.5, "quantity": 3},
+        {"name": "beta", "category": "B", "value": 7.25, "quantity": 8},
+        {"name": "gamma", "category": "A", "value": 19.0, "quantity": 1},
+        {"name": "delta", "category": "C", "value": 3.75, "quantity": 12},
+    ])''',
+        },
+    },
+    "csv": {
+        "records": {
+            "imports": ["import csv"],
+            "code": '''
+def convert_value(value: str) -> Any:
+    """Convert a CSV field to int or float when it looks numeric"""
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            pass
+    return value
+
+
+def load_csv(path: str) -> List[Dict[str, Any]]:
+    """Read a CSV file into a list of rows"""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [{key: convert_value(value) for key, value in row.items()} for row in csv.DictReader(f)]''',
+            "step": "data = load_csv(args.input) if args.input else sample_data()",
+        },
+        "pandas": {
+            "imports": ["import pandas as pd"],
+            "code": '''
+def load_csv(path: str) -> pd.DataFrame:
+    """Read a CSV file into a DataFrame"""
+    return pd.read_csv(path)''',
+            "step": "data = load_csv(args.input) if args.input else sample_data()",
+        },
+    },
+    "json": {
+        "records": {
+            "imports": ["import json"],
+            "code": '''
+def load_json(path: str) -> List[Dict[str, Any]]:
+    """Read a JSON file holding a list of objects (or a single object)"""
+    with open(path, encoding="utf-8") as f:
+        content = json.load(f)
+    return content if isinstance(content, list) else [content]''',
+            "step": "data = load_json(args.input) if args.input else sample_data()",
+        },
+        "pandas": {
+            "imports": ["import json", "import pandas as pd"],
+            "code": '''
+def load_json(path: str) -> pd.DataFrame:
+    """Read a JSON file holding a list of objects (or a single object) into a DataFrame"""
+    with open(path, encoding="utf-8") as f:
+        content = json.load(f)
+    return pd.json_normalize(content if isinstance(content, list) else [content])''',
+            "step": "data = load_json(args.input) if args.input else sample_data()",
+        },
+    },
+    "json_output": {
+        "any": {
+            "imports": ["import json"],
+            "code": '''
+def save_json(content: Any, path: str) -> str:
+    """Write content as indented JSON and return the path"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(content, f, indent=2, default=str)
+    return path''',
+            "output_step": 'print(f"Saved summary to {save_json(summary, os.path.join(args.output_dir, \'summary.json\'))}")',
+        },
+    },
+    "text_file": {
+        "records": {
+            "imports": [],
+            "code": '''
+def read_lines(path: str) -> List[Dict[str, Any]]:
+    """Read a text file into one row per non-empty line"""
+    with open(path, encoding="utf-8") as f:
+        return [
+            {"line": number, "text": line.rstrip("\\n"), "length": len(line.rstrip("\\n"))}
+            for number, line in enumerate(f, 1) if line.strip()
+        ]''',
+            "step": "data = read_lines(args.input) if args.input else sample_data()",
+        },
+        "pandas": {
+            "imports": ["import pandas as pd"],
+            "code": '''
+def read_lines(path: str) -> pd.DataFrame:
+    """Read a text file into one row per non-empty line"""
+    with open(path, encoding="utf-8") as f:
+        lines = [line.rstrip("\\n") for line in f if line.strip()]
+    return pd.DataFrame({"line": range(1, len(lines) + 1), "text": lines, "length": [len(line) for line in lines]})''',
+            "step": "data = read_lines(args.input) if args.input else sample_data()",
+        },
+    },
+    "summary": {
+        "records": {
+            "imports": [],
+            "code": '''
+def summarize(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Row count plus count, mean, min and max of every numeric column"""
+    columns: Dict[str, List[float]] = {}
+    for row in data:
+        for key, value in row.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                columns.setdefault(key, []).append(value)
+    return {
+        "rows": len(data),
+        "columns": {
+            key: {"count": len(values), "mean": sum(values) / len(values), "min": min(values), "max": max(values)}
+            for key, values in columns.items()
+        },
+    }''',
+            "step": "summary = summarize(data)",
+        },
+        "pandas": {
+            "imports": ["import pandas as pd"],
+            "code": '''
+def summarize(data: pd.DataFrame) -> Dict[str, Any]:
+    """Row count plus count, mean, min and max of every numeric column"""
+    numeric = data.select_dtypes("number").dropna(axis=1, how="all")
+    return {
+        "rows": int(len(data)),
+        "columns": {
+            column: {
+                "count": int(numeric[column].count()),
+                "mean": float(numeric[column].mean()),
+                "min": float(numeric[column].min()),
+                "max": float(numeric[column].max()),
+            }
+            for column in numeric.columns
+        },
+    }''',
+            "step": "summary = summarize(data)",
+        },
+    },
+    "sqlite": {
+        "records": {
+            "imports": ["import sqlite3"],
+            "code": '''
+def save_to_sqlite(data: List[Dict[str, Any]], db_path: str, table: str = "$table") -> int:
+    """Store rows in a SQLite table (replacing it) and return the stored row count"""
+    if not data:
+        return 0
+    columns = list(data[0].keys())
+    quoted = ", ".join('"%s"' % column for column in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('DROP TABLE IF EXISTS "%s"' % table)
+        conn.execute('CREATE TABLE "%s" (%s)' % (table, quoted))
+        conn.executemany(
+            'INSERT INTO "%s" (%s) VALUES (%s)' % (table, quoted, placeholders),
+            [tuple(row.get(column) for column in columns) for row in data]
+        )
+        return conn.execute('SELECT COUNT(*) FROM "%s"' % table).fetchone()[0]''',
+            "output_step": 'print(f"Stored {save_to_sqlite(data, os.path.join(args.output_dir, \'data.db\'))} rows in SQLite")',
+        },
+        "pandas": {
+            "imports": ["import sqlite3", "import pandas as pd"],
+            "code": '''
+def save_to_sqlite(data: pd.DataFrame, db_path: str, table: str = "$table") -> int:
+    """Store rows in a SQLite table (replacing it) and return the stored row count"""
+    with sqlite3.connect(db_path) as conn:
+        data.to_sql(table, conn, if_exists="replace", index=False)
+        return conn.execute('SELECT COUNT(*) FROM "%s"' % table).fetchone()[0]''',
+            "output_step": 'print(f"Stored {save_to_sqlite(data, os.path.join(args.output_dir, \'data.db\'))} rows in SQLite")',
+        },
+    },
+    "plot": {
+        "any": {
+            "imports": [],
+            "code": '''
+def plot_summary(summary: Dict[str, Any], path: str) -> Optional[str]:
+    """Save a bar chart of the mean of every numeric column; returns the path, or None if nothing was plotted"""
+    columns = summary["columns"]
+    if not columns:
+        return None
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed; skipping chart")
+        return None
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.bar(list(columns), [stats["mean"] for stats in columns.values()])
+    ax.set_title("Mean by column")
+    ax.set_ylabel("Mean")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    print(f"Saved chart to {path}")
+    return path''',
+            "output_step": "plot_summary(summary, os.path.join(args.output_dir, 'summary.png'))",
+        },
+    },
+    "report_file": {
+        "any": {
+            "imports": [],
+            "code": '''
+def write_report(summary: Dict[str, Any], path: str) -> str:
+    """Write the summary as a plain-text report and return the path"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(format_summary(summary) + "\\n")
+    return path''',
+            "output_step": 'print(f"Saved report to {write_report(summary, os.path.join(args.output_dir, \'report.txt\'))}")',
+        },
+    },
+    "print": {
+        "any": {
+            "imports": [],
+            "code": '''
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Human-readable summary"""
+    lines = [f"Rows: {summary['rows']}"]
+    for column, stats in summary["columns"].items():
+        lines.append(
+            f"{column}: count={stats['count']} mean={stats['mean']:.2f} min={stats['min']} max={stats['max']}"
+        )
+    return "\\n".join(lines)''',
+            "output_step": "print(format_summary(summary))",
+        },
+    },
+}
+
+MODULE_TEMPLATE = Template('''"""
+$description
+
+Tasks:
+$task_list
+"""
+
+$imports
+
+
+$functions
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run the pipeline; without an input file a built-in sample dataset is used"""
+    parser = argparse.ArgumentParser(description=$description_literal)
+    parser.add_argument("input", nargs="?", help="$input_help")
+    parser.add_argument("--output-dir", default="output", help="Directory for generated files")
+    args = parser.parse_args(argv if argv is not None else [])
+    os.makedirs(args.output_dir, exist_ok=True)
+
+$steps
+    return summary
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
+''')
+
+BASE_IMPORTS = [
+    "import argparse",
+    "import os",
+    "import sys",
+    "from typing import Any, Dict, List, Optional",
+]
+
+# Which components a requirement needs, matched against its tasks and libraries
+TRIGGERS = {
+    "csv": re.compile(r"\bcsv\b|spreadsheet", re.IGNORECASE),
+    "json": re.compile(r"\bjson\b", re.IGNORECASE),
+    "sqlite": re.compile(r"sql|database", re.IGNORECASE),
+    "plot": re.compile(r"plot|chart|graph|visuali|histogram|matplotlib", re.IGNORECASE),
+    "text_file": re.compile(r"\b(?:text|read)\s+files?\b|\bfiles?\b", re.IGNORECASE),
+    "report_file": re.compile(r"\b(?:write|save)\s+(?:file|report)|\breport\b", re.IGNORECASE),
+}
+
+INPUT_HELP = {
+    "csv": "CSV file to process",
+    "json": "JSON file to process",
+    "text_file": "Text file to process",
+}
+
+def _compile_components() -> Dict[str, Dict[str, Dict]]:
+    """Compile every component's code template once and check it parses"""
+    compiled = {}
+    for name, flavors in COMPONENT_SOURCES.items():
+        compiled[name] = {}
+        for flavor, source in flavors.items():
+            code = Template(source["code"].strip("\n"))
+            # Fails at import time, not at generation time, if a template is broken
+            ast.parse(code.safe_substitute(table="records"))
+            compiled[name][flavor] = {**source, "code": code}
+    return compiled
+
+COMPONENTS = _compile_components()
+
+def select_components(analysis: Dict) -> List[str]:
+    """Component names for an analysis, in pipeline order"""
+    text = " ".join(analysis.get("tasks", []) + analysis.get("libraries", []))
+    wanted = {name for name, pattern in TRIGGERS.items() if pattern.search(text)}
+    
+    # One input source; structured formats win over plain text files
+    source = next((name for name in ("csv", "json", "text_file") if name in wanted), None)
+    components = ["sample"] + ([source] if source else []) + ["summary", "print"]
+    if "json" in wanted:
+        components.append("json_output")
+    components += [name for name in ("sqlite", "plot", "report_file") if name in wanted]
+    return components
+
+def render_code(analysis: Dict) -> str:
+    """
+    Compose a runnable program from the templates matching an analysis
+    
+    Args:
+        analysis: Analysis result with tasks and libraries
+    
+    Returns:
+        Python source for main.py
+    """
+    
+    tasks = analysis.get("tasks", []) or ["Process input data"]
+    flavor = "pandas" if "pandas" in analysis.get("libraries", []) else "records"
+    components = select_components(analysis)
+    
+    imports = list(BASE_IMPORTS)
+    functions = []
+    steps = []
+    for name in components:
+        component = COMPONENTS[name].get(flavor) or COMPONENTS[name]["any"]
+        imports.extend(line for line in component["imports"] if line not in imports)
+        functions.append(component["code"].substitute(table="records"))
+        step = component.get("step") or component.get("output_step")
+        if step:
+            steps.append(step)
+    
+    if not any(step.startswith("data =") for step in steps):
+        steps.insert(0, "data = sample_data()")
+    
+    description = "; ".join(tasks[:3]).replace('"""', "'''").replace("\\", "/")
+    source = next((name for name in components if name in INPUT_HELP), None)
+    
+    return MODULE_TEMPLATE.substitute(
+        description=description,
+        description_literal=repr(description),
+        task_list="\n".join(f"- {task}" for task in tasks).replace('"""', "'''").replace("\\", "/"),
+        imports="\n".join(_order_imports(imports)),
+        functions="\n\n\n".join(functions),
+        input_help=INPUT_HELP.get(source, "Optional input file"),
+        steps="\n".join(f"    {step}" for step in steps)
+    )
+
+def _order_imports(imports: List[str]) -> List[str]:
+    """Plain imports before from-imports, each group sorted"""
+    return sorted(line for line in imports if line.startswith("import ")) + \
+        sorted(line for line in imports if line.startswith("from "))
@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from config import PROFILING_CONFIG
+from modules.document_extractor import get_executor
+
+DATASET_TYPES = ("csv", "json", "jsonl")
+
+class DistinctSketch:
+    """
+    K-minimum-values sketch: exact distinct count up to k values,
+    an estimate with bounded memory beyond that
+    """
+    
+    def __init__(self, k: int):
+        self.k = k
+        self.values = np.empty(0, dtype=np.uint64)
+    
+    def update(self, hashes: np.ndarray):
+        """Merge a chunk of 64-bit value hashes"""
+        merged = np.unique(np.concatenate([self.values, np.unique(hashes)]))
+        self.values = merged[:self.k]
+    
+    @property
+    def exact(self) -> bool:
+        return len(self.values) < self.k
+    
+    def estimate(self) -> int:
+        """Estimated number of distinct values"""
+        if self.exact:
+            return len(self.values)
+        kth = float(self.values[-1]) / float(np.iinfo(np.uint64).max)
+        return int((self.k - 1) / kth) if kth > 0 else len(self.values)
+
+class ColumnStats:
+    """Running statistics for one column, updated one chunk at a time"""
+    
+    def __init__(self, sketch_size: int):
+        self.nulls = 0
+        self.dtypes = set()
+        self.distinct = DistinctSketch(sketch_size)
+        self.minimum = None
+        self.maximum = None
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.numeric_count = 0
+    
+    def update(self, series: pd.Series):
+        """Fold one chunk of the column into the running statistics"""
+        self.nulls += int(series.isna().sum())
+        self.dtypes.add(str(series.dtype))
+        
+        values = series.dropna()
+        if values.empty:
+            return
+        self.distinct.update(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            numbers = values.to_numpy(dtype=np.float64)
+            chunk_min, chunk_max = numbers.min(), numbers.max()
+            self.minimum = chunk_min if self.minimum is None else min(self.minimum, chunk_min)
+            self.maximum = chunk_max if self.maximum is None else max(self.maximum, chunk_max)
+            self.total += numbers.sum()
+            self.total_squares += np.square(numbers).sum()
+            self.numeric_count += len(numbers)
+    
+    def summary(self, rows: int) -> Dict:
+        """Final statistics for the column"""
+        dtypes = sorted(self.dtypes)
+        result = {
+            # A column read as int in one chunk and float in another is numeric, not mixed
+            "dtype": dtypes[0] if len(dtypes) == 1 else ("float64" if all(d.startswith(("int", "float")) for d in dtypes) else "mixed: " + ", ".join(dtypes)),
+            "null_rate": self.nulls / rows if rows else 0.0,
+            "distinct": self.distinct.estimate(),
+            "distinct_exact": self.distinct.exact
+        }
+        if self.numeric_count:
+            mean = self.total / self.numeric_count
+            variance = max(self.total_squares / self.numeric_count - mean * mean, 0.0)
+            result.update({
+                "min": float(self.minimum),
+                "max": float(self.maximum),
+                "mean": mean,
+                "std": variance ** 0.5
+            })
+        return result
+
+def profile_file(file_path: str, file_type: str, filename: Optional[str] = None) -> Dict:
+    """
+    Profile a CSV or JSON dataset in fixed-size chunks
+    
+    Args:
+        file_path: Path of the stored file
+        file_type: csv, json or jsonl
+        filename: Display name (defaults to the file's base name)
+    
+    Returns:
+        Dictionary with rows, columns (per-column stats) and sample rows
+    """
+    
+    chunksize = PROFILING_CONFIG["chunk_rows"]
+    columns: Dict[str, ColumnStats] = {}
+    rows = 0
+    sample: List[Dict] = []
+    
+    for chunk in _iter_chunks(file_path, file_type.lower(), chunksize):
+        if not sample:
+            sample = json.loads(chunk.head(PROFILING_CONFIG["sample_rows"]).to_json(orient="records", default_handler=str))
+        rows += len(chunk)
+        for name in chunk.columns:
+            if name not in columns:
+                columns[name] = ColumnStats(PROFILING_CONFIG["distinct_sketch_size"])
+                # Rows from earlier chunks that lacked this column count as nulls
+                columns[name].nulls = rows - len(chunk)
+            columns[name].update(chunk[name])
+    
+    return {
+        "filename": filename or os.path.basename(file_path),
+        "rows": rows,
+        "columns": {str(name): stats.summary(rows) for name, stats in columns.items()},
+        "sample": sample
+    }
+
+def format_profile(profile: Dict, max_columns: Optional[int] = None) -> str:
+    """Render a profile as a compact block of text for prompts"""
+    max_columns = max_columns or PROFILING_CONFIG["max_prompt_columns"]
+    columns = profile["columns"]
+    
+    lines = [f"Dataset {profile['filename']}: {profile['rows']:,} rows x {len(columns)} columns"]
+    for name, stats in list(columns.items())[:max_columns]:
+        distinct = f"{stats['distinct']:,}" if stats["distinct_exact"] else f"~{stats['distinct']:,}"
+        line = f"- {name} ({stats['dtype']}): nulls {stats['null_rate']:.1%}, {distinct} distinct"
+        if "mean" in stats:
+            line += f", min {stats['min']:g}, max {stats['max']:g}, mean {stats['mean']:.4g}"
+        lines.append(line)
+    if len(columns) > max_columns:
+        lines.append(f"- ... {len(columns) - max_columns} more columns")
+    
+    if profile["sample"]:
+        lines.append("Sample rows:")
+        lines.extend(json.dumps(row, default=str)[:300] for row in profile["sample"])
+    
+    return "\n".join(lines)
+
+# Profiles are computed once per file content and reused across reruns
+_profiles: "OrderedDict[str, Dict]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+def profile_uploads(uploads: List[Dict]) -> List[Dict]:
+    """
+    Profile every CSV/JSON upload concurrently in the shared process pool
+    
+    Args:
+        uploads: Dicts from FileManager.save_uploaded_stream
+    
+    Returns:
+        The same dicts; datasets get a "profile" key with the prompt text.
+        A dataset that cannot be parsed is left without one.
+    """
+    
+    pending = []
+    for upload in uploads:
+        if upload["file_type"].lower() not in DATASET_TYPES:
+            continue
+        with _profiles_lock:
+            cached = _profiles.get(upload["content_hash"])
+        if cached is not None:
+            upload["profile"] = format_profile(cached)
+        else:
+            pending.append((upload, get_executor().submit(profile_file, upload["file_path"], upload["file_type"], upload["filename"])))
+    
+    for upload, future in pending:
+        try:
+            profile = future.result()
+        except Exception as e:
+            print(f"Could not profile {upload['filename']}: {e}")
+            continue
+        with _profiles_lock:
+            _profiles[upload["content_hash"]] = profile
+            while len(_profiles) > PROFILING_CONFIG["max_cached_profiles"]:
+                _profiles.popitem(last=False)
+        upload["profile"] = format_profile(profile)
+    
+    return uploads
+
+def _iter_chunks(file_path: str, file_type: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Read a dataset as DataFrame chunks without loading the whole file"""
+    if file_type == "csv":
+        yield from pd.read_csv(file_path, chunksize=chunksize, low_memory=False, on_bad_lines="skip")
+        return
+    
+    if file_type == "jsonl" or _is_json_lines(file_path):
+        yield from pd.read_json(file_path, lines=True, chunksize=chunksize)
+        return
+    
+    # A single JSON document cannot be read in chunks
+    if os.path.getsize(file_path) > PROFILING_CONFIG["max_json_document_bytes"]:
+        raise ValueError(f"{os.path.basename(file_path)} is too large to profile as one JSON document; use JSON Lines")
+    with open(file_path, encoding="utf-8") as f:
+        data = json.load(f)
+    records = data if isinstance(data, list) else next((v for v in data.values() if isinstance(v, list)), [data])
+    for start in range(0, len(records), chunksize):
+        yield pd.json_normalize(records[start:start + chunksize])
+
+def _is_json_lines(file_path: str) -> bool:
+    """True when the file holds one JSON object per line"""
+    with open(file_path, encoding="utf-8", errors="ignore") as f:
+        first_line = f.readline().strip()
+        second_line = f.readline().strip()
+    return first_line.startswith("{") and first_line.endswith("}") and (not second_line or second_line.startswith("{"))
@@ -0,0 +1,40 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Absolute time.monotonic() deadline of the current pipeline action, if any
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    """The pipeline action ran out of time"""
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Bound everything inside the block to seconds from now
+    
+    Nested deadlines can only shorten the enclosing one. Work submitted to
+    other threads keeps the deadline when run with contextvars.copy_context().
+    """
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left before the deadline (never negative), or default when there is none"""
+    at = _deadline.get()
+    return default if at is None else max(0.0, at - time.monotonic())
+
+def bounded_timeout(timeout: float) -> float:
+    """A timeout shortened to the time left, raising if none is left"""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded")
+    return min(timeout, left)
@@ -0,0 +1,174 @@
+import mmap
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+from typing import Dict, Iterator, List
+from PyPDF2 import PdfReader
+from docx import Document
+from config import EXTRACTION_CONFIG
+
+# Formats parsed in worker processes; everything else is decoded as text
+PARSED_TYPES = ("pdf", "docx")
+
+# One pool per process: app.py re-creates its objects on every rerun
+_executor = None
+_executor_lock = threading.Lock()
+
+# Runs extract_uploads off the Streamlit script thread
+_upload_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="extract")
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool used for parsing"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=EXTRACTION_CONFIG["max_workers"])
+        return _executor
+
+def count_pdf_pages(file_path: str) -> int:
+    """Number of pages in a PDF (reads only the page tree)"""
+    return len(PdfReader(file_path).pages)
+
+def extract_pdf_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract text from PDF pages [start, stop) - runs in a worker process"""
+    reader = PdfReader(file_path)
+    pages = []
+    for page in reader.pages[start:stop]:
+        try:
+            pages.append(page.extract_text() or "")
+        except Exception as e:
+            pages.append(f"[Could not extract page: {e}]")
+    return pages
+
+def extract_docx_sections(file_path: str, paragraphs_per_section: int) -> List[str]:
+    """Extract DOCX paragraphs and tables, grouped into page-like sections - runs in a worker process"""
+    document = Document(file_path)
+    lines = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+    
+    for table in document.tables:
+        for row in table.rows:
+            lines.append(" | ".join(cell.text.strip() for cell in row.cells))
+    
+    return [
+        "\n".join(lines[i:i + paragraphs_per_section])
+        for i in range(0, len(lines), paragraphs_per_section)
+    ]
+
+def iter_plain_text(file_path: str, chunk_bytes: int) -> Iterator[str]:
+    """Decode a text file through a memory map, one chunk at a time"""
+    if os.path.getsize(file_path) == 0:
+        return
+    
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        start = 0
+        while start < len(mapped):
+            stop = min(start + chunk_bytes, len(mapped))
+            # Do not split a multi-byte UTF-8 character across chunks
+            while stop < len(mapped) and (mapped[stop] & 0xC0) == 0x80:
+                stop += 1
+            yield mapped[start:stop].decode('utf-8', errors='ignore')
+            start = stop
+
+class DocumentExtractor:
+    """Extracts requirement text from uploaded PDF, DOCX and text files in a process pool"""
+    
+    def __init__(self, file_manager=None):
+        self.file_manager = file_manager
+        self.pages_per_task = EXTRACTION_CONFIG["pdf_pages_per_task"]
+        self.paragraphs_per_section = EXTRACTION_CONFIG["docx_paragraphs_per_section"]
+        self.chunk_bytes = EXTRACTION_CONFIG["text_chunk_bytes"]
+        self.max_chars = EXTRACTION_CONFIG["max_chars"]
+    
+    def iter_pages(self, file_path: str, file_type: str) -> Iterator[str]:
+        """
+        Yield the text of a document page by page, in order
+        
+        Args:
+            file_path: Path of the stored file
+            file_type: File extension (pdf, docx, txt, csv, json, py)
+        
+        Yields:
+            Text of each page (PDF), paragraph section (DOCX) or chunk (text files)
+        """
+        for future in self._submit(file_path, file_type):
+            if isinstance(future, Future):
+                yield from future.result()
+            else:
+                yield future
+    
+    def extract_text(self, file_path: str, file_type: str) -> str:
+        """Extract the full text of a document, capped at the configured length"""
+        return self._join(self.iter_pages(file_path, file_type))
+    
+    def extract_uploads(self, uploads: List[Dict]) -> List[Dict]:
+        """
+        Extract text for several uploaded files concurrently
+        
+        Args:
+            uploads: Dicts from FileManager.save_uploaded_stream
+        
+        Returns:
+            The same dicts with a "text" key added. Text already extracted for
+            the same content hash is reused instead of parsing again.
+        """
+        
+        pending = []
+        for upload in uploads:
+            cached = self.file_manager.get_extracted_text(upload["content_hash"]) if self.file_manager else None
+            if cached is not None:
+                upload["text"] = cached
+            else:
+                parts = self._submit(upload["file_path"], upload["file_type"])
+                if upload["file_type"].lower() in PARSED_TYPES:
+                    # Submit every parsed file before waiting on any, so they parse in parallel
+                    parts = list(parts)
+                # Text files stay a lazy chunk iterator, so _join decodes only up to max_chars
+                pending.append((upload, parts))
+        
+        for upload, parts in pending:
+            upload["text"] = self._join(
+                page
+                for part in parts
+                for page in (part.result() if isinstance(part, Future) else [part])
+            )
+            if not isinstance(parts, list):
+                # Release the memory map of a text file read only up to max_chars
+                parts.close()
+            if self.file_manager:
+                self.file_manager.save_extracted_text(upload["content_hash"], upload["text"])
+        
+        return uploads
+    
+    def submit_uploads(self, uploads: List[Dict]) -> Future:
+        """Run extract_uploads on a background thread; the caller polls the future instead of blocking on it"""
+        return _upload_executor.submit(self.extract_uploads, uploads)
+    
+    def _submit(self, file_path: str, file_type: str) -> Iterator:
+        """Schedule parsing work; yields futures (or text chunks for plain files)"""
+        file_type = file_type.lower()
+        
+        if file_type == "pdf":
+            executor = get_executor()
+            page_count = count_pdf_pages(file_path)
+            # Submit every page range before handing back the first future
+            futures = [
+                executor.submit(extract_pdf_pages, file_path, start, min(start + self.pages_per_task, page_count))
+                for start in range(0, page_count, self.pages_per_task)
+            ]
+            yield from futures
+        elif file_type == "docx":
+            yield get_executor().submit(extract_docx_sections, file_path, self.paragraphs_per_section)
+        else:
+            # Text formats need no parsing, only decoding
+            yield from iter_plain_text(file_path, self.chunk_bytes)
+    
+    def _join(self, pages) -> str:
+        """Join pages, stopping once max_chars is reached"""
+        parts = []
+        total = 0
+        for page in pages:
+            parts.append(page)
+            total += len(page) + 1
+            if total >= self.max_chars:
+                break
+        return "\n".join(parts)[:self.max_chars]
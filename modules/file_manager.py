@@ -1,58 +1,159 @@
+import hashlib
+import io
+import mmap
 import os
 import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
-from database_models import SessionLocal, UploadedFile, Project
+from typing import BinaryIO, Dict, Optional
+from config import APP_CONFIG
+from database_models import session_scope, UploadedFile, Project
+
+CHUNK_SIZE = 1024 * 1024
 
 class FileManager:
     """Manages file uploads and storage"""
     
-    def __init__(self, upload_dir: str = "uploads"):
+    def __init__(self, upload_dir: str = "uploads", max_file_size_mb: Optional[float] = None):
         self.upload_dir = Path(upload_dir)
         self.upload_dir.mkdir(exist_ok=True)
-        self.db = SessionLocal()
+        size_mb = max_file_size_mb if max_file_size_mb is not None else APP_CONFIG["max_file_size_mb"]
+        self.max_bytes = int(size_mb * 1024 * 1024)
     
     def save_uploaded_file(self, project_id: int, file_content: bytes, filename: str) -> str:
         """Save uploaded file and return path"""
+        return self.save_uploaded_stream(project_id, io.BytesIO(file_content), filename)["file_path"]
+    
+    def save_uploaded_stream(self, project_id: int, stream: BinaryIO, filename: str) -> Dict:
+        """
+        Stream an upload to disk in chunks, hashing while writing
+        
+        Args:
+            project_id: Project the file belongs to
+            stream: Readable binary file object (e.g. a Streamlit UploadedFile)
+            filename: Original file name
+        
+        Returns:
+            Dictionary with file_path, filename, file_type, content_hash, size_bytes
+            and duplicate (True when identical content was already stored for the project)
+        
+        Raises:
+            ValueError: If the file is larger than the configured limit
+        """
+        
+        # Reject early when the size is known up front
+        declared_size = getattr(stream, "size", None)
+        if declared_size is not None and declared_size > self.max_bytes:
+            raise ValueError(self._size_error(filename))
         
-        # Create project-specific directory
         project_dir = self.upload_dir / f"project_{project_id}"
         project_dir.mkdir(exist_ok=True)
         
-        # Save file
-        file_path = project_dir / filename
-        with open(file_path, 'wb') as f:
-            f.write(file_content)
+        safe_name = Path(filename).name or "upload"
+        temp_path = project_dir / f".{safe_name}.{os.getpid()}.{id(stream)}.part"
+        digest = hashlib.sha256()
+        size = 0
+        
+        try:
+            with open(temp_path, 'wb') as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ValueError(self._size_error(filename))
+                    digest.update(chunk)
+                    f.write(chunk)
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+            raise
         
-        # Record in database
-        file_type = filename.split('.')[-1] if '.' in filename else 'unknown'
-        uploaded_file = UploadedFile(
-            project_id=project_id,
-            filename=filename,
-            file_path=str(file_path),
-            file_type=file_type
-        )
-        self.db.add(uploaded_file)
-        self.db.commit()
+        content_hash = digest.hexdigest()
         
-        return str(file_path)
+        with session_scope() as db:
+            existing = db.query(UploadedFile).filter(
+                UploadedFile.project_id == project_id,
+                UploadedFile.content_hash == content_hash
+            ).first()
+            
+            if existing and Path(existing.file_path).exists():
+                temp_path.unlink()
+                return {
+                    "file_path": existing.file_path,
+                    "filename": safe_name,
+                    "file_type": existing.file_type,
+                    "content_hash": content_hash,
+                    "size_bytes": size,
+                    "duplicate": True
+                }
+            
+            # Prefix with the hash so same-named files never overwrite each other
+            file_path = project_dir / f"{content_hash[:12]}_{safe_name}"
+            os.replace(temp_path, file_path)
+            
+            file_type = safe_name.split('.')[-1] if '.' in safe_name else 'unknown'
+            db.add(UploadedFile(
+                project_id=project_id,
+                filename=safe_name,
+                file_path=str(file_path),
+                file_type=file_type,
+                content_hash=content_hash,
+                size_bytes=size
+            ))
+        
+        return {
+            "file_path": str(file_path),
+            "filename": safe_name,
+            "file_type": file_type,
+            "content_hash": content_hash,
+            "size_bytes": size,
+            "duplicate": False
+        }
+    
+    def read_text_preview(self, file_path: str, max_chars: int = 1000) -> str:
+        """Decode the start of a stored file through a memory map instead of reading it into memory"""
+        if os.path.getsize(file_path) == 0:
+            return ""
+        
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # UTF-8 uses at most 4 bytes per character
+            return mapped[:max_chars * 4].decode('utf-8', errors='ignore')[:max_chars]
+    
+    def get_extracted_text(self, content_hash: str) -> Optional[str]:
+        """Return text already extracted from a file with this content hash"""
+        with session_scope() as db:
+            row = db.query(UploadedFile.extracted_text).filter(
+                UploadedFile.content_hash == content_hash,
+                UploadedFile.extracted_text.isnot(None)
+            ).first()
+            return row.extracted_text if row else None
+    
+    def save_extracted_text(self, content_hash: str, text: str):
+        """Cache extracted text on every upload row with this content hash"""
+        with session_scope() as db:
+            db.query(UploadedFile).filter(
+                UploadedFile.content_hash == content_hash
+            ).update({UploadedFile.extracted_text: text}, synchronize_session=False)
     
     def get_project_files(self, project_id: int) -> list:
         """Get all files for a project"""
-        files = self.db.query(UploadedFile).filter(
-            UploadedFile.project_id == project_id
-        ).all()
-        
-        result = []
-        for file in files:
-            result.append({
-                "filename": file.filename,
-                "file_type": file.file_type,
-                "created_at": file.created_at.isoformat(),
-                "file_path": file.file_path
-            })
-        return result
+        with session_scope() as db:
+            files = db.query(UploadedFile).filter(
+                UploadedFile.project_id == project_id
+            ).all()
+            
+            result = []
+            for file in files:
+                result.append({
+                    "filename": file.filename,
+                    "file_type": file.file_type,
+                    "created_at": file.created_at.isoformat(),
+                    "file_path": file.file_path,
+                    "content_hash": file.content_hash,
+                    "size_bytes": file.size_bytes
+                })
+            return result
     
     def delete_project_files(self, project_id: int):
         """Delete all files for a project"""
@@ -61,12 +162,11 @@ class FileManager:
             shutil.rmtree(project_dir)
         
         # Remove from database
-        files = self.db.query(UploadedFile).filter(
-            UploadedFile.project_id == project_id
-        ).all()
-        for file in files:
-            self.db.delete(file)
-        self.db.commit()
+        with session_scope() as db:
+            db.query(UploadedFile).filter(
+                UploadedFile.project_id == project_id
+            ).delete(synchronize_session=False)
     
-    def __del__(self):
-        self.db.close()
+    def _size_error(self, filename: str) -> str:
+        """Message for files over the size limit"""
+        return f"{filename} exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit"
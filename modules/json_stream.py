@@ -0,0 +1,224 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LITERAL_CHARS = frozenset("-+.0123456789eEtrufalsn")
+
+class StreamingJSONParser:
+    """
+    Incremental parser for the first JSON object in an LLM response
+    
+    Text is fed in chunks as it streams in. Prose and code fences around the
+    object are skipped, and a '{' that turns out not to start valid JSON (a
+    stray brace in prose) is abandoned and scanning resumes after it. Entries
+    of watched arrays, and watched scalar fields, of the top-level object are
+    emitted as soon as each one is complete.
+    """
+    
+    def __init__(self, watch: Iterable[str] = ("tasks", "libraries")):
+        self.watch = frozenset(watch)
+        self.text = ""
+        self.pos = 0
+        self.result: Optional[Dict] = None
+        self._reset()
+    
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume a chunk of the response
+        
+        Returns:
+            (field, value) events completed by this chunk, e.g. ("tasks", "Read CSV file")
+        """
+        self.text += chunk
+        events: List[Tuple[str, Any]] = []
+        while self.result is None and self.pos < len(self.text):
+            index = self.pos
+            self.pos += 1
+            if not self._step(self.text[index], index, events):
+                self._abandon()
+        return events
+    
+    def close(self) -> Optional[Dict]:
+        """
+        The parsed object, or None if the response held none
+        
+        A response cut off mid-object (e.g. by the output token limit) is
+        closed at the last complete value.
+        """
+        if self.result is None and self.start is not None:
+            if self.literal:
+                self._end_literal(len(self.text), [])
+            if self.safe is not None:
+                end, closers = self.safe
+                try:
+                    self.result = json.loads(self._slice(self.start, end + 1) + closers)
+                except ValueError:
+                    pass
+        return self.result
+    
+    def _reset(self):
+        self.start: Optional[int] = None
+        self.stack: List[Dict] = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.literal = ""
+        self.safe: Optional[Tuple[int, str]] = None
+        self.trailing_commas: List[int] = []
+    
+    def _abandon(self):
+        """Drop the current candidate and rescan from the character after its '{'"""
+        self.pos = self.start + 1
+        self._reset()
+    
+    def _step(self, char: str, index: int, events: List) -> bool:
+        """Advance by one character; False means the candidate is not JSON"""
+        if self.start is None:
+            if char == "{":
+                self.start = index
+                self.stack = [{"type": "object", "expect": "key", "key": None, "pending": None, "comma": None, "start": index}]
+                self._mark_safe(index)
+            return True
+        
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+            elif char == "\\":
+                self.escape = True
+            elif char == '"':
+                self.in_string = False
+                return self._end_string(index, events)
+            elif char in "\n\r":
+                return False
+            return True
+        
+        if self.literal:
+            if char in LITERAL_CHARS:
+                self.literal += char
+                return True
+            if not self._end_literal(index, events):
+                return False
+        
+        if char.isspace():
+            return True
+        
+        frame = self.stack[-1]
+        expect = frame["expect"]
+        
+        if char == '"':
+            if expect not in ("key", "value"):
+                return False
+            self.in_string = True
+            self.string_start = index
+            return True
+        
+        if char in "{[":
+            if expect != "value":
+                return False
+            frame["expect"] = "comma"
+            self.stack.append({
+                "type": "object" if char == "{" else "array",
+                "expect": "key" if char == "{" else "value",
+                "key": frame["pending"] if frame["type"] == "object" else None,
+                "pending": None,
+                "comma": None,
+                "start": index
+            })
+            self._mark_safe(index)
+            return True
+        
+        if char == ":":
+            if frame["type"] != "object" or expect != "colon":
+                return False
+            frame["expect"] = "value"
+            return True
+        
+        if char == ",":
+            if expect != "comma":
+                return False
+            frame["expect"] = "key" if frame["type"] == "object" else "value"
+            frame["comma"] = index
+            return True
+        
+        if char in "}]":
+            closes = "object" if char == "}" else "array"
+            # Empty containers and a trailing comma are accepted
+            if frame["type"] != closes or expect not in ("key", "value", "comma"):
+                return False
+            if expect != "comma" and frame.get("comma") is not None:
+                self.trailing_commas.append(frame["comma"])
+            self.stack.pop()
+            if not self.stack:
+                try:
+                    value = json.loads(self._slice(self.start, index + 1))
+                except ValueError:
+                    value = None
+                if not isinstance(value, dict):
+                    return False
+                self.result = value
+                return True
+            # Objects inside a watched array are emitted whole
+            parent = self.stack[-1]
+            value = None
+            if len(self.stack) == 2 and parent["type"] == "array" and parent["key"] in self.watch:
+                try:
+                    value = json.loads(self._slice(frame["start"], index + 1))
+                except ValueError:
+                    return False
+            self._value_complete(value, index, events, container=True)
+            return True
+        
+        if char in LITERAL_CHARS and expect == "value":
+            self.literal = char
+            return True
+        
+        return False
+    
+    def _end_string(self, index: int, events: List) -> bool:
+        frame = self.stack[-1]
+        try:
+            value = json.loads(self.text[self.string_start:index + 1])
+        except ValueError:
+            return False
+        if frame["type"] == "object" and frame["expect"] == "key":
+            frame["pending"] = value
+            frame["expect"] = "colon"
+            return True
+        self._value_complete(value, index, events)
+        return True
+    
+    def _end_literal(self, index: int, events: List) -> bool:
+        literal, self.literal = self.literal, ""
+        try:
+            value = json.loads(literal)
+        except ValueError:
+            return False
+        self._value_complete(value, index - 1, events)
+        return True
+    
+    def _value_complete(self, value: Any, end: int, events: List, container: bool = False):
+        frame = self.stack[-1]
+        frame["expect"] = "comma"
+        if len(self.stack) == 2 and frame["type"] == "array" and frame["key"] in self.watch:
+            events.append((frame["key"], value))
+        elif len(self.stack) == 1 and frame["pending"] in self.watch and not container:
+            events.append((frame["pending"], value))
+        self._mark_safe(end)
+    
+    def _slice(self, start: int, end: int) -> str:
+        """Text of the candidate between start and end, without trailing commas"""
+        text = self.text[start:end]
+        for comma in sorted(self.trailing_commas, reverse=True):
+            if start <= comma < end:
+                text = text[:comma - start] + text[comma - start + 1:]
+        return text
+    
+    def _mark_safe(self, end: int):
+        """Remember a point where closing every open container yields valid JSON"""
+        closers = "".join("}" if frame["type"] == "object" else "]" for frame in reversed(self.stack))
+        self.safe = (end, closers)
+
+def parse_json_object(text: str) -> Optional[Dict]:
+    """First JSON object in text, tolerating prose, fences, stray braces and truncation"""
+    parser = StreamingJSONParser(watch=())
+    parser.feed(text)
+    return parser.close()
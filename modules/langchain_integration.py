@@ -1,11 +1,18 @@
 import os
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
-from langchain.memory import ConversationSummaryMemory
-from langchain.memory.buffer import ConversationBufferMemory as LegacyBufferMemory
 import warnings
+from config import ANALYSIS_REUSE_CONFIG, CHAT_MEMORY_CONFIG, PROMPT_BUDGET_CONFIG
+from modules.rule_engine import get_rule_engine
+from modules.analysis_reuse import AnalysisReuseIndex
+from modules.code_templates import render_code
+from modules.prompt_builder import PromptBuilder, add_test_results, estimate_tokens
+from modules.static_analyzer import analyze_code, format_findings
+from modules.json_stream import StreamingJSONParser, parse_json_object
+from modules.model_router import DIRECT_PROVIDERS, get_router
+from modules.token_usage import tracked_generate, tracked_run
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
@@ -13,24 +20,35 @@ class LangChainIntegration:
     """Handles LLM interactions using LangChain"""
     
     def __init__(self):
-        api_key = os.environ.get("GEMINI_API_KEY", "")
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-pro",
-            google_api_key=api_key,
-            temperature=0.7
-        ) if api_key else None
+        self.api_key = os.environ.get("GEMINI_API_KEY", "")
+        self.router = get_router()
+        self._chat_models = {}
         
-        try:
-            # Try new approach first (if available in your LangChain version)
-            self.memory = ConversationSummaryMemory(llm=self.llm) if self.llm else None
-        except:
-            # Fallback for older versions
-            self.memory = None
+        self.reuse_index = AnalysisReuseIndex()
     
-    def analyze_requirement_with_langchain(self, requirement: str) -> Dict:
-        """Use LangChain to analyze requirements"""
+    def analyze_requirement_with_langchain(self, requirement: str, allow_reuse: bool = True, history: str = "", on_item: Optional[Callable[[str, Any], None]] = None, stage: str = "analysis") -> Dict:
+        """
+        Use LangChain to analyze requirements
+        
+        Args:
+            requirement: Requirement text
+            allow_reuse: Return the stored analysis of a similar past requirement if one exists
+            history: Conversation so far (summary plus recent messages, see ChatMemory)
+            on_item: Called with ("tasks", task) or ("libraries", library) as
+                each entry of the streamed response completes
+            stage: Routing stage; chat messages use "chat"
+        
+        Returns:
+            Analysis dictionary; a reused analysis carries a "reused_from" key
+        """
+        
+        # A follow-up message only makes sense with its conversation, so it is never reused or indexed
+        if allow_reuse and not history and ANALYSIS_REUSE_CONFIG["mode"] != "off":
+            reused = self._reuse_analysis(requirement)
+            if reused:
+                return reused
         
-        if not self.llm:
+        if not self.router.available:
             return self._fallback_analysis(requirement)
         
         template = """
@@ -40,37 +58,146 @@ class LangChainIntegration:
         3. Input/Output specifications
         4. Potential risks and constraints
         
-        Requirement: {requirement}
+        {requirement_and_history}
         
         Provide a structured analysis in JSON format.
         """
         
         prompt = PromptTemplate(
-            input_variables=["requirement"],
+            input_variables=["requirement_and_history"],
             template=template
         )
         
+        # Long requirements (with uploaded documents appended) and long chats are trimmed to the budget
+        builder = PromptBuilder(PROMPT_BUDGET_CONFIG["analysis"] - estimate_tokens(template))
+        if history:
+            builder.add("history", f"Conversation so far, which the requirement may refer to:\n{history}", 2, keep="tail")
+        builder.add("requirement", f"Requirement: {requirement}", 1)
+        inputs = {"requirement_and_history": builder.build()}
+        
         try:
-            chain = LLMChain(llm=self.llm, prompt=prompt)
-            response = chain.run(requirement=requirement)
+            if on_item:
+                parser = StreamingJSONParser()
+                for chunk in self._stream(stage, prompt, **inputs):
+                    for field, value in parser.feed(chunk):
+                        on_item(field, value)
+                result = parser.close()
+            else:
+                result = parse_json_object(self._run(stage, prompt, **inputs))
             
-            # Parse response
-            import json
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = response[start_idx:end_idx]
-                return json.loads(json_str)
+            if result is not None:
+                if not history:
+                    self._remember_analysis(requirement, result)
+                return result
         except Exception as e:
             print(f"LangChain error: {str(e)}")
         
         return self._fallback_analysis(requirement)
     
+    def summarize_conversation(self, previous_summary: str, messages: List[Dict]) -> str:
+        """
+        Fold new chat messages into a running conversation summary
+        
+        Args:
+            previous_summary: Summary so far (may be empty)
+            messages: New messages, oldest first
+        
+        Returns:
+            Updated summary, or an empty string when no LLM is configured
+        """
+        
+        if not self.router.available:
+            return ""
+        
+        template = """
+        Progressively summarize a conversation about a software project.
+        Keep requirements, decisions and open questions; drop small talk.
+        Answer with the new summary only, in at most {max_words} words.
+        
+        Current summary:
+        {summary}
+        
+        New messages:
+        {messages}
+        
+        New summary:
+        """
+        
+        prompt = PromptTemplate(
+            input_variables=["max_words", "summary", "messages"],
+            template=template
+        )
+        
+        limit = CHAT_MEMORY_CONFIG["max_message_chars"]
+        new_lines = "\n".join(f"{message['role']}: {message['content'][:limit]}" for message in messages)
+        
+        summary = self._run(
+            "chat_summary",
+            prompt,
+            max_words=CHAT_MEMORY_CONFIG["max_summary_tokens"] * 3 // 4,
+            summary=previous_summary or "(none)",
+            messages=new_lines
+        )
+        return summary.strip()
+    
+    def _reuse_analysis(self, requirement: str):
+        """Stored analysis of a similar requirement, confirmed by the LLM in confirm mode"""
+        try:
+            match = self.reuse_index.find_similar(requirement)
+        except Exception as e:
+            print(f"Analysis reuse lookup failed: {str(e)}")
+            return None
+        
+        if not match:
+            return None
+        
+        confirmed = ANALYSIS_REUSE_CONFIG["mode"] == "confirm" and self.router.available
+        if confirmed and not self._confirm_same_requirement(requirement, match["requirement"]):
+            return None
+        
+        self.reuse_index.record_hit(match["id"])
+        analysis = match["analysis"]
+        analysis["reused_from"] = {
+            "requirement": match["requirement"][:200],
+            "similarity": round(match["similarity"], 3),
+            "confirmed": confirmed
+        }
+        return analysis
+    
+    def _confirm_same_requirement(self, requirement: str, previous: str) -> bool:
+        """Cheap yes/no LLM check that two requirements describe the same program"""
+        template = """
+        Do these two software requirements ask for the same program? Answer only YES or NO.
+        
+        A: {previous}
+        
+        B: {requirement}
+        """
+        
+        prompt = PromptTemplate(
+            input_variables=["previous", "requirement"],
+            template=template
+        )
+        
+        try:
+            answer = self._run("reuse_check", prompt, previous=previous[:2000], requirement=requirement[:2000])
+            return answer.strip().upper().startswith("YES")
+        except Exception as e:
+            print(f"Reuse confirmation error: {str(e)}")
+            return False
+    
+    def _remember_analysis(self, requirement: str, analysis: Dict):
+        """Index a fresh LLM analysis for reuse"""
+        try:
+            self.reuse_index.remember(requirement, analysis)
+        except Exception as e:
+            print(f"Could not store analysis for reuse: {str(e)}")
+    
     def generate_code_with_langchain(self, analysis: Dict) -> str:
         """Use LangChain to generate code"""
         
-        if not self.llm:
-            return "# Generated code placeholder"
+        if not self.router.available:
+            return render_code(analysis)
         
         tasks = ", ".join(analysis.get("tasks", []))
         libraries = ", ".join(analysis.get("libraries", []))
@@ -96,26 +223,22 @@ class LangChainIntegration:
         )
         
         try:
-            chain = LLMChain(llm=self.llm, prompt=prompt)
-            code = chain.run(tasks=tasks, libraries=libraries)
+            code = self._run("generation", prompt, tasks=tasks, libraries=libraries)
             return code
         except Exception as e:
             print(f"Code generation error: {str(e)}")
-            return "# Code generation failed"
+            return render_code(analysis)
     
     def review_code_with_langchain(self, code: str, test_results: Dict) -> Dict:
         """Use LangChain for code review"""
         
-        if not self.llm:
+        if not self.router.available:
             return {"summary": "Review pending", "improvements": []}
         
         template = """
         Review the following Python code and provide improvements:
         
-        Code:
-        {code}
-        
-        Test Results: {test_results}
+        {code_and_results}
         
         Provide:
         1. Code quality assessment
@@ -125,13 +248,23 @@ class LangChainIntegration:
         """
         
         prompt = PromptTemplate(
-            input_variables=["code", "test_results"],
+            input_variables=["code_and_results"],
             template=template
         )
         
+        # Failures and a log excerpt instead of the whole result dict and pytest log
+        builder = PromptBuilder(PROMPT_BUDGET_CONFIG["review"] - estimate_tokens(template))
+        builder.add("code", f"Code:\n{code}", 1, keep="whole")
+        add_test_results(builder, test_results, failure_priority=2, log_priority=3)
+        findings = format_findings(analyze_code(code))
+        if findings:
+            builder.add("static analysis", f"Static analysis findings to address:\n{findings}", 2)
+        code_and_results = builder.build()
+        if not builder.included("code"):
+            return {"summary": "Review skipped: the code does not fit the prompt budget", "improvements": []}
+        
         try:
-            chain = LLMChain(llm=self.llm, prompt=prompt)
-            review = chain.run(code=code, test_results=str(test_results))
+            review = self._run("review", prompt, code_and_results=code_and_results)
             
             return {
                 "summary": review,
@@ -141,6 +274,46 @@ class LangChainIntegration:
             print(f"Review error: {str(e)}")
             return {"summary": "Review failed", "improvements": []}
     
+    def _run(self, stage: str, prompt: PromptTemplate, **inputs) -> str:
+        """Run a prompt on the stage's routed models, failing over between them"""
+        
+        def run_route(route: Dict) -> str:
+            # Local and cassette providers see exactly the prompt LangChain would send
+            if route["provider"] in DIRECT_PROVIDERS:
+                return tracked_generate(self.router.model(route, stage), prompt.format(**inputs), stage).text
+            
+            chain = LLMChain(
+                llm=self._chat_model(route),
+                prompt=prompt,
+                llm_kwargs={"stop": route["stop_sequences"]} if route["stop_sequences"] else {}
+            )
+            return tracked_run(chain, stage, **inputs)
+        
+        return self.router.call(stage, run_route)
+    
+    def _stream(self, stage: str, prompt: PromptTemplate, **inputs) -> Iterator[str]:
+        """Stream a prompt's response from the stage's routed models"""
+        
+        def open_route(route: Dict, stage: str, text: str) -> Iterator[str]:
+            if route["provider"] in DIRECT_PROVIDERS:
+                return self.router.open_stream(route, stage, text)
+            stop = route["stop_sequences"] or None
+            return (chunk.content for chunk in self._chat_model(route).stream(text, stop=stop))
+        
+        return self.router.stream(stage, prompt.format(**inputs), open_stream=open_route)
+    
+    def _chat_model(self, route: Dict) -> ChatGoogleGenerativeAI:
+        """LangChain chat model for a route's model and generation settings"""
+        key = (route["model"], route["temperature"], route["max_output_tokens"])
+        if key not in self._chat_models:
+            self._chat_models[key] = ChatGoogleGenerativeAI(
+                model=route["model"],
+                google_api_key=self.api_key,
+                temperature=route["temperature"],
+                max_output_tokens=route["max_output_tokens"]
+            )
+        return self._chat_models[key]
+    
     def _extract_improvements(self, review_text: str) -> List[str]:
         """Extract improvements from review text"""
         improvements = []
@@ -154,9 +327,4 @@ class LangChainIntegration:
     
     def _fallback_analysis(self, requirement: str) -> Dict:
         """Fallback analysis"""
-        return {
-            "tasks": ["Analyze requirement", "Plan solution", "Implement code"],
-            "libraries": ["os", "sys"],
-            "input_output": "Standard I/O",
-            "constraints": "None"
-        }
+        return get_rule_engine().analyze(requirement)
@@ -0,0 +1,555 @@
+import contextvars
+import json
+import re
+import threading
+import time
+from collections import deque
+from queue import Empty, Queue
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import google.generativeai as genai
+from config import CASSETTE_CONFIG, GEMINI_API_KEY, MODEL_ROUTING_CONFIG, RESILIENCE_CONFIG
+from modules.cassette import Cassette, CassetteMiss
+from modules.deadlines import DeadlineExceeded, remaining
+from modules.rule_engine import get_rule_engine
+from modules.prompt_builder import estimate_tokens
+from modules.token_usage import record_usage, tracked_generate
+
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+class ModelStats:
+    """Rolling latency and error rate of one model"""
+    
+    def __init__(self, window: int):
+        self.calls = deque(maxlen=window)
+        self.last_failure = 0.0
+        self.lock = threading.Lock()
+    
+    def record(self, latency_ms: float, ok: bool):
+        with self.lock:
+            self.calls.append((latency_ms, ok))
+            if not ok:
+                self.last_failure = time.monotonic()
+    
+    def error_rate(self) -> float:
+        with self.lock:
+            return sum(1 for _, ok in self.calls if not ok) / len(self.calls) if self.calls else 0.0
+    
+    def p95_latency_ms(self) -> Optional[float]:
+        with self.lock:
+            latencies = sorted(latency for latency, ok in self.calls if ok)
+        return latencies[int(0.95 * (len(latencies) - 1))] if latencies else None
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            samples = len(self.calls)
+        return {"samples": samples, "error_rate": self.error_rate(), "p95_latency_ms": self.p95_latency_ms()}
+
+class StubResponse:
+    """Mimics a Gemini response for the stub provider"""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+class StubModel:
+    """Local provider with canned, deterministic answers per stage"""
+    
+    CODE = (
+        'def main():\n'
+        '    """Entry point written by the stub provider"""\n'
+        '    print("Hello from the stub provider")\n'
+        '\n'
+        '\n'
+        'if __name__ == "__main__":\n'
+        '    main()\n'
+    )
+    
+    def __init__(self, stage: str, latency_ms: float = 0):
+        self.stage = stage
+        self.latency_ms = latency_ms
+        self.model_name = "stub"
+    
+    def generate_content(self, prompt: str) -> StubResponse:
+        if self.latency_ms:
+            # Simulated model latency for benchmarks
+            time.sleep(self.latency_ms / 1000)
+        if self.stage in ("analysis", "chat"):
+            requirement = prompt.split("Requirement:", 1)[-1]
+            return StubResponse(json.dumps(get_rule_engine().analyze(requirement)))
+        if self.stage == "planning":
+            return StubResponse('{"modules": []}')
+        if self.stage == "generation":
+            # For one module of a multi-module project, answer with its own interface stub
+            module = re.search(r"Write the complete code of (\w+)\.py", prompt)
+            if module and module.group(1) != "main":
+                stub = re.search(rf"# {module.group(1)}\.py\n(.*?)(?=\n# \w+\.py\n|\n\s*Write the complete code)", prompt, re.DOTALL)
+                if stub:
+                    return StubResponse(stub.group(1))
+            return StubResponse(self.CODE)
+        if self.stage == "reuse_check":
+            return StubResponse("NO")
+        if self.stage == "review":
+            return StubResponse("Stub review: no issues found.")
+        return StubResponse(prompt.strip()[-500:])
+
+# Providers answering without network access, and those called directly
+# rather than through LangChain's chat models
+LOCAL_PROVIDERS = ("stub", "replay")
+DIRECT_PROVIDERS = ("stub", "replay", "record")
+
+class ReplayModel:
+    """Serves responses recorded on a cassette, with simulated latency"""
+    
+    def __init__(self, cassette: Cassette, stage: str, config: Optional[Dict] = None):
+        self.cassette = cassette
+        self.stage = stage
+        self.config = config or CASSETTE_CONFIG
+        self.model_name = "replay"
+    
+    def generate_content(self, prompt: str, **kwargs) -> StubResponse:
+        try:
+            recorded = self.cassette.play(self.stage, prompt)
+        except CassetteMiss:
+            if self.config["on_miss"] == "stub":
+                return StubModel(self.stage).generate_content(prompt)
+            raise
+        
+        latency_ms = self.config["replay_latency_ms"]
+        if latency_ms is None:
+            latency_ms = recorded["latency_ms"] * self.config["replay_latency_scale"]
+        left = remaining()
+        if left is not None and latency_ms / 1000 > left:
+            time.sleep(left)
+            raise DeadlineExceeded(f"Deadline exceeded during {self.stage}")
+        time.sleep(latency_ms / 1000)
+        return StubResponse(recorded["text"])
+
+class RecordingModel:
+    """Wraps a Gemini model and saves every response to a cassette"""
+    
+    def __init__(self, model, cassette: Cassette, stage: str, model_name: str):
+        self.model = model
+        self.cassette = cassette
+        self.stage = stage
+        self.model_name = model_name
+    
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        start = time.perf_counter()
+        response = self.model.generate_content(prompt, stream=stream, **kwargs)
+        if stream:
+            return self._record_stream(prompt, response, start)
+        self.cassette.record(self.stage, self.model_name, prompt, response.text, (time.perf_counter() - start) * 1000)
+        return response
+    
+    def _record_stream(self, prompt: str, chunks, start: float):
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk.text)
+            yield chunk
+        self.cassette.record(self.stage, self.model_name, prompt, "".join(parts), (time.perf_counter() - start) * 1000)
+
+class RoutedModel:
+    """Stands in for a Gemini model; every call goes through the router"""
+    
+    def __init__(self, router: "ModelRouter", stage: str):
+        self.router = router
+        self.stage = stage
+        self.model_name = f"routed:{stage}"
+    
+    def generate_content(self, prompt: str, stage: Optional[str] = None):
+        """Generate with failover; stage overrides the default stage of this model"""
+        return self.router.generate(stage or self.stage, prompt)
+    
+    def stream(self, prompt: str, stage: Optional[str] = None) -> Iterator[str]:
+        """Response text chunks as they are produced"""
+        return self.router.stream(stage or self.stage, prompt)
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider that is currently degraded"""
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failed calls so callers fall back immediately,
+    then lets a single trial call through after reset_seconds
+    """
+    
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+    
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_seconds or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+    
+    def release(self):
+        """End a call without a verdict on the provider, e.g. when the caller's deadline passed or it stopped reading"""
+        with self.lock:
+            self.trial_running = False
+    
+    def record(self, ok: bool):
+        with self.lock:
+            self.trial_running = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class ModelRouter:
+    """
+    Picks a model and generation config per stage, tracks each model's
+    rolling latency and error rate, and fails over to the next model when a
+    call raises.
+    """
+    
+    def __init__(self, config: Optional[Dict] = None, api_key: str = GEMINI_API_KEY):
+        self.config = config or MODEL_ROUTING_CONFIG
+        self.provider = self.config["provider"]
+        self.api_key = api_key
+        self.stats: Dict[str, ModelStats] = {}
+        self._models: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.breaker = CircuitBreaker(RESILIENCE_CONFIG["breaker_failure_threshold"], RESILIENCE_CONFIG["breaker_reset_seconds"])
+        self.cassette = Cassette(CASSETTE_CONFIG["path"]) if self.provider in ("record", "replay") else None
+        # A hedged replay would advance the cassette twice; local answers gain nothing from hedging
+        self.hedge = RESILIENCE_CONFIG["hedge"] and self.provider not in LOCAL_PROVIDERS
+    
+    @property
+    def available(self) -> bool:
+        """Whether any provider can answer"""
+        return self.provider in LOCAL_PROVIDERS or bool(self.api_key)
+    
+    def model_for(self, stage: str) -> Optional[RoutedModel]:
+        """A routed model for a stage, or None when no provider is configured"""
+        return RoutedModel(self, stage) if self.available else None
+    
+    def routes(self, stage: str) -> List[Dict]:
+        """
+        Candidate models for a stage, best first
+        
+        Healthy models within the stage's latency target come first in
+        configured order, then slow ones, then those cooling down after errors.
+        """
+        settings = self.config["stages"].get(stage) or self.config["stages"]["generation"]
+        models = [self.provider] if self.provider in LOCAL_PROVIDERS else settings["models"]
+        
+        ranked = []
+        for position, model in enumerate(models):
+            stats = self._stats(model)
+            snapshot = stats.snapshot()
+            cooling = (
+                snapshot["samples"] >= self.config["min_samples"]
+                and snapshot["error_rate"] > self.config["max_error_rate"]
+                and time.monotonic() - stats.last_failure < self.config["cooldown_seconds"]
+            )
+            slow = bool(settings.get("max_latency_ms")) and (snapshot["p95_latency_ms"] or 0) > settings["max_latency_ms"]
+            ranked.append(((cooling, slow, position), {
+                "model": model,
+                "provider": self.provider,
+                "temperature": settings["temperature"],
+                "max_output_tokens": settings["max_output_tokens"],
+                "stop_sequences": settings.get("stop_sequences", [])
+            }))
+        return [route for _, route in sorted(ranked, key=lambda item: item[0])]
+    
+    def call(self, stage: str, function: Callable[[Dict], Any]) -> Any:
+        """
+        Run function(route) on the stage's routes until one succeeds
+        
+        A route that fails hands over to the next one. A route still running
+        after its model's p95 latency gets a hedged duplicate on the next route
+        (or the same one), and the first success wins; the losing attempts are
+        cancelled. Local providers are not hedged. Everything is bounded by
+        the current deadline, which does not count against the circuit breaker.
+        
+        Raises:
+            CircuitOpenError while the provider is degraded, DeadlineExceeded
+            when the deadline passes, or the last error when every model fails
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.provider} is degraded; skipping {stage} until the circuit closes")
+        
+        pending: Dict[Future, Dict] = {}
+        settled = False
+        
+        def launch(route: Dict):
+            # Each attempt runs in the caller's context so it sees the same deadline
+            future = _executor.submit(contextvars.copy_context().run, self._attempt, stage, route, function)
+            pending[future] = route
+        
+        try:
+            routes = self.routes(stage)
+            if not routes:
+                raise RuntimeError(f"No model configured for {stage}")
+            
+            launched = 0
+            hedged = False
+            last_error = None
+            
+            launch(routes[0])
+            launched = 1
+            while pending:
+                hedge_delay = None if hedged or not self.hedge else self._hedge_delay(routes[0]["model"])
+                waits = [seconds for seconds in (hedge_delay, remaining()) if seconds is not None]
+                done, _ = wait(pending, timeout=min(waits) if waits else None, return_when=FIRST_COMPLETED)
+                
+                if not done:
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        # The caller ran out of time; that says nothing about the provider
+                        raise DeadlineExceeded(f"Deadline exceeded during {stage}")
+                    if hedged:
+                        continue
+                    # Slower than usual: send a duplicate and take whichever answers first
+                    hedged = True
+                    launch(routes[launched] if launched < len(routes) else routes[0])
+                    launched = min(launched + 1, len(routes))
+                    continue
+                
+                for future in done:
+                    pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    self.breaker.record(ok=True)
+                    settled = True
+                    return result
+                
+                if not pending and launched < len(routes):
+                    launch(routes[launched])
+                    launched += 1
+            
+            if not isinstance(last_error, DeadlineExceeded):
+                self.breaker.record(ok=False)
+                settled = True
+            raise last_error
+        finally:
+            # Losing hedges and attempts abandoned at the deadline are not waited for
+            for future in pending:
+                future.cancel()
+            if not settled:
+                self.breaker.release()
+    
+    def _attempt(self, stage: str, route: Dict, function: Callable[[Dict], Any]) -> Any:
+        """One call on one route, recorded in the model's stats"""
+        start = time.perf_counter()
+        try:
+            result = function(route)
+        except Exception as e:
+            self._stats(route["model"]).record((time.perf_counter() - start) * 1000, ok=False)
+            print(f"Model {route['model']} failed for {stage}: {str(e)}")
+            raise
+        self._stats(route["model"]).record((time.perf_counter() - start) * 1000, ok=True)
+        return result
+    
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging: the model's p95 latency once it has enough samples"""
+        snapshot = self._stats(model).snapshot()
+        if snapshot["samples"] < self.config["min_samples"] or snapshot["p95_latency_ms"] is None:
+            return None
+        return max(snapshot["p95_latency_ms"], RESILIENCE_CONFIG["hedge_min_delay_ms"]) / 1000
+    
+    def generate(self, stage: str, prompt: str):
+        """Gemini-style generate_content with routing, failover and usage tracking"""
+        def generate_route(route: Dict):
+            left = remaining()
+            options = {"request_options": {"timeout": left}} if left is not None and route["provider"] not in LOCAL_PROVIDERS else {}
+            response = tracked_generate(self.model(route, stage), prompt, stage, **options)
+            # Blocked or empty candidates raise here, so the next model is tried
+            response.text
+            return response
+        
+        return self.call(stage, generate_route)
+    
+    def stream(self, stage: str, prompt: str, open_stream: Optional[Callable[[Dict, str, str], Iterator[str]]] = None) -> Iterator[str]:
+        """
+        Yield the response text in chunks as the model produces it
+        
+        Fails over to the next model only until the first chunk arrives; a
+        stream that breaks later raises. Streams are not hedged, and a stream
+        that stalls past the deadline raises DeadlineExceeded. Only provider
+        errors count against the circuit breaker, not the deadline or a
+        caller that stops reading.
+        
+        Args:
+            stage: Pipeline stage
+            prompt: Prompt text
+            open_stream: (route, stage, prompt) -> chunk iterator; Gemini by default
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.provider} is degraded; skipping {stage} until the circuit closes")
+        
+        open_stream = open_stream or self.open_stream
+        last_error = None
+        settled = False
+        try:
+            for route in self.routes(stage):
+                start = time.perf_counter()
+                chunks = []
+                try:
+                    for chunk in self._within_deadline(open_stream(route, stage, prompt), stage):
+                        if remaining() == 0:
+                            raise DeadlineExceeded(f"Deadline exceeded during {stage}")
+                        chunks.append(chunk)
+                        yield chunk
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    self._stats(route["model"]).record((time.perf_counter() - start) * 1000, ok=False)
+                    print(f"Model {route['model']} failed for {stage}: {str(e)}")
+                    last_error = e
+                    if chunks:
+                        self.breaker.record(ok=False)
+                        settled = True
+                        raise
+                    continue
+                
+                latency_ms = (time.perf_counter() - start) * 1000
+                self._stats(route["model"]).record(latency_ms, ok=True)
+                self.breaker.record(ok=True)
+                settled = True
+                record_usage(stage, route["model"], estimate_tokens(prompt), estimate_tokens("".join(chunks)), int(latency_ms))
+                return
+            
+            if last_error is None:
+                raise RuntimeError(f"No model configured for {stage}")
+            self.breaker.record(ok=False)
+            settled = True
+            raise last_error
+        finally:
+            # Also reached when the caller stops reading (GeneratorExit) or runs out of time
+            if not settled:
+                self.breaker.release()
+    
+    def _within_deadline(self, chunks: Iterator[str], stage: str) -> Iterator[str]:
+        """
+        Chunks of a stream, raising DeadlineExceeded when the next one does not
+        arrive in time
+        
+        Under a deadline the stream is read on its own thread, so a stalled
+        provider cannot hold the caller past the deadline.
+        """
+        if remaining() is None:
+            yield from chunks
+            return
+        
+        received: Queue = Queue()
+        stop = threading.Event()
+        
+        def read():
+            try:
+                for chunk in chunks:
+                    if stop.is_set():
+                        return
+                    received.put((chunk, False, None))
+                received.put((None, True, None))
+            except Exception as e:
+                received.put((None, True, e))
+        
+        threading.Thread(target=contextvars.copy_context().run, args=(read,), name="llm-stream", daemon=True).start()
+        try:
+            while True:
+                try:
+                    chunk, finished, error = received.get(timeout=remaining())
+                except Empty:
+                    raise DeadlineExceeded(f"Deadline exceeded during {stage}")
+                if error is not None:
+                    raise error
+                if finished:
+                    return
+                yield chunk
+        finally:
+            stop.set()
+    
+    def open_stream(self, route: Dict, stage: str, prompt: str) -> Iterator[str]:
+        """Chunks of a Gemini streaming response; local providers stream their whole answer"""
+        model = self.model(route, stage)
+        if route["provider"] in LOCAL_PROVIDERS:
+            text = model.generate_content(prompt).text
+            for position in range(0, len(text), 40):
+                yield text[position:position + 40]
+            return
+        
+        left = remaining()
+        options = {"request_options": {"timeout": left}} if left is not None else {}
+        for chunk in model.generate_content(prompt, stream=True, **options):
+            yield chunk.text
+    
+    def model(self, route: Dict, stage: str):
+        """Provider model object for a route, created once per model and stage"""
+        key = (route["model"], stage)
+        with self._lock:
+            if key not in self._models:
+                if route["provider"] == "stub":
+                    self._models[key] = StubModel(stage, self.config.get("stub_latency_ms", 0))
+                elif route["provider"] == "replay":
+                    self._models[key] = ReplayModel(self.cassette, stage)
+                else:
+                    model = genai.GenerativeModel(
+                        route["model"],
+                        generation_config=genai.GenerationConfig(
+                            temperature=route["temperature"],
+                            max_output_tokens=route["max_output_tokens"],
+                            stop_sequences=route["stop_sequences"] or None
+                        )
+                    )
+                    if route["provider"] == "record":
+                        model = RecordingModel(model, self.cassette, stage, route["model"])
+                    self._models[key] = model
+            return self._models[key]
+    
+    def model_stats(self) -> Dict[str, Dict]:
+        """Rolling stats of every model used so far"""
+        with self._lock:
+            stats = dict(self.stats)
+        return {model: model_stats.snapshot() for model, model_stats in stats.items()}
+    
+    def _stats(self, model: str) -> ModelStats:
+        with self._lock:
+            if model not in self.stats:
+                self.stats[model] = ModelStats(self.config["window"])
+            return self.stats[model]
+
+# Attempts run here so the caller can stop waiting at its deadline or hedge
+_executor = ThreadPoolExecutor(max_workers=RESILIENCE_CONFIG["hedge_workers"], thread_name_prefix="llm")
+
+# One router per process so latency and error history survive Streamlit reruns
+_router = None
+_router_lock = threading.Lock()
+
+def get_router() -> ModelRouter:
+    """Return the process-wide model router"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
+
+def set_router(router: Optional[ModelRouter]):
+    """Replace the process-wide model router (e.g. with a benchmark's stub router); None resets it"""
+    global _router
+    with _router_lock:
+        _router = router
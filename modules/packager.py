@@ -0,0 +1,109 @@
+import io
+import json
+import zipfile
+from datetime import datetime
+from typing import Dict, Optional
+
+GITIGNORE = """__pycache__/
+*.py[cod]
+*$py.class
+*.so
+.Python
+build/
+develop-eggs/
+dist/
+downloads/
+eggs/
+.eggs/
+lib/
+lib64/
+parts/
+sdist/
+var/
+wheels/
+*.egg-info/
+.installed.cfg
+*.egg
+.env
+.venv
+venv/
+"""
+
+def build_package(
+    files: Dict[str, str],
+    analysis: Optional[Dict] = None,
+    test_results: Optional[Dict] = None,
+    review_report: Optional[Dict] = None,
+    project_title: str = "Generated Project"
+) -> bytes:
+    """
+    ZIP package of a generated project
+    
+    Args:
+        files: File name -> code of the generated files
+        analysis: Requirement analysis; its libraries become requirements.txt
+        test_results: Test results; the log is included
+        review_report: Review report; the summary and refined code are included
+        project_title: Title used in the README and metadata
+    
+    Returns:
+        ZIP file contents
+    """
+    
+    zip_buffer = io.BytesIO()
+    test_results = test_results if isinstance(test_results, dict) else None
+    
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        # Add main files
+        for filename, code in files.items():
+            zip_file.writestr(filename, code)
+        
+        if test_results:
+            zip_file.writestr("test_results.txt", test_results.get("log", "No tests run"))
+        
+        if isinstance(review_report, dict):
+            zip_file.writestr("review_report.txt", review_report.get("summary", ""))
+            if review_report.get("refined_code"):
+                zip_file.writestr("main_refined.py", review_report["refined_code"])
+        
+        # Add requirements.txt
+        if analysis:
+            zip_file.writestr("requirements.txt", "\n".join(analysis.get("libraries", [])) + "\n")
+        
+        # Add README.md
+        readme = f"""# {project_title}
+
+## Overview
+This is an auto-generated Python project using SASDS (Single Agent Software Development System).
+
+## Files
+- main.py - Main generated code
+- main_refined.py - Refined version after review (if available)
+- test_results.txt - Test execution results
+- review_report.txt - Code review report
+- requirements.txt - Python dependencies
+
+## How to Run
+1. Install dependencies: pip install -r requirements.txt
+2. Run the project: python main.py
+3. Run tests: pytest test_main.py
+
+## Generated At
+{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+"""
+        zip_file.writestr("README.md", readme)
+        zip_file.writestr(".gitignore", GITIGNORE)
+        
+        # Add project metadata
+        metadata = {
+            "project_title": project_title,
+            "generated_at": datetime.now().isoformat(),
+            "analysis": analysis or {},
+            "test_summary": {
+                "passed": test_results.get("passed", 0) if test_results else 0,
+                "failed": test_results.get("failed", 0) if test_results else 0,
+            }
+        }
+        zip_file.writestr("project_metadata.json", json.dumps(metadata, indent=2))
+    
+    return zip_buffer.getvalue()
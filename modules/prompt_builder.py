@@ -0,0 +1,137 @@
+import re
+from typing import Dict, List, Optional
+from config import PROMPT_BUDGET_CONFIG
+
+# Words and single punctuation marks; long words count as several tokens
+TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+FAILURE_LINE = re.compile(r"FAILED|ERROR|Error|Exception|Traceback|assert|^E\s", re.MULTILINE)
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the number of LLM tokens in text without a tokenizer.
+    Subword tokenizers split words into pieces of about four characters.
+    """
+    if not text:
+        return 0
+    return sum((len(piece) + 3) // 4 if piece[0].isalpha() else max(1, len(piece) // 3) for piece in TOKEN_PIECES.findall(text))
+
+def log_excerpt(log: str, max_lines: int = 60, context_lines: int = 2) -> str:
+    """
+    Lines of a test log around failures and errors, plus its final summary line
+    
+    Args:
+        log: Full pytest output
+        max_lines: Upper bound on returned lines
+        context_lines: Lines kept before and after each failure line
+    
+    Returns:
+        The excerpt, with "..." marking skipped lines
+    """
+    
+    lines = log.splitlines()
+    if len(lines) <= max_lines:
+        return log
+    
+    keep = set()
+    for number, line in enumerate(lines):
+        if FAILURE_LINE.search(line):
+            keep.update(range(max(0, number - context_lines), min(len(lines), number + context_lines + 1)))
+    keep.update(range(max(0, len(lines) - 3), len(lines)))
+    
+    excerpt = []
+    previous = -1
+    for number in sorted(keep)[-max_lines:]:
+        if number != previous + 1:
+            excerpt.append("...")
+        excerpt.append(lines[number])
+        previous = number
+    return "\n".join(excerpt)
+
+class PromptBuilder:
+    """
+    Packs prompt sections into a token budget by priority.
+    
+    Sections are kept in the order they were added, but when the budget runs
+    out the lowest-priority sections (highest number) are trimmed first and
+    dropped entirely if nothing of them fits.
+    """
+    
+    def __init__(self, budget_tokens: int):
+        self.budget_tokens = budget_tokens
+        self.sections: List[Dict] = []
+        self.report: List[Dict] = []
+    
+    def add(self, name: str, text: str, priority: int, keep: str = "head") -> "PromptBuilder":
+        """
+        Add a section
+        
+        Args:
+            name: Label used in the packing report
+            text: Section text (empty sections are ignored)
+            priority: 0 is packed first
+            keep: Part to keep when trimming: "head" or "tail", or "whole" for
+                sections such as code that are dropped rather than trimmed
+        """
+        if text and text.strip():
+            self.sections.append({"name": name, "text": text, "priority": priority, "keep": keep})
+        return self
+    
+    def build(self) -> str:
+        """Assemble the prompt within the budget"""
+        remaining = self.budget_tokens
+        packed: Dict[int, str] = {}
+        self.report = []
+        
+        for position, section in sorted(enumerate(self.sections), key=lambda item: (item[1]["priority"], item[0])):
+            tokens = estimate_tokens(section["text"])
+            if tokens <= remaining:
+                packed[position] = section["text"]
+                remaining -= tokens
+                self.report.append({"name": section["name"], "tokens": tokens, "status": "included"})
+                continue
+            
+            trimmed = None if section["keep"] == "whole" else self._trim(section["text"], remaining, section["keep"])
+            if trimmed:
+                packed[position] = trimmed
+                used = estimate_tokens(trimmed)
+                remaining -= used
+                self.report.append({"name": section["name"], "tokens": used, "status": f"trimmed from {tokens}"})
+            else:
+                self.report.append({"name": section["name"], "tokens": 0, "status": "dropped"})
+        
+        return "\n\n".join(packed[position] for position in sorted(packed))
+    
+    def included(self, name: str) -> bool:
+        """Whether the last build() kept a section in full"""
+        return any(entry["name"] == name and entry["status"] == "included" for entry in self.report)
+    
+    def _trim(self, text: str, budget: int, keep: str) -> Optional[str]:
+        """Cut whole lines from one end until the text fits the budget"""
+        if budget <= 0:
+            return None
+        
+        lines = text.splitlines()
+        marker = "... [trimmed to fit the prompt budget]"
+        # Start from a proportional guess, then shrink until it fits
+        count = max(1, int(len(lines) * budget / max(estimate_tokens(text), 1)))
+        while count > 0:
+            kept = lines[:count] if keep == "head" else lines[-count:]
+            candidate = "\n".join(kept + [marker] if keep == "head" else [marker] + kept)
+            if estimate_tokens(candidate) <= budget:
+                return candidate
+            count = count - 1 if count < 20 else int(count * 0.9)
+        return None
+
+def add_test_results(builder: PromptBuilder, test_results: Dict, failure_priority: int, log_priority: int) -> PromptBuilder:
+    """Add a test run as a status line, its failures and an excerpt of its log"""
+    builder.add("test status", f"Current test status: Tests Passed: {test_results.get('passed', 0)}, Failed: {test_results.get('failed', 0)}", 0)
+    if test_results.get("failed", 0) > 0:
+        builder.add("test failures", f"Failures:\n{test_results.get('failures', '')}", failure_priority)
+        builder.add(
+            "test log",
+            f"Test log excerpt:\n{log_excerpt(test_results.get('log', ''), PROMPT_BUDGET_CONFIG['log_excerpt_lines'])}",
+            log_priority,
+            keep="tail"
+        )
+    return builder
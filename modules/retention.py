@@ -0,0 +1,272 @@
+import argparse
+import gzip
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import func
+from config import RETENTION_CONFIG
+from database_models import engine, session_scope, ChatSession, ChatMessage
+from modules.cache import list_cache
+from modules.chat_manager import get_chat_writer
+from modules.storage import ProjectStorage
+
+# Deletes and restores are chunked to stay under SQLite's bound-parameter limit
+DELETE_CHUNK_SIZE = 500
+
+PROJECT_TABLE_COLUMNS = {
+    "test_results": ["id", "project_id", "passed", "failed", "log", "created_at"],
+    "review_reports": ["id", "project_id", "report", "created_at"]
+}
+
+class RetentionManager:
+    """Applies retention policies, archives old rows to compressed JSONL and compacts the databases"""
+    
+    def __init__(self, project_db_path: str = "projects.db", archive_dir: Optional[str] = None, policies: Optional[Dict] = None):
+        self.project_db_path = project_db_path
+        self.archive_dir = Path(archive_dir or RETENTION_CONFIG["archive_dir"])
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.policies = {**RETENTION_CONFIG, **(policies or {})}
+    
+    def run(self) -> Dict:
+        """
+        Run every retention policy, then compact
+        
+        Returns:
+            Dictionary with the number of archived rows per policy and the archive files written
+        """
+        
+        # Make sure queued writes are on disk before deciding what is old
+        get_chat_writer().flush()
+        ProjectStorage(self.project_db_path).flush()
+        
+        summary = {"archives": []}
+        
+        for table, policy in [("test_results", "keep_test_logs_per_project"), ("review_reports", "keep_review_reports_per_project")]:
+            keep = self.policies.get(policy)
+            if keep is None:
+                continue
+            count, path = self.prune_project_rows(table, keep)
+            summary[table] = count
+            if path:
+                summary["archives"].append(str(path))
+        
+        idle_days = self.policies.get("archive_sessions_idle_days")
+        if idle_days is not None:
+            count, path = self.archive_idle_sessions(idle_days)
+            summary["chat_sessions"] = count
+            if path:
+                summary["archives"].append(str(path))
+        
+        self.compact()
+        list_cache.clear()
+        return summary
+    
+    def prune_project_rows(self, table: str, keep: int):
+        """
+        Archive and delete all but the newest `keep` rows per project
+        
+        Args:
+            table: test_results or review_reports
+            keep: Number of rows to keep for each project
+        
+        Returns:
+            Tuple of (archived row count, archive path or None)
+        """
+        
+        columns = PROJECT_TABLE_COLUMNS[table]
+        query = f'''
+            SELECT {", ".join(columns)} FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY project_id ORDER BY id DESC) AS row_rank
+                FROM {table}
+            ) WHERE row_rank > ?
+        '''
+        
+        with sqlite3.connect(self.project_db_path) as conn:
+            rows = (
+                {"table": table, "row": dict(zip(columns, row))}
+                for row in conn.execute(query, (keep,))
+            )
+            path, ids = self._write_archive(table, rows)
+            
+            for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+                chunk = ids[start:start + DELETE_CHUNK_SIZE]
+                conn.execute(f"DELETE FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            conn.commit()
+        
+        return len(ids), path
+    
+    def archive_idle_sessions(self, idle_days: int):
+        """
+        Archive and delete chat sessions with no activity for `idle_days`
+        
+        Returns:
+            Tuple of (archived session count, archive path or None)
+        """
+        
+        cutoff = datetime.utcnow() - timedelta(days=idle_days)
+        
+        with session_scope() as db:
+            last_activity = func.coalesce(ChatSession.last_message_at, ChatSession.updated_at)
+            session_ids = [row.id for row in db.query(ChatSession.id).filter(last_activity < cutoff)]
+            
+            def records() -> Iterator[Dict]:
+                for session_id in session_ids:
+                    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+                    yield {"table": "chat_sessions", "row": _row_to_dict(session)}
+                    
+                    messages = db.query(ChatMessage).filter(
+                        ChatMessage.session_id == session_id
+                    ).order_by(ChatMessage.id).yield_per(DELETE_CHUNK_SIZE)
+                    for message in messages:
+                        yield {"table": "chat_messages", "row": _row_to_dict(message)}
+                    db.expunge_all()
+            
+            path, _ = self._write_archive("chat_sessions", records())
+            
+            for start in range(0, len(session_ids), DELETE_CHUNK_SIZE):
+                chunk = session_ids[start:start + DELETE_CHUNK_SIZE]
+                db.query(ChatMessage).filter(ChatMessage.session_id.in_(chunk)).delete(synchronize_session=False)
+                db.query(ChatSession).filter(ChatSession.id.in_(chunk)).delete(synchronize_session=False)
+        
+        return len(session_ids), path
+    
+    def restore(self, archive_path: str, session_id: Optional[int] = None) -> int:
+        """
+        Restore rows from an archive file back into the databases
+        
+        Args:
+            archive_path: Path to a .jsonl.gz archive written by this manager
+            session_id: Only restore this chat session (and its messages)
+        
+        Returns:
+            Number of rows restored
+        """
+        
+        restored = 0
+        chat_models = {"chat_sessions": ChatSession, "chat_messages": ChatMessage}
+        
+        with gzip.open(archive_path, "rt", encoding="utf-8") as archive, \
+                sqlite3.connect(self.project_db_path) as conn, \
+                session_scope() as db:
+            for line in archive:
+                record = json.loads(line)
+                table, row = record["table"], record["row"]
+                
+                if table in PROJECT_TABLE_COLUMNS:
+                    columns = PROJECT_TABLE_COLUMNS[table]
+                    conn.execute(
+                        f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                        [row[column] for column in columns]
+                    )
+                elif table in chat_models:
+                    row_session = row["id"] if table == "chat_sessions" else row["session_id"]
+                    if session_id is not None and row_session != session_id:
+                        continue
+                    model = chat_models[table]
+                    db.merge(model(**_parse_row(model, row)))
+                    if restored % DELETE_CHUNK_SIZE == 0:
+                        db.flush()
+                        db.expunge_all()
+                else:
+                    continue
+                
+                restored += 1
+            
+            conn.commit()
+        
+        list_cache.clear()
+        return restored
+    
+    def compact(self):
+        """Reclaim free pages with incremental VACUUM on SQLite databases"""
+        
+        pages = self.policies.get("vacuum_pages", 0)
+        
+        with sqlite3.connect(self.project_db_path) as conn:
+            _incremental_vacuum(conn, pages)
+        
+        if engine.dialect.name == "sqlite":
+            raw = engine.raw_connection()
+            try:
+                _incremental_vacuum(raw.driver_connection, pages)
+            finally:
+                raw.close()
+    
+    def list_archives(self) -> List[str]:
+        """List archive files, newest first"""
+        return sorted((str(path) for path in self.archive_dir.glob("*.jsonl.gz")), reverse=True)
+    
+    def _write_archive(self, name: str, records: Iterator[Dict]):
+        """Stream records to a gzip JSONL file; returns the path (None if empty) and archived row ids"""
+        
+        path = self.archive_dir / f"{name}-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}.jsonl.gz"
+        ids = []
+        
+        with gzip.open(path, "wt", encoding="utf-8") as archive:
+            for record in records:
+                archive.write(json.dumps(record, default=str) + "\n")
+                if record["table"] == name:
+                    ids.append(record["row"]["id"])
+        
+        if not ids:
+            path.unlink()
+            return None, ids
+        
+        return path, ids
+
+def _row_to_dict(instance) -> Dict:
+    """Serialize an ORM row's columns"""
+    row = {}
+    for column in instance.__table__.columns:
+        value = getattr(instance, column.name)
+        row[column.name] = value.isoformat() if isinstance(value, datetime) else value
+    return row
+
+def _parse_row(model, row: Dict) -> Dict:
+    """Convert archived column values back to ORM types"""
+    parsed = {}
+    for column in model.__table__.columns:
+        if column.name not in row:
+            continue
+        value = row[column.name]
+        if value is not None and column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+        parsed[column.name] = value
+    return parsed
+
+def _incremental_vacuum(conn, pages: int):
+    """Switch a SQLite database to incremental auto-vacuum once, then free up to `pages` pages (0 = all)"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # The mode only takes effect after one full VACUUM
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        # incremental_vacuum only frees pages while its result rows are stepped through
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})" if pages else "PRAGMA incremental_vacuum").fetchall()
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="SASDS retention and archival jobs")
+    parser.add_argument("--project-db", default="projects.db", help="ProjectStorage database path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    subparsers.add_parser("run", help="Apply retention policies and compact")
+    subparsers.add_parser("list", help="List archive files")
+    restore_parser = subparsers.add_parser("restore", help="Restore an archive file")
+    restore_parser.add_argument("archive")
+    restore_parser.add_argument("--session-id", type=int, default=None)
+    
+    args = parser.parse_args()
+    manager = RetentionManager(args.project_db)
+    
+    if args.command == "run":
+        print(json.dumps(manager.run(), indent=2))
+    elif args.command == "list":
+        print("\n".join(manager.list_archives()))
+    else:
+        print(f"Restored {manager.restore(args.archive, args.session_id)} rows")
+
+if __name__ == "__main__":
+    main()
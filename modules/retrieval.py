@@ -0,0 +1,191 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import RETRIEVAL_CONFIG
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this
+to was were will with which should must shall can may i we you they he she
+""".split())
+
+# Default query when a document is uploaded without any requirement text
+DEFAULT_QUERY = "requirement must should shall input output feature function data user report"
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def chunk_text(text: str, max_words: Optional[int] = None, overlap: Optional[int] = None) -> List[str]:
+    """
+    Split text into overlapping chunks of about max_words words,
+    preferring paragraph boundaries
+    
+    Args:
+        text: Document text
+        max_words: Target chunk size in words
+        overlap: Words repeated at the start of the next chunk
+    
+    Returns:
+        List of chunk strings
+    """
+    
+    max_words = max_words or RETRIEVAL_CONFIG["chunk_words"]
+    overlap = RETRIEVAL_CONFIG["chunk_overlap_words"] if overlap is None else overlap
+    
+    chunks = []
+    current: List[str] = []
+    
+    for paragraph in re.split(r"\n\s*\n", text):
+        words = paragraph.split()
+        while words:
+            room = max_words - len(current)
+            current.extend(words[:room])
+            words = words[room:]
+            if len(current) >= max_words:
+                chunks.append(" ".join(current))
+                current = current[-overlap:] if overlap else []
+        
+        # Close the chunk at a paragraph end once it is reasonably full
+        if len(current) >= max_words // 2:
+            chunks.append(" ".join(current))
+            current = current[-overlap:] if overlap else []
+    
+    if current and (not chunks or len(current) > overlap):
+        chunks.append(" ".join(current))
+    
+    return chunks
+
+class BM25Index:
+    """In-process BM25 index over a list of chunks, stored as a term-major sparse matrix"""
+    
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        
+        vocabulary: Dict[str, int] = {}
+        doc_ids, term_ids = [], []
+        for doc_id, chunk in enumerate(chunks):
+            for token in tokenize(chunk):
+                doc_ids.append(doc_id)
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+        
+        self.vocabulary = vocabulary
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        
+        # Collapse (term, doc) pairs into term frequencies, sorted by term then doc
+        pair_keys = term_ids * max(len(chunks), 1) + doc_ids
+        unique_keys, term_frequencies = np.unique(pair_keys, return_counts=True)
+        posting_terms = unique_keys // max(len(chunks), 1)
+        
+        self.posting_docs = (unique_keys % max(len(chunks), 1)).astype(np.int64)
+        self.posting_tf = term_frequencies.astype(np.float64)
+        # indptr[t]:indptr[t+1] is the slice of postings for term t
+        self.indptr = np.searchsorted(posting_terms, np.arange(len(vocabulary) + 1))
+        
+        self.doc_lengths = np.bincount(doc_ids, minlength=len(chunks)).astype(np.float64)
+        self.avg_doc_length = self.doc_lengths.mean() if len(chunks) else 0.0
+        
+        document_frequency = np.diff(self.indptr).astype(np.float64)
+        self.idf = np.log1p((len(chunks) - document_frequency + 0.5) / (document_frequency + 0.5))
+    
+    def score(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for a query"""
+        scores = np.zeros(len(self.chunks))
+        if not len(self.chunks) or not self.avg_doc_length:
+            return scores
+        
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / self.avg_doc_length)
+        for token in set(tokenize(query)):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            start, stop = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = self.posting_docs[start:stop]
+            tf = self.posting_tf[start:stop]
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + length_norm[docs])
+        return scores
+    
+    def top_k(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Indices and scores of the k best chunks, best first"""
+        scores = self.score(query)
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(i), float(scores[i])) for i in best if scores[i] > 0]
+
+# Indexes are built once per document content and reused across reruns
+_indexes: "OrderedDict[str, BM25Index]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def get_document_index(content_hash: str, text: str) -> BM25Index:
+    """Return the BM25 index of a document, building it on first use"""
+    with _indexes_lock:
+        if content_hash in _indexes:
+            _indexes.move_to_end(content_hash)
+            return _indexes[content_hash]
+    
+    index = BM25Index(chunk_text(text))
+    
+    with _indexes_lock:
+        _indexes[content_hash] = index
+        while len(_indexes) > RETRIEVAL_CONFIG["max_cached_indexes"]:
+            _indexes.popitem(last=False)
+    return index
+
+def select_context(documents: List[Dict], query: str, top_k: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """
+    Pick the chunks of the uploaded documents most relevant to a query
+    
+    Args:
+        documents: Dicts with filename, content_hash and text (from DocumentExtractor.extract_uploads)
+        query: Requirement, task list or other text to match against
+        top_k: Number of chunks to return across all documents
+        max_chars: Upper bound on the returned context size
+    
+    Returns:
+        Relevant excerpts labelled with their file name, in document order
+    """
+    
+    top_k = top_k or RETRIEVAL_CONFIG["top_k"]
+    max_chars = max_chars or RETRIEVAL_CONFIG["max_context_chars"]
+    query = query if tokenize(query or "") else DEFAULT_QUERY
+    
+    candidates = []
+    for doc_position, document in enumerate(documents):
+        if not document.get("text"):
+            continue
+        index = get_document_index(document["content_hash"], document["text"])
+        for chunk_id, score in index.top_k(query, top_k):
+            candidates.append((score, doc_position, chunk_id, document["filename"], index.chunks[chunk_id]))
+    
+    # Fall back to the opening of each document when nothing matches
+    if not candidates:
+        for doc_position, document in enumerate(documents):
+            if document.get("text"):
+                index = get_document_index(document["content_hash"], document["text"])
+                if index.chunks:
+                    candidates.append((0.0, doc_position, 0, document["filename"], index.chunks[0]))
+    
+    selected = sorted(candidates, key=lambda candidate: -candidate[0])[:top_k]
+    selected.sort(key=lambda candidate: (candidate[1], candidate[2]))
+    
+    excerpts = []
+    used = 0
+    for _, _, _, filename, chunk in selected:
+        excerpt = f"[{filename}]\n{chunk}"
+        if used + len(excerpt) > max_chars:
+            excerpt = excerpt[:max(0, max_chars - used)]
+        if not excerpt:
+            break
+        excerpts.append(excerpt)
+        used += len(excerpt)
+    
+    return "\n\n".join(excerpts)
@@ -1,25 +1,27 @@
-import os
+import ast
+import textwrap
 from typing import Dict
-import google.generativeai as genai
-
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+from config import PROMPT_BUDGET_CONFIG, REVIEW_CONFIG
+from modules.code_diff import apply_patches, changed_functions, function_map, module_outline, parse_patches
+from modules.prompt_builder import PromptBuilder, add_test_results
+from modules.static_analyzer import analyze_code, format_findings
+from modules.model_router import get_router
 
 class Reviewer:
     """Reviews and refines generated code"""
     
     def __init__(self):
-        self.model = genai.GenerativeModel("gemini-pro") if GEMINI_API_KEY else None
+        self.model = get_router().model_for("review")
     
-    def review(self, code: str, test_results: Dict) -> Dict:
+    def review(self, code: str, test_results: Dict, context: str = "") -> Dict:
         """
         Review code and suggest improvements
         
         Args:
             code: Generated code
             test_results: Results from test runner
-            
+            context: Relevant excerpts from uploaded requirement documents
+        
         Returns:
             Dictionary with review report and refined code
         """
@@ -27,23 +29,27 @@ class Reviewer:
         if not self.model:
             return self._generate_review_template(code, test_results)
         
-        test_info = f"Tests Passed: {test_results.get('passed', 0)}, Failed: {test_results.get('failed', 0)}"
-        
-        prompt = f"""
-        Review this Python code and provide:
+        # Code first, then what failed, then the log; the document context is trimmed first
+        builder = PromptBuilder(PROMPT_BUDGET_CONFIG["review"])
+        builder.add("instructions", """Review this Python code and provide:
         1. Code quality assessment
         2. Performance improvements
         3. Bug fixes if needed
         4. Best practices recommendations
-        5. Security considerations
-        
-        Current test status: {test_info}
-        
-        Code:
-        {code}
-        
-        Provide a review report and then generate an improved version of the code.
-        """
+        5. Security considerations""", 0)
+        add_test_results(builder, test_results, failure_priority=2, log_priority=3)
+        static_analysis = analyze_code(code)
+        builder.add("static analysis", self._static_analysis_section(static_analysis), 2)
+        if context:
+            builder.add("context", f"Requirement excerpts the code must satisfy:\n{context}", 4)
+        builder.add("code", f"Code:\n{code}", 1, keep="whole")
+        builder.add("closing", "Provide a review report and then generate an improved version of the code.", 0)
+        prompt = builder.build()
+        
+        # A trimmed program would come back as a refined version missing its tail
+        if not builder.included("code"):
+            print("Code does not fit the review prompt budget; using the local review")
+            return self._generate_review_template(code, test_results)
         
         try:
             response = self.model.generate_content(prompt)
@@ -53,36 +59,131 @@ class Reviewer:
             parts = response_text.split("```")
             
             summary = parts[0] if parts else response_text
-            refined_code = parts[1] if len(parts) > 1 else code
-            
-            if refined_code.startswith("python"):
-                refined_code = refined_code[6:]
+            refined_code = self._refined_code(parts, code)
             
             return {
                 "summary": summary,
                 "improvements": self._extract_improvements(summary),
                 "refined_code": refined_code.strip(),
-                "status": "reviewed"
+                "status": "reviewed",
+                "static_analysis": static_analysis
             }
         
         except Exception as e:
             print(f"Error in review: {str(e)}")
             return self._generate_review_template(code, test_results)
     
+    def review_changes(self, code: str, previous_code: str, test_results: Dict, context: str = "") -> Dict:
+        """
+        Review only the functions changed since the previous code version
+        
+        The LLM sees the changed functions in full and the rest of the module as
+        an outline, and replies with patched functions that are applied locally.
+        Falls back to a full review when the versions cannot be diffed or most
+        of the program changed.
+        
+        Args:
+            code: Current code
+            previous_code: Code of the previous version
+            test_results: Results from test runner
+            context: Relevant excerpts from uploaded requirement documents
+        
+        Returns:
+            Dictionary with review report and refined code
+        """
+        
+        if not self.model:
+            return self._generate_review_template(code, test_results)
+        
+        changed = changed_functions(previous_code, code)
+        functions = function_map(code)
+        if changed is None or not functions or len(changed) > len(functions) * REVIEW_CONFIG["max_changed_ratio"]:
+            return self.review(code, test_results, context)
+        
+        if not changed:
+            return {
+                "summary": "No functions changed since the previous version.",
+                "improvements": [],
+                "refined_code": code,
+                "status": "unchanged",
+                "mode": "incremental"
+            }
+        
+        changed_source = "\n\n".join(textwrap.dedent(functions[name]["source"]) for name in changed)
+        
+        builder = PromptBuilder(PROMPT_BUDGET_CONFIG["review"])
+        builder.add("instructions", f"""Review the functions below, which changed since the last reviewed version of a Python module.
+        Check code quality, bugs, performance, best practices and security.
+        Changed functions: {", ".join(changed)}""", 0)
+        add_test_results(builder, test_results, failure_priority=2, log_priority=3)
+        builder.add("changed", f"Changed functions:\n{changed_source}", 1, keep="whole")
+        builder.add("outline", f"Outline of the whole module (bodies omitted):\n{module_outline(code)}", 2)
+        static_analysis = analyze_code(code, changed)
+        builder.add("static analysis", self._static_analysis_section(static_analysis), 2)
+        if context:
+            builder.add("context", f"Requirement excerpts the code must satisfy:\n{context}", 4)
+        builder.add("format", """Reply with a short review report first. Then, only for functions that need changes,
+        give the complete new function as:
+        
+        PATCH qualified_name
+        ```python
+        def function_name(...):
+            ...
+        ```
+        
+        Use Class.method as the name for methods. Do not repeat unchanged functions or the rest of the module.""", 0)
+        prompt = builder.build()
+        
+        # A trimmed function would come back as a patch replacing the whole function
+        if not builder.included("changed"):
+            print("Changed functions do not fit the review prompt budget; using the local review")
+            return self._generate_review_template(code, test_results)
+        
+        try:
+            response_text = self.model.generate_content(prompt).text
+            summary, patches = parse_patches(response_text)
+            
+            # Only patch what the model has actually seen, or new helpers
+            allowed = {name: source for name, source in patches.items() if name in changed or name not in functions}
+            refined_code, applied, rejected = apply_patches(code, allowed)
+            
+            return {
+                "summary": summary,
+                "improvements": self._extract_improvements(summary),
+                "refined_code": refined_code,
+                "status": "reviewed",
+                "mode": "incremental",
+                "static_analysis": static_analysis,
+                "patched": applied,
+                "rejected": rejected + [name for name in patches if name not in allowed]
+            }
+        
+        except Exception as e:
+            print(f"Error in incremental review: {str(e)}")
+            return self._generate_review_template(code, test_results)
+    
     def _generate_review_template(self, code: str, test_results: Dict) -> Dict:
-        """Generate template review when API is not available"""
+        """Review from local static analysis when the API is not available"""
         
-        improvements = [
-            "Add comprehensive error handling",
-            "Include type hints for better code clarity",
-            "Add docstrings to all functions",
-            "Implement input validation",
-            "Consider edge cases",
-            "Add logging for debugging"
-        ]
+        static_analysis = analyze_code(code)
         
+        improvements = []
         if test_results.get("failed", 0) > 0:
-            improvements.insert(0, "Fix failing test cases")
+            improvements.append("Fix failing test cases")
+        if static_analysis is None:
+            improvements.append("Fix the syntax errors; the code does not parse")
+        else:
+            improvements += [
+                f"{result['name']} (line {finding['line']}): {finding['message']}"
+                for result in static_analysis
+                for finding in result["findings"]
+            ]
+        if not improvements:
+            improvements.append("No performance issues found by static analysis")
+        
+        complexity = "\n".join(
+            f"        - {result['name']}: {result['complexity']}" for result in static_analysis or []
+        )
         
         summary = f"""
         Code Review Report
@@ -90,17 +191,42 @@ class Reviewer:
         
         Test Results: {test_results.get('passed', 0)} passed, {test_results.get('failed', 0)} failed
         
+        Cyclomatic complexity per function:
+{complexity}
+        
         Recommendations:
-        {chr(10).join([f"- {imp}" for imp in improvements[:3]])}
+        {chr(10).join([f"- {imp}" for imp in improvements[:10]])}
         """
         
         return {
             "summary": summary,
-            "improvements": improvements[:3],
+            "improvements": improvements[:10],
             "refined_code": code,
-            "status": "reviewed"
+            "status": "reviewed",
+            "static_analysis": static_analysis
         }
     
+    def _refined_code(self, parts: list, code: str) -> str:
+        """Code of the first closed fence, or the reviewed code if the reply was cut off or does not parse"""
+        if len(parts) < 3:
+            return code
+        
+        refined_code = parts[1]
+        if refined_code.startswith("python"):
+            refined_code = refined_code[6:]
+        
+        try:
+            ast.parse(refined_code)
+        except SyntaxError:
+            print("Refined code from the review does not parse; keeping the reviewed code")
+            return code
+        return refined_code
+    
+    def _static_analysis_section(self, static_analysis) -> str:
+        """Prompt section with local static analysis findings, empty if there are none"""
+        findings = format_findings(static_analysis)
+        return f"Static analysis findings to address:\n{findings}" if findings else ""
+    
     def _extract_improvements(self, text: str) -> list:
         """Extract improvement points from review text"""
         
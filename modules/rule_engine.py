@@ -0,0 +1,150 @@
+import re
+from typing import Dict, List, Optional, Set
+from config import ANALYSIS_RULES
+
+# Standard-library and common third-party names recognised in LLM replies
+KNOWN_LIBRARIES = [
+    "pandas", "numpy", "matplotlib", "seaborn", "scipy", "scikit-learn", "sklearn",
+    "sqlite3", "sqlalchemy", "json", "csv", "os", "sys", "re", "datetime", "logging",
+    "argparse", "requests", "beautifulsoup4", "bs4", "openpyxl", "pyyaml", "yaml",
+    "statistics", "smtplib", "pillow", "PIL", "hashlib", "secrets", "pathlib",
+    "collections", "itertools", "concurrent.futures", "tkinter", "pytest", "unittest"
+]
+
+IMPORT_PATTERN = re.compile(r"^\s*(?:from|import)\s+([A-Za-z_][\w.]*)", re.MULTILINE)
+
+DEFAULT_TASKS = ["Understand requirement", "Design solution", "Implement code", "Test implementation"]
+BASE_LIBRARIES = ["os", "sys"]
+
+class RuleEngine:
+    """
+    Keyword rules compiled into one regular expression, so a requirement of
+    any size is analysed in a single pass
+    """
+    
+    def __init__(self, rules: Optional[List[Dict]] = None, libraries: Optional[List[str]] = None):
+        self.rules = rules if rules is not None else ANALYSIS_RULES
+        
+        # Keywords are merged into a prefix tree before compiling, so the regex
+        # engine follows one branch per character instead of trying every
+        # keyword at every position
+        self.keyword_rules: Dict[str, List[int]] = {}
+        for rule_id, rule in enumerate(self.rules):
+            for keyword in rule["keywords"]:
+                self.keyword_rules.setdefault(keyword.lower(), []).append(rule_id)
+        # A zero-width lookahead finds a match at every word start, so keywords
+        # inside a longer match ("address" in "email address") are not skipped
+        self.pattern = re.compile(r"\b(?=(" + _trie_pattern(self.keyword_rules) + "))", re.IGNORECASE) if self.keyword_rules else None
+        
+        library_names = libraries if libraries is not None else KNOWN_LIBRARIES
+        self.library_names = {name.lower(): name for name in library_names}
+        self.library_pattern = re.compile(
+            r"(?<![\w.])(" + "|".join(re.escape(name) for name in sorted(library_names, key=len, reverse=True)) + r")(?![\w])",
+            re.IGNORECASE
+        )
+    
+    def match(self, text: str) -> List[Dict]:
+        """Rules whose keywords occur in text, in rule order"""
+        if not self.pattern:
+            return []
+        
+        matched = set()
+        for found in self.pattern.finditer(text):
+            matched.update(self._rules_for(found.group(1)))
+            if len(matched) == len(self.rules):
+                break
+        return [self.rules[rule_id] for rule_id in sorted(matched)]
+    
+    def analyze(self, requirement: str) -> Dict:
+        """
+        Derive tasks, libraries and I/O from a requirement without an LLM
+        
+        Args:
+            requirement: Requirement text (may be a whole document)
+        
+        Returns:
+            Dictionary with tasks, libraries, input_output and constraints
+        """
+        
+        rules = self.match(requirement)
+        
+        tasks = _unique(task for rule in rules for task in rule["tasks"]) or list(DEFAULT_TASKS)
+        libraries = _unique(BASE_LIBRARIES + [library for rule in rules for library in rule["libraries"]])
+        inputs = _unique(rule["input"] for rule in rules if rule.get("input"))
+        outputs = _unique(rule["output"] for rule in rules if rule.get("output"))
+        
+        return {
+            "tasks": tasks,
+            "libraries": libraries,
+            "input_output": f"Input: {', '.join(inputs) or 'User provided data or files'}. Output: {', '.join(outputs) or 'Processed results'}",
+            "constraints": "Must be efficient and handle edge cases"
+        }
+    
+    def find_libraries(self, text: str) -> List[str]:
+        """Library names mentioned or imported in text, in order of first appearance"""
+        found = [self.library_names[name.lower()] for name in self.library_pattern.findall(text)]
+        found += [module.split(".")[0] for module in IMPORT_PATTERN.findall(text)]
+        return _unique(found)
+    
+    def _rules_for(self, matched_text: str) -> Set[int]:
+        """
+        Rules of every keyword starting where a match starts: the longest one,
+        which the regex matched, and shorter ones ending inside it ("email"
+        in "email address")
+        """
+        text = " ".join(matched_text.lower().split())
+        rule_ids = set()
+        for end in range(1, len(text) + 1):
+            prefix = text[:end]
+            rule_ids.update(self.keyword_rules.get(prefix + "*", ()))
+            # Whole-word keywords end at a word boundary, optionally after a plural ending
+            if end == len(text) or not (text[end].isalnum() or text[end] == "_"):
+                candidates = [prefix]
+                if prefix.endswith("s"):
+                    candidates.append(prefix[:-1])
+                if prefix.endswith("es"):
+                    candidates.append(prefix[:-2])
+                for candidate in candidates:
+                    rule_ids.update(self.keyword_rules.get(candidate, ()))
+        return rule_ids
+
+def _trie_pattern(keywords) -> str:
+    """
+    Regex matching any keyword, factored as a prefix tree. Whole-word keywords
+    allow a plural ending; keywords ending in * match any word they start.
+    """
+    
+    root: Dict = {}
+    for keyword in keywords:
+        node = root
+        for char in keyword.rstrip("*"):
+            node = node.setdefault(char, {})
+        node[""] = "" if keyword.endswith("*") else r"(?:e?s)?\b"
+    
+    def build(node: Dict) -> str:
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        # Longer keywords are tried before a shorter one ending here
+        if "" in node:
+            branches.append(node[""])
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+    
+    return build(root)
+
+def _unique(items) -> List:
+    """Drop duplicates, keeping first occurrences in order"""
+    return list(dict.fromkeys(items))
+
+# Compiled once per process
+_engine = None
+
+def get_rule_engine() -> RuleEngine:
+    """Return the shared rule engine built from ANALYSIS_RULES"""
+    global _engine
+    if _engine is None:
+        _engine = RuleEngine()
+    return _engine
@@ -0,0 +1,256 @@
+import argparse
+import ast
+import builtins
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from config import SNIPPET_CONFIG
+from modules.retrieval import BM25Index, tokenize
+
+BUILTIN_NAMES = frozenset(dir(builtins))
+
+def extract_functions(code: str) -> List[Dict]:
+    """
+    Pull self-contained top-level functions out of a module
+    
+    A function qualifies when every global name it uses is a builtin or an
+    import of the module, so it can be copied into another program together
+    with those imports.
+    
+    Args:
+        code: Python source
+    
+    Returns:
+        List of dicts with name, signature, task_text, imports and code
+    """
+    
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    
+    # Import line for every name bound by a top-level import
+    import_lines: Dict[str, str] = {}
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                import_lines[(alias.asname or alias.name).split(".")[0]] = ast.unparse(ast.Import(names=[alias]))
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            for alias in node.names:
+                import_lines[alias.asname or alias.name] = ast.unparse(ast.ImportFrom(module=node.module, names=[alias], level=0))
+    
+    functions = []
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef) or node.decorator_list:
+            continue
+        if node.name == "main" or node.name.startswith("test"):
+            continue
+        if node.end_lineno - node.lineno + 1 > SNIPPET_CONFIG["max_snippet_lines"]:
+            continue
+        
+        local_names = {arg.arg for arg in ast.walk(node.args) if isinstance(arg, ast.arg)}
+        local_names |= {
+            child.id for child in ast.walk(node)
+            if isinstance(child, ast.Name) and isinstance(child.ctx, (ast.Store, ast.Del))
+        }
+        local_names |= {
+            alias.asname or alias.name.split(".")[0]
+            for child in ast.walk(node) if isinstance(child, (ast.Import, ast.ImportFrom))
+            for alias in child.names
+        }
+        global_names = {
+            child.id for child in ast.walk(node)
+            if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load)
+        } - local_names - BUILTIN_NAMES - {node.name}
+        
+        if any(name not in import_lines for name in global_names):
+            continue
+        
+        docstring = (ast.get_docstring(node) or "").strip().split("\n")[0]
+        signature = f"{node.name}({ast.unparse(node.args)})"
+        if node.returns:
+            signature += f" -> {ast.unparse(node.returns)}"
+        
+        functions.append({
+            "name": node.name,
+            "signature": signature,
+            "task_text": " ".join(part for part in node.name.split("_") if part) + (f". {docstring}" if docstring else ""),
+            "imports": "\n".join(sorted(import_lines[name] for name in global_names)),
+            "code": ast.get_source_segment(code, node)
+        })
+    
+    return functions
+
+def splice_snippets(code: str, snippets: List[Dict]) -> str:
+    """
+    Insert snippet functions (and their imports) into generated code, after
+    its imports. Snippets the code already defines are skipped.
+    """
+    
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    
+    defined = {node.name for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))}
+    snippets = [snippet for snippet in snippets if snippet["name"] not in defined]
+    if not snippets:
+        return code
+    
+    lines = code.split("\n")
+    existing_imports = {line.strip() for line in lines}
+    new_imports = []
+    for snippet in snippets:
+        for line in snippet["imports"].split("\n"):
+            if line and line not in existing_imports and line not in new_imports:
+                new_imports.append(line)
+    
+    # Insert after the module docstring and the last top-level import
+    insert_at = 0
+    for position, node in enumerate(tree.body):
+        if isinstance(node, (ast.Import, ast.ImportFrom)) or (
+            position == 0 and isinstance(node, ast.Expr) and isinstance(getattr(node, "value", None), ast.Constant)
+        ):
+            insert_at = node.end_lineno
+        else:
+            break
+    
+    block = new_imports + [
+        part for snippet in snippets for part in ("", "", "# Reused from a tested earlier project", snippet["code"])
+    ] + [""]
+    return "\n".join(lines[:insert_at] + block + lines[insert_at:])
+
+def _normalize_task(text: str) -> str:
+    """Comparable form of a task or function description"""
+    return " ".join(tokenize(text))
+
+class SnippetLibrary:
+    """Library of tested functions from earlier projects, searchable by task"""
+    
+    def __init__(self, storage):
+        self.storage = storage
+        self.db_path = storage.db_path
+        self._index = None
+        self._index_token = None
+        self._lock = threading.Lock()
+    
+    def add_code(self, code: str, project_id: Optional[int] = None) -> int:
+        """
+        Add the functions of a code version whose tests passed
+        
+        Returns:
+            Number of new snippets
+        """
+        
+        functions = extract_functions(code)
+        if not functions:
+            return 0
+        
+        now = datetime.now().isoformat()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            before = conn.total_changes
+            cursor.executemany('''
+                INSERT OR IGNORE INTO snippets (project_id, name, signature, task_text, imports, code, code_hash, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (project_id, function["name"], function["signature"], function["task_text"], function["imports"],
+                 function["code"], hashlib.sha256(function["code"].encode()).hexdigest(), now)
+                for function in functions
+            ])
+            conn.commit()
+            return conn.total_changes - before
+    
+    def harvest(self) -> int:
+        """Backfill snippets from every stored code version that passed its tests"""
+        self.storage.flush()
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            # The latest version saved before each clean test run is the one that was tested
+            cursor.execute('''
+                SELECT DISTINCT cv.id, cv.project_id, cv.code
+                FROM test_results tr
+                JOIN code_versions cv ON cv.id = (
+                    SELECT MAX(id) FROM code_versions
+                    WHERE project_id = tr.project_id AND created_at <= tr.created_at
+                )
+                WHERE tr.failed = 0 AND tr.passed > 0
+            ''')
+            rows = cursor.fetchall()
+        
+        return sum(self.add_code(code, project_id) for _, project_id, code in rows)
+    
+    def find(self, tasks: List[str], limit: Optional[int] = None) -> List[Dict]:
+        """Snippets most relevant to a list of tasks, best first"""
+        limit = limit or SNIPPET_CONFIG["max_context_snippets"]
+        index, snippets = self._load_index()
+        if not snippets or not tasks:
+            return []
+        
+        return [
+            snippets[position]
+            for position, score in index.top_k(" ".join(tasks), limit)
+            if score >= SNIPPET_CONFIG["min_score"]
+        ]
+    
+    def exact_matches(self, tasks: List[str]) -> Dict[str, Dict]:
+        """Map each task to a snippet whose name or docstring states exactly that task"""
+        _, snippets = self._load_index()
+        by_description: Dict[str, Dict] = {}
+        for snippet in snippets:
+            name, _, docstring = snippet["task_text"].partition(". ")
+            for description in (name, docstring):
+                key = _normalize_task(description)
+                if key:
+                    by_description.setdefault(key, snippet)
+        
+        return {
+            task: by_description[_normalize_task(task)]
+            for task in tasks
+            if _normalize_task(task) in by_description
+        }
+    
+    def _load_index(self):
+        """BM25 index over snippet descriptions, rebuilt when snippets are added"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*), MAX(id) FROM snippets")
+            token = cursor.fetchone()
+            
+            with self._lock:
+                if token == self._index_token:
+                    return self._index
+            
+            # Newest first, so a newer duplicate description wins
+            cursor.execute('''
+                SELECT id, name, signature, task_text, imports, code
+                FROM snippets ORDER BY id DESC
+            ''')
+            snippets = [
+                {"id": row[0], "name": row[1], "signature": row[2], "task_text": row[3], "imports": row[4], "code": row[5]}
+                for row in cursor.fetchall()
+            ]
+        
+        index = BM25Index([f"{snippet['task_text']} {snippet['signature']}" for snippet in snippets])
+        with self._lock:
+            self._index = (index, snippets)
+            self._index_token = token
+        return self._index
+
+def main():
+    """Command-line entry point: python -m modules.snippet_library harvest"""
+    from modules.storage import ProjectStorage
+    
+    parser = argparse.ArgumentParser(description="Manage the SASDS snippet library")
+    parser.add_argument("command", choices=["harvest"])
+    parser.add_argument("--project-db", default="projects.db")
+    args = parser.parse_args()
+    
+    added = SnippetLibrary(ProjectStorage(args.project_db)).harvest()
+    print(f"Added {added} snippet(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import ast
+import textwrap
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+from config import STATIC_ANALYSIS_CONFIG
+from modules.code_diff import function_map
+
+BRANCHES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler, ast.Assert, ast.match_case)
+
+# Findings per function AST hash; unchanged functions are never re-analyzed
+_cache: "OrderedDict[str, Dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def cyclomatic_complexity(node: ast.AST) -> int:
+    """McCabe complexity: one plus the number of decision points"""
+    complexity = 1
+    for child in ast.walk(node):
+        if isinstance(child, BRANCHES):
+            complexity += 1
+        elif isinstance(child, ast.BoolOp):
+            complexity += len(child.values) - 1
+        elif isinstance(child, ast.comprehension):
+            complexity += 1 + len(child.ifs)
+    return complexity
+
+class _FunctionVisitor(ast.NodeVisitor):
+    """Walks one function, tracking the enclosing loops"""
+    
+    def __init__(self, function: ast.AST):
+        self.findings: List[Dict] = []
+        self.loops: List[ast.AST] = []
+        self.in_comprehension = False
+        self.list_names = self._names_bound_to(function, self._is_list, {"list", "List"})
+        self.string_names = self._names_bound_to(function, self._is_string, {"str"})
+    
+    def visit_For(self, node):
+        self._visit_loop(node, node.iter)
+    
+    visit_AsyncFor = visit_For
+    
+    def visit_While(self, node):
+        self._visit_loop(node, None)
+    
+    def _visit_loop(self, node, iterable: Optional[ast.AST]):
+        collection = self._collection(iterable)
+        if collection:
+            for outer in self.loops:
+                if isinstance(outer, (ast.For, ast.AsyncFor)) and self._collection(outer.iter) == collection:
+                    self._add(node, "nested-loop", f"Nested loops over the same collection '{collection}' are O(n^2); consider a dict or set lookup")
+                    break
+        
+        self.loops.append(node)
+        self.generic_visit(node)
+        self.loops.pop()
+    
+    def visit_AugAssign(self, node):
+        if self.loops and isinstance(node.op, ast.Add) and isinstance(node.target, ast.Name):
+            if node.target.id in self.string_names or self._is_string(node.value):
+                self._add(node, "string-concat", f"String '{node.target.id}' is built with += in a loop; collect parts in a list and ''.join() them")
+        self.generic_visit(node)
+    
+    def visit_Assign(self, node):
+        value = node.value
+        if self.loops and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            target = node.targets[0].id
+            # s = s + "..." is the same pattern as s += "..."
+            if (isinstance(value, ast.BinOp) and isinstance(value.op, ast.Add)
+                    and isinstance(value.left, ast.Name) and value.left.id == target
+                    and (target in self.string_names or self._is_string(value.right))):
+                self._add(node, "string-concat", f"String '{target}' is built with + in a loop; collect parts in a list and ''.join() them")
+            # list.append returns None, so assigning its result means DataFrame.append
+            if self._is_method_call(value, "append") and self._receiver(value) == target:
+                self._add(node, "dataframe-append", f"DataFrame '{target}' is grown with append() in a loop, copying it every time; build a list of rows and create the DataFrame once")
+            elif self._is_method_call(value, "concat") and self._receiver(value) in ("pd", "pandas"):
+                self._add(node, "dataframe-append", f"pd.concat() in a loop copies '{target}' every time; concatenate once after the loop")
+        self.generic_visit(node)
+    
+    def visit_Call(self, node):
+        if self._is_method_call(node, "iterrows"):
+            self._add(node, "iterrows", "DataFrame.iterrows() is slow; use vectorized column operations or itertuples()")
+        self.generic_visit(node)
+    
+    def visit_Compare(self, node):
+        if self.loops or self.in_comprehension:
+            for op, right in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)) and isinstance(right, ast.Name) and right.id in self.list_names:
+                    self._add(node, "list-membership", f"Membership test on list '{right.id}' inside a loop is O(n) each time; use a set")
+        self.generic_visit(node)
+    
+    def visit_ListComp(self, node):
+        self._visit_comprehension(node)
+    
+    visit_SetComp = visit_DictComp = visit_GeneratorExp = visit_ListComp
+    
+    def _visit_comprehension(self, node):
+        previous, self.in_comprehension = self.in_comprehension, True
+        self.generic_visit(node)
+        self.in_comprehension = previous
+    
+    def visit_FunctionDef(self, node):
+        # Nested functions are analyzed with their own loop context
+        loops, self.loops = self.loops, []
+        self.generic_visit(node)
+        self.loops = loops
+    
+    visit_AsyncFunctionDef = visit_Lambda = visit_FunctionDef
+    
+    def _add(self, node: ast.AST, kind: str, message: str):
+        self.findings.append({"line": node.lineno, "kind": kind, "message": message})
+    
+    @staticmethod
+    def _collection(iterable: Optional[ast.AST]) -> Optional[str]:
+        """Name of the collection a loop walks, seeing through range(len(x)) and enumerate(x)"""
+        while isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name) and iterable.func.id in ("range", "len", "enumerate") and iterable.args:
+            iterable = iterable.args[-1] if iterable.func.id == "range" else iterable.args[0]
+        if isinstance(iterable, (ast.Name, ast.Attribute)):
+            return ast.unparse(iterable)
+        return None
+    
+    @staticmethod
+    def _is_method_call(node: ast.AST, method: str) -> bool:
+        return isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == method
+    
+    @staticmethod
+    def _receiver(node: ast.Call) -> Optional[str]:
+        return node.func.value.id if isinstance(node.func.value, ast.Name) else None
+    
+    @staticmethod
+    def _is_list(node: ast.AST) -> bool:
+        return isinstance(node, (ast.List, ast.ListComp)) or (
+            isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ("list", "sorted")
+        )
+    
+    @staticmethod
+    def _is_string(node: ast.AST) -> bool:
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, str)
+        if isinstance(node, ast.JoinedStr):
+            return True
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            return node.func.id == "str"
+        if isinstance(node, ast.BinOp):
+            return _FunctionVisitor._is_string(node.left) or _FunctionVisitor._is_string(node.right)
+        return False
+    
+    @staticmethod
+    def _names_bound_to(function: ast.AST, predicate, annotations: Set[str]) -> Set[str]:
+        """Local names assigned a value matching predicate, or annotated with one of annotations"""
+        names = set()
+        for child in ast.walk(function):
+            if isinstance(child, ast.Assign) and predicate(child.value):
+                names.update(target.id for target in child.targets if isinstance(target, ast.Name))
+            elif isinstance(child, ast.AnnAssign) and isinstance(child.target, ast.Name):
+                if (child.value is not None and predicate(child.value)) or ast.unparse(child.annotation).split("[")[0] in annotations:
+                    names.add(child.target.id)
+            elif isinstance(child, ast.arg) and child.annotation is not None:
+                if ast.unparse(child.annotation).split("[")[0] in annotations:
+                    names.add(child.arg)
+        return names
+
+def _analyze_function(source: str) -> Dict:
+    """Complexity and findings of one function; lines are relative to its first line"""
+    node = ast.parse(textwrap.dedent(source)).body[0]
+    visitor = _FunctionVisitor(node)
+    for statement in node.body:
+        visitor.visit(statement)
+    
+    complexity = cyclomatic_complexity(node)
+    findings = visitor.findings
+    if complexity > STATIC_ANALYSIS_CONFIG["complexity_threshold"]:
+        findings.insert(0, {
+            "line": 1,
+            "kind": "complexity",
+            "message": f"Cyclomatic complexity {complexity} exceeds {STATIC_ANALYSIS_CONFIG['complexity_threshold']}; split the function"
+        })
+    return {"complexity": complexity, "findings": findings}
+
+def analyze_code(code: str, names: Optional[List[str]] = None) -> Optional[List[Dict]]:
+    """
+    Per-function complexity and performance findings
+    
+    Args:
+        code: Python source
+        names: Only analyze these functions (qualified names); all by default
+    
+    Returns:
+        List of dicts with name, line, complexity and findings (absolute line
+        numbers), in source order, or None if the code does not parse
+    """
+    
+    functions = function_map(code)
+    if functions is None:
+        return None
+    
+    results = []
+    for name, function in sorted(functions.items(), key=lambda item: item[1]["lineno"]):
+        if names is not None and name not in names:
+            continue
+        
+        with _cache_lock:
+            cached = _cache.get(function["hash"])
+            if cached is not None:
+                _cache.move_to_end(function["hash"])
+        if cached is None:
+            cached = _analyze_function(function["source"])
+            with _cache_lock:
+                _cache[function["hash"]] = cached
+                while len(_cache) > STATIC_ANALYSIS_CONFIG["max_cached_functions"]:
+                    _cache.popitem(last=False)
+        
+        # Decorators shift the def line; findings are relative to the source start
+        results.append({
+            "name": name,
+            "line": function["lineno"],
+            "complexity": cached["complexity"],
+            "findings": [
+                {**finding, "line": function["lineno"] + finding["line"] - 1}
+                for finding in cached["findings"]
+            ]
+        })
+    return results
+
+def format_findings(results: Optional[List[Dict]]) -> str:
+    """Findings as one line each, for the review report and prompts"""
+    if not results:
+        return ""
+    return "\n".join(
+        f"- line {finding['line']} in {result['name']}: {finding['message']}"
+        for result in results
+        for finding in result["findings"]
+    )
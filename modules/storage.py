@@ -1,8 +1,35 @@
 import sqlite3
 import json
+import threading
 from datetime import datetime
 from typing import List, Dict, Optional
 import os
+from config import WRITE_BEHIND_CONFIG
+from modules.cache import list_cache
+from modules.write_behind import WriteBehindQueue
+
+RECENT_PROJECTS_CACHE = "recent_projects"
+
+# Pipeline artifacts are queued per database file and written in batches
+_writers: Dict[str, WriteBehindQueue] = {}
+_writers_lock = threading.Lock()
+
+ARTIFACT_STATEMENTS = {
+    "code_version": [
+        ("INSERT INTO code_versions (project_id, code, version, created_at) VALUES (?, ?, ?, ?)",
+         lambda op: (op["project_id"], op["code"], op["version"], op["created_at"])),
+        ("UPDATE projects SET version = ?, updated_at = ? WHERE id = ?",
+         lambda op: (op["version"], op["created_at"], op["project_id"]))
+    ],
+    "test_results": [
+        ("INSERT INTO test_results (project_id, passed, failed, log, created_at) VALUES (?, ?, ?, ?, ?)",
+         lambda op: (op["project_id"], op["passed"], op["failed"], op["log"], op["created_at"]))
+    ],
+    "review_report": [
+        ("INSERT INTO review_reports (project_id, report, created_at) VALUES (?, ?, ?)",
+         lambda op: (op["project_id"], op["report"], op["created_at"]))
+    ]
+}
 
 class ProjectStorage:
     """Manages project storage and retrieval"""
@@ -10,6 +37,18 @@ class ProjectStorage:
     def __init__(self, db_path: str = "projects.db"):
         self.db_path = db_path
         self._init_db()
+        
+        with _writers_lock:
+            if db_path not in _writers:
+                _writers[db_path] = WriteBehindQueue(
+                    self._apply_artifacts,
+                    max_batch_size=WRITE_BEHIND_CONFIG["max_batch_size"],
+                    flush_interval_seconds=WRITE_BEHIND_CONFIG["flush_interval_seconds"],
+                    synchronous=WRITE_BEHIND_CONFIG["durability"] == "sync",
+                    max_attempts=WRITE_BEHIND_CONFIG["max_attempts"],
+                    name="artifact-writer"
+                )
+            self.writer = _writers[db_path]
     
     def _init_db(self):
         """Initialize database tables"""
@@ -65,6 +104,21 @@ class ProjectStorage:
                 )
             ''')
             
+            # Functions from code versions that passed their tests (see SnippetLibrary)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS snippets (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    project_id INTEGER,
+                    name TEXT NOT NULL,
+                    signature TEXT NOT NULL,
+                    task_text TEXT NOT NULL,
+                    imports TEXT NOT NULL,
+                    code TEXT NOT NULL,
+                    code_hash TEXT NOT NULL UNIQUE,
+                    created_at TEXT NOT NULL
+                )
+            ''')
+            
             conn.commit()
     
     def save_project(self, title: str, requirement: str, code: str) -> int:
@@ -88,10 +142,22 @@ class ProjectStorage:
             ''', (project_id, code, 1, now))
             
             conn.commit()
-            return project_id
+        
+        list_cache.invalidate(RECENT_PROJECTS_CACHE)
+        return project_id
     
     def get_recent_projects(self, limit: int = 10) -> List[Dict]:
-        """Get recent projects"""
+        """Get recent projects (cached until a project is saved or versioned)"""
+        
+        return list_cache.get_or_load(
+            (RECENT_PROJECTS_CACHE, self.db_path, limit),
+            lambda: self._load_recent_projects(limit)
+        )
+    
+    def _load_recent_projects(self, limit: int) -> List[Dict]:
+        """Query the most recently updated projects"""
+        
+        self.flush()
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -120,50 +186,68 @@ class ProjectStorage:
     def save_code_version(self, project_id: int, code: str, version: int):
         """Save a code version"""
         
-        now = datetime.now().isoformat()
+        self.writer.submit({
+            "kind": "code_version",
+            "project_id": project_id,
+            "code": code,
+            "version": version,
+            "created_at": datetime.now().isoformat()
+        })
+        # Versioning reorders the list and changes the shown version
+        list_cache.invalidate(RECENT_PROJECTS_CACHE)
+    
+    def get_code_versions(self, project_id: int, limit: int = 2) -> List[Dict]:
+        """Most recent code versions of a project, newest first"""
+        
+        self.flush()
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
-                INSERT INTO code_versions (project_id, code, version, created_at)
-                VALUES (?, ?, ?, ?)
-            ''', (project_id, code, version, now))
-            
-            # Update project version
-            cursor.execute('''
-                UPDATE projects SET version = ?, updated_at = ?
-                WHERE id = ?
-            ''', (version, now, project_id))
+                SELECT version, code, created_at
+                FROM code_versions
+                WHERE project_id = ?
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (project_id, limit))
             
-            conn.commit()
+            return [{"version": row[0], "code": row[1], "created_at": row[2]} for row in cursor.fetchall()]
     
     def save_test_results(self, project_id: int, passed: int, failed: int, log: str):
         """Save test results"""
         
-        now = datetime.now().isoformat()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO test_results (project_id, passed, failed, log, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (project_id, passed, failed, log, now))
-            
-            conn.commit()
+        self.writer.submit({
+            "kind": "test_results",
+            "project_id": project_id,
+            "passed": passed,
+            "failed": failed,
+            "log": log,
+            "created_at": datetime.now().isoformat()
+        })
     
     def save_review_report(self, project_id: int, report: str):
         """Save review report"""
         
-        now = datetime.now().isoformat()
+        self.writer.submit({
+            "kind": "review_report",
+            "project_id": project_id,
+            "report": report,
+            "created_at": datetime.now().isoformat()
+        })
+    
+    def flush(self):
+        """Write all queued artifacts now"""
+        self.writer.flush()
+    
+    def _apply_artifacts(self, batch: List[Dict]):
+        """Write a batch of queued artifacts in one transaction"""
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
-            cursor.execute('''
-                INSERT INTO review_reports (project_id, report, created_at)
-                VALUES (?, ?, ?)
-            ''', (project_id, report, now))
+            for operation in batch:
+                for statement, params in ARTIFACT_STATEMENTS[operation["kind"]]:
+                    cursor.execute(statement, params(operation))
             
             conn.commit()
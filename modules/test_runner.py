@@ -1,31 +1,40 @@
+import contextvars
 import subprocess
 import tempfile
 import os
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
 import json
+from config import MULTI_MODULE_CONFIG
+from modules.deadlines import bounded_timeout
 
 class TestRunner:
     """Runs automated tests on generated code"""
     
-    def run_tests(self, code: str) -> Dict:
+    def run_tests(self, code: str, module_name: str = "main", support_files: Optional[Dict[str, str]] = None) -> Dict:
         """
         Generate and run tests for the provided code
         
         Args:
             code: Python code to test
+            module_name: Module name the code is saved and imported as
+            support_files: Other files of the project (name -> code) the module may import
             
         Returns:
             Dictionary with test results
         """
         
-        test_code = self._generate_test_code(code)
+        test_code = self._generate_test_code(code, module_name)
         
         with tempfile.TemporaryDirectory() as tmpdir:
-            code_file = os.path.join(tmpdir, "main.py")
-            test_file = os.path.join(tmpdir, "test_main.py")
+            code_file = os.path.join(tmpdir, f"{module_name}.py")
+            test_file = os.path.join(tmpdir, f"test_{module_name}.py")
             
             # Write files
             try:
+                for filename, content in (support_files or {}).items():
+                    with open(os.path.join(tmpdir, filename), "w") as f:
+                        f.write(content)
                 with open(code_file, "w") as f:
                     f.write(code)
                 with open(test_file, "w") as f:
@@ -45,7 +54,7 @@ class TestRunner:
                     ["python", "-m", "pytest", test_file, "-v", "--tb=short"],
                     capture_output=True,
                     text=True,
-                    timeout=30,
+                    timeout=bounded_timeout(30),
                     cwd=tmpdir
                 )
                 
@@ -94,7 +103,41 @@ class TestRunner:
                     "failures": str(e)
                 }
     
-    def _generate_test_code(self, code: str) -> str:
+    def run_project_tests(self, files: Dict[str, str]) -> Dict:
+        """
+        Test every module of a multi-file project independently, in parallel
+        
+        Args:
+            files: File name -> code for each module of the project
+        
+        Returns:
+            Combined results, plus per-module results under "modules"
+        """
+        
+        modules = {name[:-3]: code for name, code in files.items() if name.endswith(".py")}
+        
+        with ThreadPoolExecutor(max_workers=min(MULTI_MODULE_CONFIG["max_workers"], max(len(modules), 1))) as executor:
+            futures = {
+                module_name: executor.submit(contextvars.copy_context().run, self.run_tests, code, module_name, files)
+                for module_name, code in modules.items()
+            }
+            results = {module_name: future.result() for module_name, future in futures.items()}
+        
+        passed = sum(result["passed"] for result in results.values())
+        failed = sum(result["failed"] for result in results.values())
+        
+        return {
+            "passed": passed,
+            "failed": failed,
+            "success_rate": (passed / (passed + failed) * 100) if (passed + failed) > 0 else 100,
+            "log": "\n\n".join(f"===== {name}.py =====\n{result['log']}" for name, result in results.items()),
+            "failures": "\n".join(
+                f"{name}.py: {result['failures']}" for name, result in results.items() if result["failed"] > 0
+            ),
+            "modules": results
+        }
+    
+    def _generate_test_code(self, code: str, module_name: str = "main") -> str:
         """Generate comprehensive test cases"""
         
         test_template = '''"""
@@ -109,7 +152,7 @@ from contextlib import redirect_stdout, redirect_stderr
 
 # Import the main module
 try:
-    import main
+    import __MODULE__ as main
     has_main = True
 except Exception as e:
     has_main = False
@@ -126,19 +169,13 @@ class TestCodeStructure:
     
     def test_no_syntax_errors(self):
         """Test for syntax errors in code"""
+        main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__MODULE__.py")
+        with open(main_path, encoding="utf-8") as source_file:
+            source = source_file.read()
         try:
-            import py_compile
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as f:
-                f.write('''%s'''.encode())
-                f.flush()
-                py_compile.compile(f.name, doraise=True)
-            assert True
+            compile(source, main_path, "exec")
         except SyntaxError as e:
             pytest.fail(f"Syntax error found: {e}")
-        except Exception:
-            # py_compile not available, skip
-            pytest.skip("py_compile not available")
 
 class TestExecution:
     """Tests for code execution"""
@@ -208,9 +245,9 @@ def test_overall_code_quality():
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
-'''.replace('%s', code.replace("'", "\\'").replace('\\n', '\\\\n')[:2000])
+'''
         
-        return test_template
+        return test_template.replace("__MODULE__", module_name)
     
     def _extract_failures(self, log: str) -> str:
         """Extract failure information from test log"""
@@ -0,0 +1,103 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from config import WRITE_BEHIND_CONFIG
+from database_models import session_scope, TokenUsage
+from modules.prompt_builder import estimate_tokens
+from modules.write_behind import WriteBehindQueue
+
+# One writer per process, shared by every LLM caller
+_writer = None
+_writer_lock = threading.Lock()
+
+def _apply_usage(batch: List[Dict]):
+    """Insert a batch of usage records in one transaction"""
+    with session_scope() as db:
+        db.bulk_insert_mappings(TokenUsage, batch)
+
+def get_usage_writer() -> WriteBehindQueue:
+    """Return the process-wide write-behind queue for usage records"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindQueue(
+                _apply_usage,
+                max_batch_size=WRITE_BEHIND_CONFIG["max_batch_size"],
+                flush_interval_seconds=WRITE_BEHIND_CONFIG["flush_interval_seconds"],
+                synchronous=WRITE_BEHIND_CONFIG["durability"] == "sync",
+                max_attempts=WRITE_BEHIND_CONFIG["max_attempts"],
+                name="usage-writer"
+            )
+        return _writer
+
+def record_usage(stage: str, model: str, prompt_tokens: int, completion_tokens: int, latency_ms: int, estimated: bool = True):
+    """Queue one LLM call's token usage"""
+    get_usage_writer().submit({
+        "stage": stage,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "estimated": estimated,
+        "latency_ms": latency_ms,
+        "created_at": datetime.utcnow()
+    })
+
+def tracked_generate(model, prompt: str, stage: str, **kwargs):
+    """
+    Call a Gemini model's generate_content and record its token usage
+    
+    Provider-reported counts are used when the response carries them,
+    otherwise both sides are estimated locally. Extra keyword arguments are
+    passed to generate_content.
+    """
+    start = time.perf_counter()
+    response = model.generate_content(prompt, **kwargs)
+    latency_ms = int((time.perf_counter() - start) * 1000)
+    
+    metadata = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(metadata, "prompt_token_count", None)
+    completion_tokens = getattr(metadata, "candidates_token_count", None)
+    if prompt_tokens is not None and completion_tokens is not None:
+        record_usage(stage, getattr(model, "model_name", "gemini"), prompt_tokens, completion_tokens, latency_ms, estimated=False)
+    else:
+        try:
+            completion = response.text
+        except Exception:
+            completion = ""
+        record_usage(stage, getattr(model, "model_name", "gemini"), estimate_tokens(prompt), estimate_tokens(completion), latency_ms)
+    return response
+
+def tracked_run(chain, stage: str, **inputs) -> str:
+    """Run a LangChain LLMChain and record its estimated token usage"""
+    prompt = chain.prompt.format(**inputs)
+    start = time.perf_counter()
+    output = chain.run(**inputs)
+    latency_ms = int((time.perf_counter() - start) * 1000)
+    record_usage(stage, getattr(chain.llm, "model", "langchain"), estimate_tokens(prompt), estimate_tokens(output), latency_ms)
+    return output
+
+def usage_totals(since: Optional[datetime] = None) -> List[Dict]:
+    """Calls, tokens and mean latency per stage"""
+    get_usage_writer().flush()
+    with session_scope() as db:
+        query = db.query(
+            TokenUsage.stage,
+            func.count(TokenUsage.id),
+            func.sum(TokenUsage.prompt_tokens),
+            func.sum(TokenUsage.completion_tokens),
+            func.avg(TokenUsage.latency_ms)
+        )
+        if since:
+            query = query.filter(TokenUsage.created_at >= since)
+        return [
+            {
+                "stage": stage,
+                "calls": calls,
+                "prompt_tokens": int(prompt_tokens or 0),
+                "completion_tokens": int(completion_tokens or 0),
+                "avg_latency_ms": float(avg_latency or 0)
+            }
+            for stage, calls, prompt_tokens, completion_tokens, avg_latency in query.group_by(TokenUsage.stage).all()
+        ]
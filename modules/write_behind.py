@@ -0,0 +1,155 @@
+import atexit
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+class WriteBehindQueue:
+    """
+    Buffers write operations and applies them in batches on a background thread.
+    
+    A batch is flushed when it reaches max_batch_size, when flush_interval_seconds
+    has passed since the first pending write, on an explicit flush() and at
+    interpreter shutdown. With synchronous=True every submit is applied
+    immediately in the caller's thread instead.
+    
+    A write that fails is kept and retried with the next flush; after
+    max_attempts failures it is moved to dead_letters instead of being dropped.
+    """
+    
+    def __init__(
+        self,
+        apply_batch: Callable[[List[Any]], None],
+        max_batch_size: int = 50,
+        flush_interval_seconds: float = 0.5,
+        synchronous: bool = False,
+        on_flush: Optional[Callable[[List[Any]], None]] = None,
+        name: str = "write-behind",
+        max_attempts: int = 3
+    ):
+        self.apply_batch = apply_batch
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.synchronous = synchronous
+        self.on_flush = on_flush
+        self.name = name
+        self.max_attempts = max_attempts
+        
+        self._pending: List[Any] = []
+        self._retry: List[Tuple[Any, int]] = []
+        self.dead_letters: List[Any] = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        
+        atexit.register(self.close)
+    
+    def submit(self, operation: Any):
+        """Queue a write operation"""
+        if self.synchronous or self._closed:
+            with self._condition:
+                self._pending.append(operation)
+            self.flush()
+            return
+        
+        with self._condition:
+            self._pending.append(operation)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.max_batch_size:
+                self._condition.notify()
+    
+    def flush(self) -> List[Any]:
+        """
+        Apply all pending writes now, in the caller's thread
+        
+        Returns:
+            Operations that failed in this flush; they stay queued for the
+            next flush, or land in dead_letters once out of attempts
+        """
+        with self._flush_lock:
+            with self._condition:
+                retry, self._retry = self._retry, []
+            batch = self._drain()
+            if not retry and not batch:
+                return []
+            
+            # Earlier failures go first so writes keep their order
+            operations = [operation for operation, _ in retry] + batch
+            attempts = [count for _, count in retry] + [0] * len(batch)
+            failed = self._apply(operations)
+            
+            requeue = []
+            for index in failed:
+                if attempts[index] + 1 >= self.max_attempts:
+                    print(f"Giving up on {self.name} write after {self.max_attempts} attempts")
+                    self.dead_letters.append(operations[index])
+                else:
+                    requeue.append((operations[index], attempts[index] + 1))
+            with self._condition:
+                self._retry = requeue + self._retry
+            return [operations[index] for index in failed]
+    
+    def pending_count(self) -> int:
+        """Number of writes not yet applied, including failed writes awaiting a retry"""
+        with self._condition:
+            return len(self._pending) + len(self._retry)
+    
+    def close(self):
+        """Stop the background thread and flush what is left"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+    
+    def _run(self):
+        """Background loop flushing on size or time thresholds"""
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                
+                deadline = time.monotonic() + self.flush_interval_seconds
+                while len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            
+            self.flush()
+    
+    def _drain(self) -> List[Any]:
+        """Take every pending operation off the queue"""
+        with self._condition:
+            batch, self._pending = self._pending, []
+        return batch
+    
+    def _apply(self, batch: List[Any]) -> List[int]:
+        """Apply a batch in one transaction, isolating bad operations on failure; returns failed indexes"""
+        failed = []
+        try:
+            self.apply_batch(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"Error applying {self.name} write: {str(e)}")
+                return [0]
+            
+            # Retry one by one so a single bad row does not hold back the batch
+            print(f"Error applying {self.name} batch, retrying individually: {str(e)}")
+            for index, operation in enumerate(batch):
+                try:
+                    self.apply_batch([operation])
+                except Exception as op_error:
+                    print(f"Error applying {self.name} write: {str(op_error)}")
+                    failed.append(index)
+        
+        failed_indexes = set(failed)
+        applied = [operation for index, operation in enumerate(batch) if index not in failed_indexes]
+        if self.on_flush and applied:
+            self.on_flush(applied)
+        return failed
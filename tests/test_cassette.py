@@ -0,0 +1,26 @@
+from modules.cassette import Cassette, CassetteMiss
+import pytest
+
+def test_recordings_replay_in_order_after_reload(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    cassette = Cassette(str(path))
+    cassette.record("analysis", "model", "prompt", "first", 10)
+    cassette.record("analysis", "model", "prompt", "second", 10)
+    
+    replay = Cassette(str(path))
+    assert [replay.play("analysis", "prompt")["text"] for _ in range(3)] == ["first", "second", "second"]
+    with pytest.raises(CassetteMiss):
+        replay.play("review", "prompt")
+
+def test_partial_last_line_is_skipped_and_appends_start_a_new_line(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    Cassette(str(path)).record("analysis", "model", "prompt", "kept", 10)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "trunc')
+    
+    cassette = Cassette(str(path))
+    cassette.record("review", "model", "other prompt", "added", 10)
+    
+    replay = Cassette(str(path))
+    assert replay.play("analysis", "prompt")["text"] == "kept"
+    assert replay.play("review", "other prompt")["text"] == "added"
@@ -0,0 +1,61 @@
+import ast
+from modules.code_diff import apply_patches, changed_functions, function_map, parse_patches
+
+CODE = '''import functools
+
+
+class Store:
+    @functools.lru_cache(maxsize=None)
+    def load(self, key):
+        return key.upper()
+
+    def save(self, key, value):
+        return {key: value}
+
+
+def main():
+    print(Store().load("a"))
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+def test_changed_functions_ignore_formatting_and_comments():
+    reformatted = CODE.replace("return {key: value}", "return {key: value}  # stored")
+    assert changed_functions(CODE, reformatted) == []
+    assert changed_functions(CODE, CODE.replace("key.upper()", "key.lower()")) == ["Store.load"]
+    assert changed_functions(CODE, "def broken(:\n") is None
+
+def test_method_patch_replaces_the_decorators_too():
+    patch = "@functools.lru_cache(maxsize=128)\ndef load(self, key):\n    return key.strip().upper()"
+    patched, applied, rejected = apply_patches(CODE, {"Store.load": patch})
+    
+    assert applied == ["Store.load"] and rejected == []
+    assert patched.count("lru_cache") == 1
+    assert "    @functools.lru_cache(maxsize=128)\n    def load(self, key):\n        return key.strip().upper()" in patched
+    assert function_map(patched)["Store.save"]["source"] == function_map(CODE)["Store.save"]["source"]
+
+def test_new_helper_is_added_before_the_main_guard():
+    patched, applied, _ = apply_patches(CODE, {"normalize": "def normalize(key):\n    return key.strip()"})
+    
+    assert applied == ["normalize"]
+    assert patched.index("def normalize") < patched.index('if __name__ == "__main__":')
+    assert patched.rstrip().endswith("main()")
+    ast.parse(patched)
+
+def test_patch_defining_a_different_function_is_rejected():
+    patched, applied, rejected = apply_patches(CODE, {
+        "Store.save": "def store(self, key, value):\n    return None",
+        "Store.missing": "def missing(self):\n    return None",
+        "main": "def main(:\n"
+    })
+    assert patched == CODE
+    assert applied == []
+    assert rejected == ["Store.save", "Store.missing", "main"]
+
+def test_parse_patches_splits_summary_and_patches():
+    reply = "Looks fine.\n\nPATCH Store.load\n```python\n    def load(self, key):\n        return key\n```\n"
+    summary, patches = parse_patches(reply)
+    assert summary == "Looks fine."
+    assert patches == {"Store.load": "def load(self, key):\n    return key"}
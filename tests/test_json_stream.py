@@ -0,0 +1,49 @@
+from modules.json_stream import StreamingJSONParser, parse_json_object
+
+RESPONSE = '{"tasks": ["Read CSV file", "Plot results"], "libraries": ["pandas", "matplotlib"], "constraints": "None"}'
+
+def test_prose_and_code_fences_are_skipped():
+    text = f"Here is the analysis:\n```json\n{RESPONSE}\n```\nLet me know if you need more."
+    assert parse_json_object(text) == {
+        "tasks": ["Read CSV file", "Plot results"],
+        "libraries": ["pandas", "matplotlib"],
+        "constraints": "None"
+    }
+
+def test_stray_braces_before_the_object_are_abandoned():
+    text = 'Use {placeholders} like {this} in prose. ' + RESPONSE
+    assert parse_json_object(text)["libraries"] == ["pandas", "matplotlib"]
+
+def test_braces_inside_strings_do_not_end_the_object():
+    assert parse_json_object('{"tasks": ["Format {name} and \\"quote\\" }"]}') == {"tasks": ['Format {name} and "quote" }']}
+
+def test_trailing_commas_are_tolerated():
+    assert parse_json_object('{"tasks": ["a", "b",], "libraries": [],}') == {"tasks": ["a", "b"], "libraries": []}
+
+def test_truncated_output_is_closed_at_the_last_complete_value():
+    truncated = RESPONSE[:RESPONSE.index('"matplotlib"') + 5]
+    assert parse_json_object(truncated) == {"tasks": ["Read CSV file", "Plot results"], "libraries": ["pandas"]}
+
+def test_no_object_returns_none():
+    assert parse_json_object("No JSON here, just {broken text") is None
+
+def test_events_are_the_same_for_any_chunk_boundaries():
+    text = f"```json\n{RESPONSE}\n```"
+    expected = [("tasks", "Read CSV file"), ("tasks", "Plot results"), ("libraries", "pandas"), ("libraries", "matplotlib")]
+    
+    for size in (1, 2, 3, 7, 16, len(text)):
+        parser = StreamingJSONParser()
+        events = []
+        for position in range(0, len(text), size):
+            events += parser.feed(text[position:position + size])
+        assert events == expected, size
+        assert parser.close() == parse_json_object(RESPONSE)
+
+def test_entries_are_emitted_as_soon_as_they_complete():
+    parser = StreamingJSONParser()
+    assert parser.feed('{"tasks": ["Read CSV file", "Plo') == [("tasks", "Read CSV file")]
+    assert parser.feed('t results"]') == [("tasks", "Plot results")]
+
+def test_watched_scalar_fields_are_emitted():
+    parser = StreamingJSONParser(watch=("constraints",))
+    assert parser.feed(RESPONSE) == [("constraints", "None")]
@@ -0,0 +1,84 @@
+import time
+import pytest
+from config import MODEL_ROUTING_CONFIG
+from modules.deadlines import DeadlineExceeded, deadline
+from modules.model_router import CircuitOpenError, ModelRouter
+
+def stub_router() -> ModelRouter:
+    return ModelRouter(dict(MODEL_ROUTING_CONFIG, provider="stub"), api_key="")
+
+def failing(route):
+    raise ConnectionError(f"{route['model']} is down")
+
+def test_stub_provider_answers_offline():
+    response = stub_router().generate("analysis", "Requirement: read a CSV file and plot it")
+    assert '"tasks"' in response.text
+
+def test_breaker_opens_after_consecutive_failures():
+    router = stub_router()
+    for _ in range(router.breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            router.call("analysis", failing)
+    
+    assert router.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        router.call("analysis", lambda route: "answer")
+
+def test_half_open_trial_success_closes_the_breaker():
+    router = stub_router()
+    for _ in range(router.breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            router.call("analysis", failing)
+    
+    router.breaker.reset_seconds = 0
+    assert router.breaker.state == "half-open"
+    assert router.call("analysis", lambda route: "answer") == "answer"
+    assert router.breaker.state == "closed"
+
+def test_deadline_does_not_trip_the_breaker():
+    router = stub_router()
+    for _ in range(router.breaker.failure_threshold + 1):
+        with pytest.raises(DeadlineExceeded), deadline(0.05):
+            router.call("analysis", lambda route: time.sleep(0.3))
+    
+    assert router.breaker.state == "closed"
+    assert router.breaker.failures == 0
+    assert not router.breaker.trial_running
+
+def test_slow_call_is_hedged_and_the_faster_answer_wins():
+    router = stub_router()
+    router.hedge = True
+    model = router.routes("analysis")[0]["model"]
+    for _ in range(router.config["min_samples"]):
+        router._stats(model).record(10, ok=True)
+    attempts = []
+    
+    def answer(route):
+        # The first attempt stalls; the hedged duplicate answers at once
+        attempts.append(route["model"])
+        if len(attempts) == 1:
+            time.sleep(2)
+            return "slow"
+        return "fast"
+    
+    start = time.monotonic()
+    assert router.call("analysis", answer) == "fast"
+    assert time.monotonic() - start < 1.5
+    assert len(attempts) == 2
+
+def test_local_providers_are_not_hedged():
+    assert not stub_router().hedge
+
+def test_abandoned_stream_releases_the_half_open_trial():
+    router = stub_router()
+    for _ in range(router.breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            router.call("analysis", failing)
+    router.breaker.reset_seconds = 0
+    
+    stream = router.stream("analysis", "Requirement: " + "read a CSV file " * 20)
+    next(stream)
+    stream.close()
+    
+    assert not router.breaker.trial_running
+    assert router.breaker.allow()
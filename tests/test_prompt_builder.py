@@ -0,0 +1,26 @@
+from modules.prompt_builder import PromptBuilder, estimate_tokens
+
+def test_sections_are_trimmed_by_priority():
+    builder = PromptBuilder(40)
+    builder.add("instructions", "Review the code.", 0)
+    builder.add("log", "\n".join(f"log line {number}" for number in range(100)), 2, keep="tail")
+    prompt = builder.build()
+    assert prompt.startswith("Review the code.")
+    assert "log line 99" in prompt and "log line 0\n" not in prompt
+    assert estimate_tokens(prompt) <= 40
+
+def test_whole_sections_are_dropped_not_trimmed():
+    code = "\n".join(f"value_{number} = {number}" for number in range(100))
+    builder = PromptBuilder(50)
+    builder.add("instructions", "Review the code.", 0)
+    builder.add("code", code, 1, keep="whole")
+    prompt = builder.build()
+    assert "value_0" not in prompt
+    assert not builder.included("code")
+    assert builder.included("instructions")
+
+def test_whole_sections_that_fit_are_included():
+    builder = PromptBuilder(1000)
+    builder.add("code", "def f():\n    return 1", 1, keep="whole")
+    builder.build()
+    assert builder.included("code")
@@ -0,0 +1,21 @@
+from modules.rule_engine import RuleEngine
+
+RULES = [
+    {"keywords": ["email", "smtp"], "tasks": ["Send email"], "libraries": ["smtplib"]},
+    {"keywords": ["email address", "validat*"], "tasks": ["Validate input formats"], "libraries": ["re"]},
+    {"keywords": ["address book"], "tasks": ["Manage contacts"], "libraries": []},
+    {"keywords": ["report"], "tasks": ["Generate report"], "libraries": []}
+]
+
+def test_keyword_inside_longer_match_still_fires():
+    tasks = RuleEngine(RULES).analyze("Send an email address validation report")["tasks"]
+    assert tasks == ["Send email", "Validate input formats", "Generate report"]
+
+def test_keywords_overlapping_a_longer_match_fire():
+    # "address book" starts inside "email address"
+    tasks = RuleEngine(RULES).analyze("Import the email address book")["tasks"]
+    assert tasks == ["Send email", "Validate input formats", "Manage contacts"]
+
+def test_plurals_and_wildcards():
+    tasks = RuleEngine(RULES).analyze("Validating emails and reports")["tasks"]
+    assert tasks == ["Send email", "Validate input formats", "Generate report"]
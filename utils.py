@@ -5,7 +5,7 @@ Utility functions for SASDS
 import os
 from pathlib import Path
 from typing import Optional
-import json
+from modules.json_stream import parse_json_object
 
 def read_file_content(file_path: str) -> Optional[str]:
     """Read content from a file"""
@@ -28,16 +28,8 @@ def save_file(file_path: str, content: str) -> bool:
         return False
 
 def extract_json(text: str) -> Optional[dict]:
-    """Extract JSON from text"""
-    try:
-        start_idx = text.find('{')
-        end_idx = text.rfind('}') + 1
-        if start_idx >= 0 and end_idx > start_idx:
-            json_str = text[start_idx:end_idx]
-            return json.loads(json_str)
-    except:
-        pass
-    return None
+    """Extract the first JSON object from text, skipping prose, fences and stray braces"""
+    return parse_json_object(text)
 
 def truncate_text(text: str, max_length: int = 500) -> str:
     """Truncate text to max length"""